@@ -1,10 +1,23 @@
 import os
 import sys
+from datetime import datetime, timedelta
 # Add project root to path for local execution testing
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, render_template, request, jsonify
+import json
+import queue
+import threading
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 from app.core.workflows.routines import WorkflowOrchestrator
+from app.core.workflows.scheduler import RoutineScheduler
+from app.core.workflows.jobs import JobManager, JobQueueFull
+from app.core.workflows.run_cache import RunCache, SQLiteRunCache
+from app.core.storage.file_lock import FileLock
+from app.core.storage.action_queue import DEFAULT_PB_ID
+from app.core.metrics import REGISTRY
+from app.models import serialization
+from pydantic import BaseModel
+from typing import Optional
 import logging
 
 # Configure basic logging
@@ -13,45 +26,354 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Note: In a real environment, you'd cache the orchestrator results 
-# or run them in a background job (like Celery / PythonAnywhere Always-on task). 
-# For Stage 1 testing, we initialize it globally.
-orchestrator = WorkflowOrchestrator()
+# Services are built by create_app(), never at import: PDF extraction workers are spawned processes that
+# re-run the main script (as __mp_main__), and must not build a second orchestrator or become the refresher.
+orchestrator: Optional[WorkflowOrchestrator] = None
+run_cache: Optional[RunCache] = None
+scheduler: Optional[RoutineScheduler] = None
+jobs: Optional[JobManager] = None
+
+# Routine runners for the job API: (report_id, progress) -> result
+ROUTINE_RUNNERS = {
+    "A": lambda report_id, progress: orchestrator.run_routine_a_morning(target_report_id=report_id, progress=progress),
+    "B": lambda report_id, progress: orchestrator.run_routine_b_biweekly(progress=progress),
+    "C": lambda report_id, progress: orchestrator.run_routine_c_weekend(progress=progress),
+    "D": lambda report_id, progress: orchestrator.run_routine_d_educational(progress=progress),
+    # A-D over one shared crawl/fetch/parse pass
+    "ALL": lambda report_id, progress: orchestrator.run_all_routines(progress=progress),
+}
+
+# Streaming runners for the SSE endpoint: (report_id, progress) -> iterator of (event, payload)
+ROUTINE_STREAMS = {
+    "A": lambda report_id, progress: orchestrator.stream_routine_a_morning(target_report_id=report_id, progress=progress),
+}
+
+def _publish_job_result(job):
+    # A finished run becomes the dashboard's current Routine A result
+    if job.key.startswith("A:"):
+        scheduler.cache.put("A", job.result)
+    elif job.key.startswith("ALL:"):
+        routine_a = job.result["routines"].get("A", {})
+        if routine_a.get("status") == "success":
+            scheduler.cache.put("A", routine_a)
+
+# Number of stored reports shown in the dashboard history list
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", "100"))
+# Customer queue page size (dashboard and /queue API default)
+QUEUE_PAGE_SIZE = int(os.environ.get("QUEUE_PAGE_SIZE", "20"))
+MAX_QUEUE_PAGE_SIZE = 500
+# Audit trail page size (/audit default)
+AUDIT_PAGE_SIZE = int(os.environ.get("AUDIT_PAGE_SIZE", "100"))
+MAX_AUDIT_PAGE_SIZE = 1000
 
-# In-memory mock storage for the daily run
-latest_run_cache = None
+def _format_age(seconds: float) -> str:
+    """Human-readable age of a cached routine result (Korean)."""
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "방금 전"
+    if minutes < 60:
+        return f"{minutes}분 전"
+    hours = minutes // 60
+    if hours < 24:
+        return f"{hours}시간 전"
+    return f"{hours // 24}일 전"
 
 @app.route("/", methods=["GET"])
 def dashboard():
     """PB Dashboard Main page - Today's Hybrid Routines & Customer Queues."""
-    global latest_run_cache
-    if not latest_run_cache:
-        # Run Routine A (Morning Hybrid) forcefully if empty for demo
-        latest_run_cache = orchestrator.run_routine_a_morning()
+    # Always serve the last good result immediately; a stale one is refreshed in the background
+    cached = scheduler.get("A")
+    run_info = None
+    if cached:
+        run_info = {
+            "generated_at": datetime.fromtimestamp(cached.created_at).strftime("%Y-%m-%d %H:%M"),
+            "age": _format_age(cached.age_seconds),
+        }
         
-    # Also load all historical reports for the bottom list
-    all_reports = orchestrator.crawler.load_all_reports()
+    # Also load the most recent historical reports for the bottom list (indexed query, not a full scan)
+    all_reports = orchestrator.crawler.load_recent_reports(limit=HISTORY_PAGE_SIZE)
     
-    return render_template("index.html", data=latest_run_cache, all_reports=all_reports)
+    # A routine job submitted from this page: the template polls it and reloads when done
+    pending_job, _ = _find_job(request.args.get("job", ""))
+    
+    # Only the top of the PB's persistent queue is rendered; later pages follow the cursor
+    pb_id = request.args.get("pb") or DEFAULT_PB_ID
+    try:
+        queue_page = _queue_page(pb_id, QUEUE_PAGE_SIZE, request.args.get("cursor") or None, cached.result if cached else None)
+    except ValueError:
+        # A stale or hand-edited cursor: show the top of the queue instead
+        queue_page = _queue_page(pb_id, QUEUE_PAGE_SIZE, None, cached.result if cached else None)
+    
+    return render_template(
+        "index.html",
+        data=cached.result if cached else None,
+        all_reports=all_reports,
+        queue=queue_page,
+        run_info=run_info,
+        refreshing=scheduler.is_refreshing("A"),
+        pending_job=pending_job if pending_job and pending_job["status"] in ("queued", "running") else None
+    )
+
+def _queue_page(pb_id: str, limit: int, cursor: str = None, result: dict = None) -> dict:
+    """
+    One page of a PB's pending actions. Without a persistent queue, the page is cut from the cached
+    routine result's drafts (already in priority order); the cursor is then an offset ("o:<n>"), so it
+    cannot be mistaken for the queue's "priority:seq" cursor. A malformed cursor raises ValueError.
+    """
+    action_queue = orchestrator.action_queue
+    if action_queue is not None:
+        drafts, next_cursor = action_queue.top(pb_id, limit=limit, cursor=cursor)
+        return {"pb_id": pb_id, "actions": drafts, "next_cursor": next_cursor, "pending": action_queue.pending_count(pb_id)}
+    drafts = [d for d in (result or {}).get("drafts", []) if (d.pb_id or DEFAULT_PB_ID) == pb_id]
+    start = 0
+    if cursor:
+        prefix, _, offset = cursor.partition(":")
+        start = int(offset) if prefix == "o" else -1
+        if start < 0:
+            raise ValueError(f"Invalid offset cursor: {cursor}")
+    end = start + limit
+    return {"pb_id": pb_id, "actions": drafts[start:end], "next_cursor": f"o:{end}" if end < len(drafts) else None, "pending": len(drafts)}
+
+def _to_jsonable(value):
+    """Converts routine results (pydantic models, lists, dicts) into JSON-serializable data."""
+    if isinstance(value, BaseModel):
+        return _to_jsonable(serialization.to_dict(value))
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _submit_routine(routine_type: str, report_id: str = None):
+    """Queues a routine run; identical pending submissions share one job."""
+    if routine_type not in ROUTINE_RUNNERS:
+        raise ValueError(f"Unsupported routine type: {routine_type}")
+    runner = ROUTINE_RUNNERS[routine_type]
+    key = f"{routine_type}:{report_id or ''}"
+    return jobs.submit(key, lambda progress: runner(report_id, progress))
+
+def _job_payload(job: dict, created: bool = True) -> dict:
+    payload = dict(job)
+    payload["deduplicated"] = not created
+    payload["status_url"] = url_for("job_status", job_id=job["job_id"])
+    payload["result_url"] = url_for("job_result", job_id=job["job_id"])
+    return payload
+
+def _find_job(job_id: str):
+    """Returns (job dict, result) from this worker, or from the shared snapshot of another worker's job."""
+    job = jobs.get(job_id)
+    if job is not None:
+        return job.to_dict(), job.result
+    snapshot = run_cache.get_job(job_id)
+    if snapshot is not None:
+        return snapshot["job"], snapshot["result"]
+    return None, None
 
 @app.route("/run_routine", methods=["POST"])
 def run_routine_api():
-    """Endpoint to trigger a routine explicitly."""
-    global latest_run_cache
+    """
+    Endpoint to trigger a routine explicitly. Returns immediately with a job id, or, when Routine A was
+    already precomputed for report_id, with the result itself (200, "cached": true).
+    """
     if request.is_json:
         routine_type = request.json.get("routine_type", "A")
+        report_id = request.json.get("report_id")
     else:
         routine_type = request.form.get("routine_type", "A")
+        report_id = request.form.get("report_id")
+        
+    # Switching to a candidate report is a lookup when it was precomputed after the last run
+    cached = orchestrator.speculative_routine_a(report_id) if routine_type == "A" and report_id else None
+    if cached is not None:
+        scheduler.cache.put("A", cached)
+        if not request.is_json:
+            return redirect(url_for('dashboard'))
+        return jsonify({"status": "success", "cached": True, "result": _to_jsonable(cached)})
         
-    if routine_type == "A":
-        report_id = request.json.get("report_id") if request.is_json else request.form.get("report_id")
-        latest_run_cache = orchestrator.run_routine_a_morning(target_report_id=report_id)
+    try:
+        job, created = _submit_routine(routine_type, report_id)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except JobQueueFull:
+        if not request.is_json:
+            return redirect(url_for('dashboard'))
+        return jsonify({"status": "error", "message": "실행 대기 중인 루틴이 너무 많습니다. 잠시 후 다시 시도해 주세요."}), 429
         
     if not request.is_json:
-        from flask import redirect, url_for
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('dashboard', job=job.job_id))
         
-    return jsonify({"status": "success", "message": f"Routine {routine_type} executed."})
+    return jsonify(_job_payload(job.to_dict(), created)), 202
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Submits a routine job: {"routine_type": "A", "report_id": optional}."""
+    body = request.get_json(silent=True) or {}
+    try:
+        job, created = _submit_routine(body.get("routine_type", "A"), body.get("report_id"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
+    return jsonify(_job_payload(job.to_dict(), created)), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Job status with per-stage progress."""
+    job, _ = _find_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+    return jsonify(_job_payload(job))
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """Routine result once the job succeeded; 202 while it is still pending."""
+    job, result = _find_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify(_job_payload(job)), 202
+    if job["status"] != "succeeded":
+        return jsonify(_job_payload(job)), 409
+    return jsonify(_to_jsonable(result))
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    """Cancels a queued job, or stops a running one at its next stage."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        if run_cache.get_job(job_id) is not None:
+            return jsonify({"status": "error", "message": "Job is running in another worker process."}), 409
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+    return jsonify(_job_payload(job.to_dict()))
+
+@app.route("/queue/<pb_id>", methods=["GET"])
+def pb_queue(pb_id):
+    """Top of a PB's action queue: ?limit=20, then ?cursor=<next_cursor> for the following page."""
+    try:
+        limit = min(max(int(request.args.get("limit", QUEUE_PAGE_SIZE)), 1), MAX_QUEUE_PAGE_SIZE)
+        cursor = request.args.get("cursor") or None
+        cached = scheduler.get("A")
+        page = _queue_page(pb_id, limit, cursor, cached.result if cached else None)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid limit or cursor."}), 400
+    return jsonify(_to_jsonable(page))
+
+@app.route("/queue/<pb_id>/<action_id>/complete", methods=["POST"])
+def complete_action(pb_id, action_id):
+    """Marks an action done and takes it off the PB's queue."""
+    if orchestrator.action_queue is None:
+        return jsonify({"status": "error", "message": "Action queue is disabled."}), 404
+    if not orchestrator.action_queue.complete(pb_id, action_id):
+        return jsonify({"status": "error", "message": "Unknown or already completed action."}), 404
+    if not request.is_json:
+        return redirect(url_for('dashboard', pb=pb_id))
+    return jsonify({"status": "success", "action_id": action_id, "pending": orchestrator.action_queue.pending_count(pb_id)})
+
+@app.route("/queue/<pb_id>/<action_id>", methods=["DELETE"])
+def remove_action(pb_id, action_id):
+    """Drops an action from the PB's queue without recording it as done."""
+    if orchestrator.action_queue is None:
+        return jsonify({"status": "error", "message": "Action queue is disabled."}), 404
+    if not orchestrator.action_queue.remove(pb_id, action_id):
+        return jsonify({"status": "error", "message": "Unknown action."}), 404
+    return jsonify({"status": "success", "action_id": action_id, "pending": orchestrator.action_queue.pending_count(pb_id)})
+
+def _parse_day(value: str, end: bool = False) -> datetime:
+    """ISO date or datetime; a bare date as an end bound covers that whole day."""
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@app.route("/audit", methods=["GET"])
+def audit_trail():
+    """
+    Audit records, newest first: ?customer_id=, ?report_id=, ?from=2024-01-02&to=2024-01-31 (ISO dates or
+    datetimes, to inclusive for dates), ?limit=100.
+    """
+    if orchestrator.audit_log is None:
+        return jsonify({"status": "error", "message": "Audit log is disabled."}), 404
+    try:
+        limit = min(max(int(request.args.get("limit", AUDIT_PAGE_SIZE)), 1), MAX_AUDIT_PAGE_SIZE)
+        start = _parse_day(request.args["from"]) if request.args.get("from") else None
+        end = _parse_day(request.args["to"], end=True) if request.args.get("to") else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid limit or date."}), 400
+    records = orchestrator.audit_log.query(
+        customer_id=request.args.get("customer_id") or None,
+        report_id=request.args.get("report_id") or None,
+        start=start, end=end, limit=limit
+    )
+    return jsonify({"status": "success", "records": _to_jsonable(records)})
+
+def _sse(event: str, payload) -> str:
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(_to_jsonable(payload), ensure_ascii=False)}\n\n"
+
+# Each streamed run holds a thread for the whole routine; past this many at once, /stream_routine answers 429
+STREAM_MAX_CONCURRENT = int(os.environ.get("STREAM_MAX_CONCURRENT", "4"))
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CONCURRENT)
+
+@app.route("/stream_routine", methods=["GET"])
+def stream_routine():
+    """
+    Runs a routine and streams it as Server-Sent Events: "stage" events while it runs, "bundle" with the
+    bundle metadata once matching is done, one "draft" per PBActionDraft as soon as it is generated,
+    then "done" with the full result (or "error"). At most STREAM_MAX_CONCURRENT streamed runs at a time.
+    """
+    routine_type = request.args.get("routine_type", "A")
+    report_id = request.args.get("report_id") or None
+    if routine_type not in ROUTINE_STREAMS:
+        return jsonify({"status": "error", "message": f"Unsupported routine type: {routine_type}"}), 400
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({"status": "error", "message": "실행 중인 루틴이 너무 많습니다. 잠시 후 다시 시도해 주세요."}), 429
+
+    # The routine runs on its own thread so stage events reach the client as they happen; a client that
+    # disconnects does not abort the run, whose result is still published to the dashboard cache.
+    events_queue: "queue.Queue" = queue.Queue()
+
+    def run():
+        try:
+            for event, payload in ROUTINE_STREAMS[routine_type](report_id, lambda stage: events_queue.put(("stage", {"stage": stage}))):
+                if event == "bundle":
+                    payload = {k: payload[k] for k in ("bundle", "report_data", "video_data", "other_reports")}
+                elif event == "done":
+                    scheduler.cache.put(routine_type, payload)
+                    payload = {"status": "success", "draft_count": len(payload["drafts"]), "audit": payload["audit"]}
+                events_queue.put((event, payload))
+        except Exception as e:
+            logger.error(f"Streaming routine {routine_type} failed: {e}")
+            events_queue.put(("error", {"status": "error", "message": str(e)}))
+        finally:
+            # The slot is held until the run ends, even if the client has gone
+            _stream_slots.release()
+            events_queue.put(None)
+
+    try:
+        threading.Thread(target=run, daemon=True).start()
+    except RuntimeError:
+        _stream_slots.release()
+        raise
+
+    def events():
+        while True:
+            item = events_queue.get()
+            if item is None:
+                return
+            yield _sse(*item)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/guide", methods=["GET"])
 def workflow_guide():
@@ -59,22 +381,61 @@ def workflow_guide():
     return render_template("guide.html")
 
 import time
-import threading
+
+# Older board pages walked per refresh until the full history is stored
+BACKFILL_PAGES_PER_REFRESH = int(os.environ.get("BACKFILL_PAGES_PER_REFRESH", "1"))
 
 def background_refresh():
     """Periodic background refresh every 1 hour."""
     while True:
         try:
             logger.info("Starting background research refresh...")
-            orchestrator.crawler.fetch_recent_reports()
-            logger.info("Background refresh completed.")
+            new_reports = orchestrator.crawler.crawl_incremental()
+            backfilled = orchestrator.crawler.backfill(max_pages=BACKFILL_PAGES_PER_REFRESH) if BACKFILL_PAGES_PER_REFRESH else 0
+            logger.info(f"Background refresh completed. New: {len(new_reports)}, backfilled: {backfilled}")
         except Exception as e:
             logger.error(f"Error in background refresh: {e}")
         time.sleep(3600) # 1 hour
 
-# Start background thread
-refresh_thread = threading.Thread(target=background_refresh, daemon=True)
-refresh_thread.start()
+# Only one worker process per host crawls the board and precomputes routines: whichever holds this lock.
+# The OS drops the lock when that process exits, and a waiting worker takes over.
+refresher_lock = FileLock(os.path.join(os.environ.get("LOCK_DIR", "data/locks"), "refresher.lock"))
+LEADER_RETRY_SECONDS = int(os.environ.get("LEADER_RETRY_SECONDS", "30"))
+
+def run_background_tasks():
+    """Waits to become this host's refresher, then runs the routine scheduler and the hourly refresh."""
+    while not refresher_lock.acquire(blocking=False):
+        time.sleep(LEADER_RETRY_SECONDS)
+    logger.info(f"Worker {os.getpid()} is the background refresher for this host.")
+    # Start routine precompute loop (builds Routine A now and before market open)
+    scheduler.start()
+    background_refresh()
+
+_create_lock = threading.Lock()
+
+def create_app() -> Flask:
+    """
+    Builds this worker's services and starts its background tasks, once per process, and returns the
+    Flask app. WSGI servers load app/wsgi.py, which calls it.
+    """
+    global orchestrator, run_cache, scheduler, jobs
+    with _create_lock:
+        if orchestrator is not None:
+            return app
+        # Note: In a real environment, you'd cache the orchestrator results 
+        # or run them in a background job (like Celery / PythonAnywhere Always-on task). 
+        # For Stage 1 testing, we initialize it per worker process.
+        orchestrator = WorkflowOrchestrator()
+        # Routine results are shared by every worker process on the host (RUN_CACHE=memory keeps them per process)
+        run_cache = RunCache() if os.environ.get("RUN_CACHE", "sqlite") == "memory" else SQLiteRunCache()
+        # Routine results are precomputed in the background and served stale-while-revalidate
+        scheduler = RoutineScheduler(orchestrator, cache=run_cache)
+        # Explicit routine runs are queued as jobs instead of blocking a web worker
+        jobs = JobManager(on_success=_publish_job_result, snapshot_store=run_cache)
+        # Start background thread (BACKGROUND_TASKS=0 serves requests only, e.g. under benchmarks)
+        if os.environ.get("BACKGROUND_TASKS", "1") == "1":
+            threading.Thread(target=run_background_tasks, daemon=True).start()
+    return app
 
 if __name__ == "__main__":
-    app.run(debug=True, port=8080)
+    create_app().run(debug=True, port=8080)
@@ -0,0 +1,58 @@
+import re
+from typing import List, Optional, Tuple
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+# Fast path: only <table> subtrees of the board page are turned into a tree
+_TABLE_STRAINER = SoupStrainer("table")
+# Fast path: only the element carrying the report body is turned into a tree
+_CONTENT_ID = "messageContentsDiv"
+_CONTENT_STRAINER = SoupStrainer(id=_CONTENT_ID)
+_CONTENT_START = r"<[a-zA-Z][^<>]*\bid\s*=\s*[\"']?" + _CONTENT_ID + r"\b"
+# Script bodies are raw text up to the closing tag (a "<!--" in them is script text), so they can be read
+# without a tree. One left-to-right scan skips comments and script bodies the way the parser does, so a
+# commented-out tag is never taken for a script or the content element, and a comment in a script stays.
+_MARKUP_RE = re.compile(
+    r"<!--.*?-->|(?i:<script\b[^>]*>)(?P<script>.*?)(?i:</script\s*>)|(?P<content>" + _CONTENT_START + ")",
+    re.DOTALL
+)
+
+def _list_rows(soup: BeautifulSoup) -> List[Tag]:
+    tables = soup.find_all('table')
+    
+    if len(tables) < 2:
+        raise ValueError("Could not find the report list table on the page.")
+        
+    list_table = tables[1]
+    return list_table.find('tbody').find_all('tr')
+
+def list_rows_full(html: str) -> List[Tag]:
+    """Original path: full html.parser tree of the board page, rows of the second table."""
+    return _list_rows(BeautifulSoup(html, 'html.parser'))
+
+def list_rows_fast(html: str) -> List[Tag]:
+    """Same rows as list_rows_full, building only the table subtrees (nested tables keep their order)."""
+    return _list_rows(BeautifulSoup(html, 'html.parser', parse_only=_TABLE_STRAINER))
+
+def view_parts_full(html: str) -> Tuple[Optional[Tag], List[str]]:
+    """Original path: full tree of the view page. Returns (#messageContentsDiv, non-empty script texts)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    scripts = [script.string for script in soup.find_all('script') if script.string]
+    return soup.find(id=_CONTENT_ID), scripts
+
+def view_parts_fast(html: str) -> Tuple[Optional[Tag], List[str]]:
+    """Same result as view_parts_full without building the page tree."""
+    start: Optional[int] = None
+    scripts = []
+    for match in _MARKUP_RE.finditer(html):
+        if match.group("script"):
+            scripts.append(match.group("script"))
+        elif match.group("content") and start is None:
+            start = match.start()
+    # Start tokenizing at the content element's tag instead of the top of the page
+    tail = html[start:] if start is not None else html
+    soup = BeautifulSoup(tail, 'html.parser', parse_only=_CONTENT_STRAINER)
+    content = soup.find(id=_CONTENT_ID)
+    if content is None and start is not None:
+        # The match was not a real tag (e.g. inside an attribute value); fall back to the whole page
+        content = BeautifulSoup(html, 'html.parser', parse_only=_CONTENT_STRAINER).find(id=_CONTENT_ID)
+    return content, scripts
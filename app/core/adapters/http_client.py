@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.core.metrics import HTTP_SECONDS, HTTP_RESPONSES, record_cache
+
+logger = logging.getLogger(__name__)
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/rate seconds apart, across all threads."""
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            # Reserve the slot before sleeping so waiting threads queue up behind each other
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class HttpClient:
+    """
+    Shared HTTP layer for the adapters: one pooled keep-alive session, connect/read timeouts,
+    retries with exponential backoff, a per-host request rate, and ETag / Last-Modified
+    validators for conditional GETs. Validators are stored per validator_key (the url by default):
+    a caller that keeps the parsed body of a response passes its own key, so a 304 only ever answers
+    the response that caller parsed, never one fetched by another adapter instance.
+    """
+    def __init__(self,
+                 connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None,
+                 pool_size: Optional[int] = None,
+                 host_rate_per_sec: Optional[float] = None):
+        self.timeout: Tuple[float, float] = (
+            connect_timeout if connect_timeout is not None else float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5")),
+            read_timeout if read_timeout is not None else float(os.environ.get("HTTP_READ_TIMEOUT", "20"))
+        )
+        retry = Retry(
+            total=max_retries if max_retries is not None else int(os.environ.get("HTTP_MAX_RETRIES", "3")),
+            backoff_factor=backoff_factor if backoff_factor is not None else float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5")),
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False
+        )
+        pool_size = pool_size if pool_size is not None else int(os.environ.get("HTTP_POOL_SIZE", "10"))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate_limiter = HostRateLimiter(
+            host_rate_per_sec if host_rate_per_sec is not None else float(os.environ.get("HTTP_HOST_RATE_PER_SEC", "2"))
+        )
+        # validator_key (default: url) -> (ETag, Last-Modified) of the last 200 response
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, conditional: bool = False,
+            validator_key: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        GET with the shared session and default timeouts. With conditional=True the validators of the
+        previous response under validator_key are sent, and an unchanged resource comes back as a 304
+        with an empty body.
+        """
+        request_headers = dict(headers or {})
+        validator_key = validator_key or url
+        if conditional:
+            with self._lock:
+                etag, last_modified = self._validators.get(validator_key, (None, None))
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+        kwargs.setdefault("timeout", self.timeout)
+        self.rate_limiter.acquire(url)
+        host = urlparse(url).netloc
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=request_headers, **kwargs)
+        except Exception:
+            HTTP_RESPONSES.inc(host=host, status="error")
+            raise
+        finally:
+            # Latency excludes the rate limiter's wait; retries inside the session are included
+            HTTP_SECONDS.observe(time.perf_counter() - start, host=host)
+        HTTP_RESPONSES.inc(host=host, status=response.status_code)
+        if conditional and ("If-None-Match" in request_headers or "If-Modified-Since" in request_headers):
+            record_cache("http_conditional", self.not_modified(response))
+        if conditional and response.status_code == 200:
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            with self._lock:
+                if etag or last_modified:
+                    self._validators[validator_key] = (etag, last_modified)
+                else:
+                    self._validators.pop(validator_key, None)
+        return response
+
+    def forget(self, validator_key: str):
+        """Drops stored validators (of a url or validator_key) so the next conditional GET is a full fetch."""
+        with self._lock:
+            self._validators.pop(validator_key, None)
+
+    @staticmethod
+    def not_modified(response: requests.Response) -> bool:
+        return response.status_code == 304
+
+_shared_client: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+def get_http_client() -> HttpClient:
+    """Returns the process-wide client shared by all adapters."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
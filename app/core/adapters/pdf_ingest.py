@@ -0,0 +1,270 @@
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from app.models.resources import ResearchReport
+from app.core.adapters.http_client import HttpClient, get_http_client
+from app.core.metrics import PDF_EXTRACT_SECONDS, record_cache
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Separates the HTML body from the PDF text, and PDF pages from each other, in normalized_text
+PAGE_SEPARATOR = "\n\n"
+
+def extract_pdf_pages(data: bytes, max_pages: int = 0) -> List[str]:
+    """Text of each page (runs in a worker process, so it must stay a picklable top-level function)."""
+    reader = PdfReader(io.BytesIO(data))
+    pages = reader.pages if not max_pages else reader.pages[:max_pages]
+    return [(page.extract_text() or "").strip() for page in pages]
+
+class PdfTextCache:
+    """
+    Extracted page texts keyed by the SHA-256 of the PDF bytes, in SQLite (shared across worker processes).
+    The same attachment re-downloaded, or served under another URL, is never extracted twice.
+    Least recently used entries are evicted past max_entries.
+    """
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.db_path = db_path or os.environ.get("PDF_CACHE_PATH", "data/pdf_text.sqlite3")
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("PDF_CACHE_MAX_ENTRIES", "2000"))
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pdf_text (
+                    content_hash TEXT PRIMARY KEY,
+                    pages TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pdf_text_accessed ON pdf_text (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, content_hash: str) -> Optional[List[str]]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT pages FROM pdf_text WHERE content_hash = ?", (content_hash,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE pdf_text SET accessed_at = ? WHERE content_hash = ?", (time.time(), content_hash))
+        except Exception as e:
+            logger.warning(f"PDF text cache read failed: {e}")
+            row = None
+        record_cache("pdf_text", row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put(self, content_hash: str, pages: List[str]):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT OR REPLACE INTO pdf_text (content_hash, pages, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (content_hash, json.dumps(pages, ensure_ascii=False), now, now)
+                )
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM pdf_text WHERE content_hash IN (SELECT content_hash FROM pdf_text ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                conn.execute("COMMIT")
+        except Exception as e:
+            logger.warning(f"PDF text cache write failed: {e}")
+
+class PdfIngestor:
+    """
+    Downloads report PDF attachments and appends their text to normalized_text, page by page.
+    Extraction is CPU-bound, so it runs on a process pool instead of the web workers' threads; downloads
+    stay on the calling thread and overlap with extraction of the previous attachment. Results are cached
+    by content hash. Needs pypdf; without it ingestion is a no-op.
+    """
+    def __init__(self, http: Optional[HttpClient] = None, cache: Optional[PdfTextCache] = None, max_workers: Optional[int] = None):
+        self.http = http or get_http_client()
+        self.enabled = PdfReader is not None and os.environ.get("PDF_INGEST_ENABLED", "1") == "1"
+        if PdfReader is None:
+            logger.info("pypdf not installed: PDF attachments are not ingested.")
+        self.cache = cache or (PdfTextCache() if self.enabled else None)
+        self.max_workers = max_workers or int(os.environ.get("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_bytes = int(os.environ.get("PDF_MAX_BYTES", str(30 * 2**20)))
+        self.max_pages = int(os.environ.get("PDF_MAX_PAGES", "60"))
+        self.extract_timeout = float(os.environ.get("PDF_EXTRACT_TIMEOUT", "120"))
+        self.headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # report_id -> in-flight ingestion, resolving to (hashes, pages) or None. Routine runs, the precompute
+        # thread and streams may ingest the same report at once; only the first downloads and extracts
+        self._ingests: Dict[str, Future] = {}
+        self._ingest_lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Created on first use; spawned (not forked) workers do not inherit the web server's threads and locks
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _discard_broken_pool(self, pool: Optional[ProcessPoolExecutor]):
+        # A worker that died (e.g. killed on memory) breaks the whole pool; the next call starts a fresh one
+        with self._pool_lock:
+            if pool is not None and self._pool is pool:
+                self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _download(self, url: str) -> bytes:
+        response = self.http.get(url, headers=self.headers, stream=True)
+        try:
+            response.raise_for_status()
+            chunks, size = [], 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ValueError(f"PDF larger than {self.max_bytes} bytes")
+                chunks.append(chunk)
+        finally:
+            response.close()
+        data = b"".join(chunks)
+        if not data.startswith(b"%PDF"):
+            raise ValueError("attachment is not a PDF")
+        return data
+
+    def _submit(self, data: bytes) -> Tuple[str, Future, Optional[float]]:
+        """
+        (content hash, future of page texts, submit time). A cached extraction comes back as a finished
+        future with no submit time.
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        pages = self.cache.get(content_hash)
+        if pages is not None:
+            future: Future = Future()
+            future.set_result(pages)
+            return content_hash, future, None
+        return content_hash, self._executor().submit(extract_pdf_pages, data, self.max_pages), time.perf_counter()
+
+    def ingest(self, reports: List[ResearchReport]) -> List[ResearchReport]:
+        """
+        Ingests the attachments of reports not ingested yet (pdf_hashes empty). Returns the reports whose
+        normalized_text gained PDF text; the caller persists them. Failures are logged per attachment.
+        A report already being ingested by another call is waited for, not ingested twice.
+        """
+        if not self.enabled:
+            return []
+        pending: List[Tuple[ResearchReport, List[Tuple[str, Future, Optional[float]]], Future]] = []
+        waits: List[Tuple[ResearchReport, Future]] = []
+        for report in reports:
+            if report.pdf_hashes or not report.attachment_urls:
+                continue
+            with self._ingest_lock:
+                if report.pdf_hashes:
+                    continue
+                inflight = self._ingests.get(report.report_id)
+                if inflight is None:
+                    inflight = self._ingests[report.report_id] = Future()
+                else:
+                    waits.append((report, inflight))
+                    continue
+            jobs = []
+            for url in report.attachment_urls:
+                try:
+                    jobs.append(self._submit(self._download(url)))
+                except BrokenProcessPool as e:
+                    self._discard_broken_pool(self._pool)
+                    logger.warning(f"PDF attachment {url} of {report.report_id} skipped: {e}")
+                except Exception as e:
+                    logger.warning(f"PDF attachment {url} of {report.report_id} skipped: {e}")
+            pending.append((report, jobs, inflight))
+
+        updated = []
+        try:
+            for report, jobs, inflight in pending:
+                result = self._collect(report, jobs)
+                inflight.set_result(result)
+                if result and self._attach_once(report, *result):
+                    updated.append(report)
+        finally:
+            # Waiters are released even if this call failed part way
+            with self._ingest_lock:
+                for report, _, inflight in pending:
+                    if not inflight.done():
+                        inflight.set_result(None)
+                    if self._ingests.get(report.report_id) is inflight:
+                        del self._ingests[report.report_id]
+        for report, inflight in waits:
+            # The waiter's report may be another instance of the same report (e.g. loaded from the store)
+            result = inflight.result()
+            if result and self._attach_once(report, *result):
+                updated.append(report)
+        if updated:
+            logger.info(f"Ingested PDF text for {len(updated)} report(s)")
+        return updated
+
+    def _collect(self, report: ResearchReport, jobs: List[Tuple[str, Future, Optional[float]]]) -> Optional[Tuple[List[str], List[str]]]:
+        """(hashes, page texts) of the attachments extracted for report, or None if none was."""
+        hashes, documents = [], []
+        for content_hash, future, started_at in jobs:
+            try:
+                pages = future.result(timeout=self.extract_timeout)
+            except BrokenProcessPool as e:
+                self._discard_broken_pool(self._pool)
+                logger.warning(f"PDF text extraction failed for {report.report_id}: {e}")
+                continue
+            except Exception as e:
+                logger.warning(f"PDF text extraction failed for {report.report_id}: {e}")
+                continue
+            if started_at is not None:
+                PDF_EXTRACT_SECONDS.observe(time.perf_counter() - started_at)
+                self.cache.put(content_hash, pages)
+            hashes.append(content_hash)
+            documents.append(pages)
+        if not hashes:
+            return None
+        return hashes, [page for pages in documents for page in pages]
+
+    def _attach_once(self, report: ResearchReport, hashes: List[str], pages: List[str]) -> bool:
+        """Attaches the pages unless this report instance already has PDF text; True if it did."""
+        with self._ingest_lock:
+            if report.pdf_hashes:
+                return False
+            self._attach(report, hashes, pages)
+            return True
+
+    @staticmethod
+    def _attach(report: ResearchReport, hashes: List[str], pages: List[str]):
+        """Appends page texts to normalized_text and records where each page starts."""
+        text = report.normalized_text.rstrip()
+        offsets: List[int] = []
+        for page in pages:
+            if text:
+                text += PAGE_SEPARATOR
+            offsets.append(len(text))
+            text += page
+        report.normalized_text = text
+        report.page_offsets = offsets
+        report.pdf_hashes = hashes
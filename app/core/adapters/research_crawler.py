@@ -1,36 +1,87 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
+from app.models import serialization
 from app.models.resources import ResearchReport
-from typing import List
-import re
-import json
+from app.core.storage.report_store import ReportStore, create_report_store
+from app.core.adapters.http_client import HttpClient, get_http_client
+from app.core.adapters import board_parser
+from app.core.metrics import record_cache
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Optional
+from collections import OrderedDict
 import os
+import re
+import logging
+import itertools
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marker for a body fetched and stored by another call: a completed future that yields no text
+_FETCHED: Future = Future()
+_FETCHED.set_result("")
 
 class MiraeResearchCrawler:
     BASE_URL = "https://securities.miraeasset.com/bbs/board/message/list.do?categoryId=1521"
+    PAGE_URL = BASE_URL + "&curPage={}"
     VIEW_BYPASS_URL = "https://securities.miraeasset.com/bbs/board/message/view.do?messageId={}&messageNumber={}&categoryId=1521&searchStartYear=2024&searchStartMonth=01&searchStartDay=01&searchEndYear=2026&searchEndMonth=12&searchEndDay=31"
     
-    def __init__(self):
+    # Crawl state persisted in the report store
+    WATERMARK_KEY = "crawl.watermark"
+    BACKFILL_CURSOR_KEY = "crawl.backfill_page"
+    BACKFILL_DONE_KEY = "crawl.backfill_done"
+    
+    _instances = itertools.count()
+    
+    def __init__(self, store: Optional[ReportStore] = None, http: Optional[HttpClient] = None):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
         }
-        self.db_path = "data/research_db.json"
-        os.makedirs("data", exist_ok=True)
+        self.store = store or create_report_store()
+        self.http = http or get_http_client()
+        # Targeted subtree parsing; FAST_HTML_PARSING=0 switches back to full-page trees
+        self.fast_html = os.environ.get("FAST_HTML_PARSING", "1") == "1"
+        # (limit, reports) parsed from the last full board response, reused on a 304. The HTTP client is
+        # shared, so this instance's list and incremental crawl each keep their own board validators:
+        # a 304 then always refers to the response this instance last parsed for that purpose
+        self._list_cache: Optional[tuple] = None
+        instance = next(self._instances)
+        self._list_validators = f"{self.BASE_URL}#list-{instance}"
+        self._crawl_validators = f"{self.BASE_URL}#incremental-{instance}"
+        # Bounded pool for report-body fetches; the per-host rate is enforced by the HTTP client
+        self.content_workers = int(os.environ.get("CONTENT_FETCH_WORKERS", "4"))
+        self._content_pool = ThreadPoolExecutor(max_workers=self.content_workers, thread_name_prefix="report-body")
+        # report_id -> in-flight fetch, or _FETCHED once its body is stored, so a body is requested once;
+        # failed fetches are forgotten (and retried), and only the newest CONTENT_FETCH_MEMO markers are kept
+        self._content_fetches: "OrderedDict[str, Future]" = OrderedDict()
+        self.content_fetch_memo = int(os.environ.get("CONTENT_FETCH_MEMO", "1000"))
+        self._content_lock = threading.Lock()
         
     def fetch_recent_reports(self, limit: int = 10) -> List[ResearchReport]:
         """Fetches the most recent research reports from the board."""
-        response = requests.get(self.BASE_URL, headers=self.headers)
+        cached = self._list_cache
+        if cached is None or cached[0] < limit:
+            # Nothing parsed to fall back on, so force a full response
+            self.http.forget(self._list_validators)
+        response = self.http.get(self.BASE_URL, headers=self.headers, conditional=True, validator_key=self._list_validators)
+        if self.http.not_modified(response):
+            # Board unchanged since the last fetch: no parsing needed
+            return [serialization.copy_model(r) for r in cached[1][:limit]]
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        tables = soup.find_all('table')
-        
-        if len(tables) < 2:
-            raise ValueError("Could not find the report list table on the page.")
-            
-        list_table = tables[1]
-        rows = list_table.find('tbody').find_all('tr')
+        reports = self._parse_list_page(response.text, limit=limit)
+        self._list_cache = (limit, reports)
+        # Copies: callers fill in bodies and PDF text, which must not leak into the cache or other runs
+        return [serialization.copy_model(r) for r in reports]
+
+    def _parse_list_page(self, html: str, limit: Optional[int] = None, stop_at_id: Optional[str] = None) -> List[ResearchReport]:
+        """
+        Parses board rows (newest first) into reports. With stop_at_id, parsing stops at the first row
+        at or below that watermark, before any ResearchReport is built for it.
+        """
+        if self.fast_html:
+            rows = board_parser.list_rows_fast(html)
+        else:
+            rows = board_parser.list_rows_full(html)
         
         reports = []
         for row in rows[:limit]:
@@ -38,17 +89,13 @@ class MiraeResearchCrawler:
             if len(cols) < 4:
                 continue
                 
-            date_str = cols[0].get_text(strip=True)
-            try:
-                report_date = datetime.strptime(date_str, "%Y-%m-%d")
-            except ValueError:
-                report_date = datetime.now()
-                
             title_td = cols[1]
             title_a = title_td.find('a')
             if not title_a:
                 continue
                 
+            date_str = cols[0].get_text(strip=True)
+                
             # Extracts '2338320','2622' from "javascript:view('2338320','2622')"
             href = title_a.get('href', '')
             match = re.search(r"view\('(\d+)','(\d+)'\)", href)
@@ -61,6 +108,14 @@ class MiraeResearchCrawler:
                 source_url = ""
                 report_id = f"mirae_unknown_{date_str}"
                 
+            if stop_at_id and self._is_at_or_below(report_id, stop_at_id):
+                break
+                
+            try:
+                report_date = datetime.strptime(date_str, "%Y-%m-%d")
+            except ValueError:
+                report_date = datetime.now()
+                
             full_title = title_a.get_text(separator=" ", strip=True)
             
             author_str = cols[3].get_text(strip=True)
@@ -88,68 +143,215 @@ class MiraeResearchCrawler:
             
         return reports
 
+    @staticmethod
+    def _is_at_or_below(report_id: str, watermark: str) -> bool:
+        """Board message ids increase monotonically, so anything <= the watermark is already known."""
+        if report_id == watermark:
+            return True
+        rid, wid = report_id.replace("mirae_", ""), watermark.replace("mirae_", "")
+        return rid.isdigit() and wid.isdigit() and int(rid) <= int(wid)
+
+    def get_watermark(self) -> Optional[str]:
+        """Newest known report_id, from the persisted crawl state or else the newest stored report."""
+        watermark = self.store.get_meta(self.WATERMARK_KEY)
+        if watermark:
+            return watermark
+        newest = self.store.list_reports(limit=1)
+        return newest[0].report_id if newest else None
+
+    def crawl_incremental(self) -> List[ResearchReport]:
+        """
+        Fetches only reports newer than the watermark and stores them. An unchanged board costs one 304;
+        a changed one is parsed only up to the first known report.
+        """
+        # Conditional GET against the board as of the last incremental crawl; nothing changed means nothing new
+        response = self.http.get(self.BASE_URL, headers=self.headers, conditional=True, validator_key=self._crawl_validators)
+        if self.http.not_modified(response):
+            return []
+        try:
+            response.raise_for_status()
+            watermark = self.get_watermark()
+            new_reports = self._parse_list_page(response.text, stop_at_id=watermark)
+            if new_reports:
+                self.save_reports(new_reports)
+        except Exception:
+            # The validators now describe a response whose reports were never stored: the next crawl
+            # must fetch the board in full instead of getting a 304
+            self.http.forget(self._crawl_validators)
+            raise
+        return new_reports
+
+    def backfill(self, max_pages: int = 1) -> int:
+        """
+        Walks older board pages in a bounded batch, resuming from the persisted page cursor.
+        Returns the number of newly stored reports. Stops for good once a page comes back empty.
+        """
+        if self.store.get_meta(self.BACKFILL_DONE_KEY):
+            return 0
+        page = int(self.store.get_meta(self.BACKFILL_CURSOR_KEY) or 2)
+        new_count = 0
+        for _ in range(max_pages):
+            response = self.http.get(self.PAGE_URL.format(page), headers=self.headers)
+            response.raise_for_status()
+            try:
+                reports = self._parse_list_page(response.text)
+            except ValueError:
+                reports = []
+            if not reports:
+                self.store.set_meta(self.BACKFILL_DONE_KEY, str(page))
+                logger.info(f"Backfill finished at page {page}")
+                break
+            new_count += self.save_reports(reports)
+            page += 1
+            # Persist after every page so an interrupted backfill resumes where it stopped
+            self.store.set_meta(self.BACKFILL_CURSOR_KEY, str(page))
+        return new_count
+
     def fetch_report_contents(self, report: ResearchReport):
         """Fetches the full text content of a specific report."""
         if not report.source_url:
             return ""
             
         try:
-            response = requests.get(report.source_url, headers=self.headers)
+            response = self.http.get(report.source_url, headers=self.headers)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            content_div = soup.find(id="messageContentsDiv")
-            if content_div:
-                # Get text with separators for better readability
-                text = content_div.get_text(separator="\n", strip=True)
-                report.normalized_text = text
-                
-                # Double check for PDF links if not found in list page
-                if not report.attachment_urls:
-                    all_scripts = soup.find_all('script')
-                    for script in all_scripts:
-                        if script.string:
-                            pdf_match = re.search(r"Popup\.open\('(https?://[^']+)'", script.string)
-                            if pdf_match:
-                                report.attachment_urls.append(pdf_match.group(1))
-                                
-                return text
+            return self._extract_contents(response.text, report)
         except Exception as e:
-            print(f"Error fetching report contents: {e}")
+            logger.warning(f"Fetching report contents of {report.report_id} failed: {e}")
             
         return ""
 
+    def _extract_contents(self, html: str, report: ResearchReport) -> str:
+        """Reads the report body (and PDF links from scripts) out of a view page."""
+        if self.fast_html:
+            content_div, scripts = board_parser.view_parts_fast(html)
+        else:
+            content_div, scripts = board_parser.view_parts_full(html)
+        if content_div:
+            # Get text with separators for better readability
+            text = content_div.get_text(separator="\n", strip=True)
+            report.normalized_text = text
+            
+            # Double check for PDF links if not found in list page
+            if not report.attachment_urls:
+                for script in scripts:
+                    pdf_match = re.search(r"Popup\.open\('(https?://[^']+)'", script)
+                    if pdf_match:
+                        report.attachment_urls.append(pdf_match.group(1))
+                        
+            return text
+        return ""
+
+    def fetch_contents_bulk(self, reports: List[ResearchReport]) -> int:
+        """
+        Fills normalized_text for many reports at once. Bodies already in the store are reused,
+        the rest are fetched on the bounded worker pool and persisted once.
+        Returns the number of bodies fetched from the board.
+        """
+        missing = [r for r in reports if not r.normalized_text and r.source_url]
+        if not missing:
+            return 0
+            
+        stored = self.store.get_reports(r.report_id for r in missing)
+        to_fetch: List[ResearchReport] = []
+        for r in missing:
+            if not self._copy_stored(r, stored.get(r.report_id)):
+                to_fetch.append(r)
+        record_cache("report_body", True, len(missing) - len(to_fetch))
+        record_cache("report_body", False, len(to_fetch))
+                
+        waits = []
+        submitted = []
+        with self._content_lock:
+            for r in to_fetch:
+                future = self._content_fetches.get(r.report_id)
+                if future is None:
+                    future = self._content_pool.submit(self.fetch_report_contents, r)
+                    self._content_fetches[r.report_id] = future
+                    submitted.append(r)
+                waits.append((r, future))
+                
+        stored_elsewhere = []
+        for r, future in waits:
+            if future is _FETCHED:
+                # Fetched and stored since this call read the store
+                stored_elsewhere.append(r)
+                continue
+            try:
+                text = future.result()
+            except Exception as e:
+                logger.error(f"Error fetching report contents for {r.report_id}: {e}")
+                continue
+            # Another caller's fetch of the same report: copy its result onto this instance
+            if text and not r.normalized_text:
+                r.normalized_text = text
+        if stored_elsewhere:
+            stored = self.store.get_reports(r.report_id for r in stored_elsewhere)
+            for r in stored_elsewhere:
+                self._copy_stored(r, stored.get(r.report_id))
+                
+        fetched = [r for r in submitted if r.normalized_text]
+        if fetched:
+            self.save_reports(fetched)
+        with self._content_lock:
+            # Stored bodies keep only a marker, so futures don't pin the text in memory; failures
+            # (fetch_report_contents returns "" on any error) are dropped so the next call retries
+            for r in submitted:
+                if r.normalized_text:
+                    self._content_fetches[r.report_id] = _FETCHED
+                    self._content_fetches.move_to_end(r.report_id)
+                else:
+                    self._content_fetches.pop(r.report_id, None)
+            excess = len(self._content_fetches) - self.content_fetch_memo
+            if excess > 0:
+                for report_id in [k for k, f in self._content_fetches.items() if f is _FETCHED][:excess]:
+                    del self._content_fetches[report_id]
+        logger.info(f"Fetched {len(submitted)} report bodies ({len(missing) - len(to_fetch)} served from the store)")
+        return len(submitted)
+
+    @staticmethod
+    def _copy_stored(report: ResearchReport, known: Optional[ResearchReport]) -> bool:
+        """Copies a stored body (and its PDF ingestion state) onto report. False if there is none."""
+        if not known or not known.normalized_text:
+            return False
+        report.normalized_text = known.normalized_text
+        report.pdf_hashes = list(known.pdf_hashes)
+        report.page_offsets = list(known.page_offsets)
+        if not report.attachment_urls:
+            report.attachment_urls = list(known.attachment_urls)
+        return True
+
     def save_reports(self, reports: List[ResearchReport]):
-        """Persists reports to a JSON file, keeping history."""
-        existing = self.load_all_reports()
-        existing_ids = {r.report_id for r in existing}
-        
-        new_count = 0
+        """Persists reports to the report store, keeping history. Returns the number of new reports."""
+        new_count = self.store.upsert_reports(reports)
+        # Advance the crawl watermark to the newest report seen so far
+        watermark = self.get_watermark()
         for r in reports:
-            if r.report_id not in existing_ids:
-                existing.append(r)
-                new_count += 1
-                
-        # Sort by date descending
-        existing.sort(key=lambda x: x.date, reverse=True)
-        
-        with open(self.db_path, "w", encoding="utf-8") as f:
-            json.dump([r.dict() for r in existing], f, ensure_ascii=False, indent=2, default=str)
+            if not r.report_id.startswith("mirae_unknown_") and (not watermark or not self._is_at_or_below(r.report_id, watermark)):
+                watermark = r.report_id
+        if watermark and watermark != self.store.get_meta(self.WATERMARK_KEY):
+            self.store.set_meta(self.WATERMARK_KEY, watermark)
         return new_count
 
     def load_all_reports(self) -> List[ResearchReport]:
-        """Loads all stored reports from the JSON file."""
-        if not os.path.exists(self.db_path):
-            return []
-        try:
-            with open(self.db_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return [ResearchReport(**item) for item in data]
-        except Exception:
-            return []
+        """Loads all stored reports, newest first."""
+        return self.store.load_all_reports()
+
+    def load_recent_reports(self, limit: int = 50, offset: int = 0) -> List[ResearchReport]:
+        """Loads one page of stored reports, newest first."""
+        return self.store.list_reports(limit=limit, offset=offset)
+
+    def get_report(self, report_id: str) -> Optional[ResearchReport]:
+        """Looks up a single stored report by id."""
+        return self.store.get_report(report_id)
 
 if __name__ == "__main__":
+    import sys
     crawler = MiraeResearchCrawler()
+    if len(sys.argv) > 1 and sys.argv[1] == "--backfill":
+        pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        print(f"Backfilled {crawler.backfill(max_pages=pages)} reports")
+        sys.exit(0)
     reports = crawler.fetch_recent_reports(2)
     for r in reports:
         print(f"[{r.date.strftime('%Y-%m-%d')}] {r.title} by {r.author}")
@@ -1,8 +1,9 @@
-import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from app.models.resources import SmartMoneyVideo
-from typing import List
+from app.core.adapters.http_client import HttpClient, get_http_client
+from typing import List, Optional
+import itertools
 import re
 
 class SmartMoneyConnector:
@@ -14,15 +15,22 @@ class SmartMoneyConnector:
     YOUTUBE_HANDLE_URL = "https://www.youtube.com/@SmartMoney0"
     RSS_BASE_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={}"
     
-    def __init__(self):
+    _instances = itertools.count()
+    
+    def __init__(self, http: Optional[HttpClient] = None):
         self.channel_id = None
+        self.http = http or get_http_client()
+        # (limit, videos) parsed from the last full RSS response, reused on a 304; the feed validators
+        # are kept under this instance's own key, since the HTTP client is shared
+        self._feed_cache: Optional[tuple] = None
+        self._instance = next(self._instances)
         
     def _get_channel_id(self) -> str:
         if self.channel_id:
             return self.channel_id
             
         # Fetch channel page to extract channel_id
-        res = requests.get(self.YOUTUBE_HANDLE_URL)
+        res = self.http.get(self.YOUTUBE_HANDLE_URL)
         res.raise_for_status()
         
         # Look for <meta itemprop="channelId" content="UC..."> or canonical URL
@@ -43,7 +51,15 @@ class SmartMoneyConnector:
         channel_id = self._get_channel_id()
         rss_url = self.RSS_BASE_URL.format(channel_id)
         
-        response = requests.get(rss_url)
+        validator_key = f"{rss_url}#feed-{self._instance}"
+        cached = self._feed_cache
+        if cached is None or cached[0] < limit:
+            # Nothing parsed to fall back on, so force a full response
+            self.http.forget(validator_key)
+        response = self.http.get(rss_url, conditional=True, validator_key=validator_key)
+        if self.http.not_modified(response):
+            # Feed unchanged since the last fetch: no parsing needed
+            return list(cached[1][:limit])
         response.raise_for_status()
         
         root = ET.fromstring(response.content)
@@ -91,7 +107,8 @@ class SmartMoneyConnector:
             )
             videos.append(video)
             
-        return videos
+        self._feed_cache = (limit, videos)
+        return list(videos)
 
 if __name__ == "__main__":
     connector = SmartMoneyConnector()
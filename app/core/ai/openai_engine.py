@@ -1,16 +1,45 @@
 import os
 import json
+import time
 import logging
-from typing import Dict, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 try:
     from openai import OpenAI
 except ImportError:
     OpenAI = None
+from app.core.ai.result_cache import ResultCache
+from app.core.ai.text_prep import TextPreparer
+from app.core.metrics import LLM_SECONDS, LLM_REQUESTS, LLM_TOKENS
 
 logger = logging.getLogger(__name__)
 
 class OpenAIEngine:
-    def __init__(self):
+    # Bump a version whenever its system prompt changes; cached results of other versions are dropped.
+    REPORT_PROMPT_VERSION = "report-v1"
+    VIDEO_PROMPT_VERSION = "video-v1"
+    REPORT_CHUNK_PROMPT_VERSION = "report-chunk-v1"
+
+    # Fields every PB draft response must carry; the prompt rules below are shared by single and batched drafting
+    DRAFT_FIELDS = ("pb_summary", "pb_talking_points", "client_message_draft")
+
+    _DRAFT_TONE_RULES = """Tone Rules:
+- S1/Novice: 친절하고 교육적이며 정중한 어조. 전문 용어 지양.
+- S4/Expert: 간결하고 데이터 중심적이며 행동 중심적인 전략적 어조.
+- 공통: 전문성을 유지하면서도 친근해야 함. 직접적인 투자 권유(Sell/Buy)가 아닌, 정보를 공유하고 소통을 유도하는 형태여야 함. 반드시 한국어로 답변할 것.
+"""
+
+    _DRAFT_FIELD_RULES = """- pb_summary: PB가 상황을 빨리 파악할 수 있도록 3줄 내외 한국어 요약.
+- pb_talking_points: PB가 고객과 통화할 때 사용할 수 있는 불렛 포인트 (한국어).
+- client_message_draft: 고객에게 보낼 카카오톡/문자 메시지 실제 본문 초안. 
+  CRITICAL: 
+  1. 제공된 Video Details가 비어있다면 영상에 대해 절대 언급하지 말고 [영상 링크]도 포함하지 마십시오.
+  2. 영상이 있는 경우에만 [영상 링크]라는 텍스트를 메시지 적절한 위치에 포함하십시오.
+  3. 리포트와 영상을 자연스럽게 결합하되, 하나가 결여된 경우 나머지 하나에 집중하십시오. (한국어)
+"""
+
+    def __init__(self, cache: Optional[ResultCache] = None):
         self.api_key = os.environ.get("OPENAI_API_KEY")
         self.model = os.environ.get("OPENAI_MODEL_NAME", "gpt-4.1-mini")
         if OpenAI and self.api_key:
@@ -18,13 +47,81 @@ class OpenAIEngine:
         else:
             self.client = None
             logger.warning("OpenAI client not initialized. Missing OPENAI_API_KEY or openai package.")
-
-    def parse_research_report(self, text: str) -> Dict[str, Any]:
-        """Reads a research report text and extracts structured thesis."""
-        if not self.client:
-            return self._mock_report_parse(text)
             
-        system_prompt = """You are an expert financial analyst at Mirae Asset. Always respond in KOREAN.
+        # Long inputs are pre-filtered and split to the per-call token budget; chunks are extracted concurrently
+        self.text_prep = TextPreparer(model=self.model)
+        self.map_workers = max(1, int(os.environ.get("AI_MAP_MAX_WORKERS", "4")))
+        self._usage_lock = threading.Lock()
+            
+        self.cache = cache
+        if self.cache is None and os.environ.get("AI_CACHE_ENABLED", "1") == "1":
+            try:
+                self.cache = ResultCache()
+                self.cache.invalidate("report", keep_versions=[self.REPORT_PROMPT_VERSION])
+                self.cache.invalidate("report_chunk", keep_versions=[self.REPORT_CHUNK_PROMPT_VERSION])
+                self.cache.invalidate("video", keep_versions=[self.VIDEO_PROMPT_VERSION])
+            except Exception as e:
+                self.cache = None
+                logger.warning(f"AI result cache disabled: {e}")
+
+    def _cached_json_completion(self, kind: str, prompt_version: str, system_prompt: str, user_content: str, temperature: float,
+                                usage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Runs a JSON-mode completion, served from the persistent cache when the same input was seen before.
+        usage, if given, accumulates model calls, cache hits and the token counts reported by the API.
+        """
+        key = None
+        if self.cache:
+            key = ResultCache.make_key(self.model, kind, prompt_version, system_prompt + "\n" + user_content)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._add_usage(usage, cache_hits=1)
+                return cached
+                
+        response = self._create_completion(
+            kind,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            response_format={"type": "json_object"},
+            temperature=temperature
+        )
+        api_usage = getattr(response, "usage", None)
+        self._add_usage(
+            usage, calls=1,
+            prompt_tokens=getattr(api_usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(api_usage, "completion_tokens", 0) or 0
+        )
+        result = json.loads(response.choices[0].message.content)
+        if self.cache:
+            self.cache.put(key, kind, prompt_version, result)
+        return result
+
+    def _create_completion(self, kind: str, **kwargs):
+        """chat.completions.create with latency, outcome and token metrics labelled by call kind."""
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(model=self.model, **kwargs)
+        except Exception:
+            LLM_REQUESTS.inc(kind=kind, outcome="error")
+            raise
+        finally:
+            LLM_SECONDS.observe(time.perf_counter() - start, kind=kind)
+        LLM_REQUESTS.inc(kind=kind, outcome="ok")
+        api_usage = getattr(response, "usage", None)
+        LLM_TOKENS.inc(getattr(api_usage, "prompt_tokens", 0) or 0, kind=kind, direction="prompt")
+        LLM_TOKENS.inc(getattr(api_usage, "completion_tokens", 0) or 0, kind=kind, direction="completion")
+        return response
+
+    def _add_usage(self, usage: Optional[Dict[str, Any]], **counts: int):
+        if usage is None:
+            return
+        with self._usage_lock:
+            for name, value in counts.items():
+                usage[name] = usage.get(name, 0) + value
+
+    _REPORT_SYSTEM_PROMPT = """You are an expert financial analyst at Mirae Asset. Always respond in KOREAN.
 Extract a structured investment thesis from the following research report content.
 If full text is provided, analyze it deeply. If only the title is provided, infer the core idea.
 Return JSON ONLY with these fields:
@@ -36,21 +133,76 @@ Return JSON ONLY with these fields:
 - time_horizon (string): 투자 시계 (예: "단기 (1-3M)", "중기 (3-12M)", "장기 (1Y+)")
 - risk_conditions (string): 주요 리스크 요인
 """
+
+    _REPORT_CHUNK_SYSTEM_PROMPT = """You are an expert financial analyst at Mirae Asset. Always respond in KOREAN.
+You are reading one section of a longer research report. Extract only what this section states.
+Return JSON ONLY with these fields:
+- key_points (list of strings): 이 구간의 핵심 주장과 근거 (최대 5개)
+- conclusion (string): 이 구간에 결론이나 투자의견이 있으면 요약, 없으면 빈 문자열
+- asset_class_impact (list of strings): 영향 자산군
+- region_impact (list of strings): 영향 지역
+- sector_impact (list of strings): 영향 섹터
+- company_impact (list of strings): 언급된 구체적인 티커나 기업명
+- time_horizon (string): 언급된 투자 시계, 없으면 빈 문자열
+- risk_conditions (string): 언급된 리스크 요인, 없으면 빈 문자열
+"""
+
+    def parse_research_report(self, text: str) -> Dict[str, Any]:
+        """Reads a research report text and extracts structured thesis."""
+        return self.parse_research_report_with_usage(text)[0]
+
+    def parse_research_report_with_usage(self, text: str, page_offsets: Optional[List[int]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Same as parse_research_report, also returning the token usage for this report.
+        page_offsets marks where PDF pages start in text, so page furniture can be stripped.
+        Text that fits the token budget is parsed in one call. Longer reports are chunked: each chunk
+        is extracted concurrently (map), then the extracts are combined into one thesis (reduce).
+        """
+        prepared = self.text_prep.prepare(text, page_offsets)
+        usage: Dict[str, Any] = dict(prepared["stats"], calls=0, cache_hits=0, prompt_tokens=0, completion_tokens=0)
+        if not self.client:
+            return self._mock_report_parse(text), usage
+            
+        chunks = prepared["chunks"]
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Report Content:\n{text[:15000]}"}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2
+            if len(chunks) <= 1:
+                content = f"Report Content:\n{chunks[0] if chunks else ''}"
+            else:
+                extracts = self._extract_report_chunks(chunks, usage)
+                content = (
+                    "Report Content (section-by-section extracts of a long report, in document order; "
+                    "the last sections usually hold the conclusion):\n"
+                    + json.dumps(extracts, ensure_ascii=False)
+                )
+            result = self._cached_json_completion(
+                "report", self.REPORT_PROMPT_VERSION, self._REPORT_SYSTEM_PROMPT,
+                content, temperature=0.2, usage=usage
             )
-            result = response.choices[0].message.content
-            return json.loads(result)
+            return result, usage
         except Exception as e:
             logger.error(f"Error parsing report: {e}")
-            return self._mock_report_parse(text)
+            return self._mock_report_parse(text), usage
+
+    def _extract_report_chunks(self, chunks: List[str], usage: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Map step: extracts each chunk on a bounded pool, keeping document order. Failed chunks are skipped."""
+        def extract(indexed):
+            index, chunk = indexed
+            return self._cached_json_completion(
+                "report_chunk", self.REPORT_CHUNK_PROMPT_VERSION, self._REPORT_CHUNK_SYSTEM_PROMPT,
+                f"Section {index + 1} of {len(chunks)}:\n{chunk}", temperature=0.2, usage=usage
+            )
+
+        extracts = []
+        with ThreadPoolExecutor(max_workers=min(self.map_workers, len(chunks))) as pool:
+            futures = [pool.submit(extract, item) for item in enumerate(chunks)]
+            for index, future in enumerate(futures):
+                try:
+                    extracts.append(dict(future.result(), section=index + 1))
+                except Exception as e:
+                    logger.warning(f"Report chunk {index + 1}/{len(chunks)} extraction failed: {e}")
+        if not extracts:
+            raise RuntimeError("every report chunk failed to extract")
+        return extracts
 
     def analyze_video(self, title: str, description: str, transcript: str = "") -> Dict[str, str]:
         """Classifies a video's tone, topic, and education level."""
@@ -66,17 +218,10 @@ Return JSON ONLY with these fields:
 - transcript_summary: 영상의 핵심 메시지를 2문장 내외의 한국어로 요약
 """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Title: {title}\nDesc: {description}\nTranscript: {transcript[:10000]}"}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2
+            return self._cached_json_completion(
+                "video", self.VIDEO_PROMPT_VERSION, system_prompt,
+                f"Title: {title}\nDesc: {description}\nTranscript: {self.text_prep.fit(transcript)}", temperature=0.2
             )
-            result = response.choices[0].message.content
-            return json.loads(result)
         except Exception as e:
             logger.error(f"Error analyzing video: {e}")
             return self._mock_video_parse(title)
@@ -97,27 +242,16 @@ Routine Type: {routine_type}
 Target Segment: {segment}
 Delivery Priority: {delivery_mode}
 
-Tone Rules:
-- S1/Novice: 친절하고 교육적이며 정중한 어조. 전문 용어 지양.
-- S4/Expert: 간결하고 데이터 중심적이며 행동 중심적인 전략적 어조.
-- 공통: 전문성을 유지하면서도 친근해야 함. 직접적인 투자 권유(Sell/Buy)가 아닌, 정보를 공유하고 소통을 유도하는 형태여야 함. 반드시 한국어로 답변할 것.
-
+{self._DRAFT_TONE_RULES}
 Return JSON ONLY with these fields:
-- pb_summary: PB가 상황을 빨리 파악할 수 있도록 3줄 내외 한국어 요약.
-- pb_talking_points: PB가 고객과 통화할 때 사용할 수 있는 불렛 포인트 (한국어).
-- client_message_draft: 고객에게 보낼 카카오톡/문자 메시지 실제 본문 초안. 
-  CRITICAL: 
-  1. 제공된 Video Details가 비어있다면 영상에 대해 절대 언급하지 말고 [영상 링크]도 포함하지 마십시오.
-  2. 영상이 있는 경우에만 [영상 링크]라는 텍스트를 메시지 적절한 위치에 포함하십시오.
-  3. 리포트와 영상을 자연스럽게 결합하되, 하나가 결여된 경우 나머지 하나에 집중하십시오. (한국어)
-"""
+{self._DRAFT_FIELD_RULES}"""
         prompt_content = f"""
 Report Details: {json.dumps(report_data, ensure_ascii=False)}
 Video Details: {json.dumps(video_data, ensure_ascii=False)}
 """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._create_completion(
+                "draft",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt_content}
@@ -130,6 +264,108 @@ Video Details: {json.dumps(video_data, ensure_ascii=False)}
             logger.error(f"Error generating PB draft: {e}")
             return self._mock_draft(video_present=bool(video_data))
 
+    def generate_pb_drafts_batch(self,
+                                 routine_type: str,
+                                 targets: List[Tuple[str, str]],
+                                 report_data: Dict,
+                                 video_data: Dict) -> List[Optional[Dict[str, str]]]:
+        """
+        Generates drafts for several (segment, delivery_mode) targets in one structured-output request,
+        so the report and video JSON are sent once. Each returned draft is validated against its target;
+        missing or malformed entries (every entry, if the batch failed) are None, for the caller to draft
+        separately with generate_pb_draft (DraftGenerator does so concurrently).
+        """
+        if not self.client:
+            return [self._mock_draft(video_present=bool(video_data)) for _ in targets]
+        if len(targets) <= 1:
+            return [
+                self.generate_pb_draft(routine_type, segment, report_data, video_data, delivery_mode)
+                for segment, delivery_mode in targets
+            ]
+
+        target_lines = "\n".join(
+            f"- index {i}: Target Segment: {segment}, Delivery Priority: {delivery_mode}"
+            for i, (segment, delivery_mode) in enumerate(targets)
+        )
+        system_prompt = f"""You are a master Private Banker (PB) at Mirae Asset Securities. Always respond in KOREAN.
+Your task is to draft messages and talking points for several client segments based on a research report and a SmartMoney video.
+Write one separate draft per target below; each draft must follow the tone of its own segment.
+Routine Type: {routine_type}
+Targets:
+{target_lines}
+
+{self._DRAFT_TONE_RULES}
+Return JSON ONLY as {{"drafts": [...]}} with exactly one object per target, each with these fields:
+- index (integer): 위 Targets 목록의 index.
+- segment (string): 해당 Target Segment (그대로).
+- delivery_mode (string): 해당 Delivery Priority (그대로).
+{self._DRAFT_FIELD_RULES}"""
+        prompt_content = f"""
+Report Details: {json.dumps(report_data, ensure_ascii=False)}
+Video Details: {json.dumps(video_data, ensure_ascii=False)}
+"""
+        draft_schema = {
+            "type": "object",
+            "properties": {
+                "index": {"type": "integer"},
+                "segment": {"type": "string"},
+                "delivery_mode": {"type": "string"},
+                **{field: {"type": "string"} for field in self.DRAFT_FIELDS}
+            },
+            "required": ["index", "segment", "delivery_mode", *self.DRAFT_FIELDS],
+            "additionalProperties": False
+        }
+        drafts: Dict[int, Dict[str, str]] = {}
+        try:
+            response = self._create_completion(
+                "draft_batch",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt_content}
+                ],
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "pb_drafts",
+                        "strict": True,
+                        "schema": {
+                            "type": "object",
+                            "properties": {"drafts": {"type": "array", "items": draft_schema}},
+                            "required": ["drafts"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                temperature=0.4
+            )
+            payload = json.loads(response.choices[0].message.content)
+            for item in payload.get("drafts", []) if isinstance(payload, dict) else []:
+                index = item.get("index") if isinstance(item, dict) else None
+                if isinstance(index, int) and 0 <= index < len(targets) and index not in drafts \
+                        and self._is_valid_draft(item, targets[index], bool(video_data)):
+                    drafts[index] = {field: item[field] for field in self.DRAFT_FIELDS}
+        except Exception as e:
+            logger.error(f"Error generating batched PB drafts: {e}")
+
+        for index, (segment, delivery_mode) in enumerate(targets):
+            if index not in drafts:
+                logger.warning(f"Batched draft for {segment}/{delivery_mode} missing or malformed; to be drafted separately.")
+        return [drafts.get(index) for index in range(len(targets))]
+
+    def _is_valid_draft(self, item: Dict[str, Any], target: Tuple[str, str], video_present: bool) -> bool:
+        """A batched draft must answer its own target and carry every field."""
+        segment, delivery_mode = target
+        if item.get("segment") != segment or item.get("delivery_mode") != delivery_mode:
+            return False
+        for field in self.DRAFT_FIELDS:
+            value = item.get(field)
+            if not isinstance(value, (str, list)) or not value:
+                return False
+        # Without a video the message must not point to one
+        if not video_present and "[영상 링크]" in str(item.get("client_message_draft")):
+            return False
+        return True
+
     # --- Mocks for fallback ---
     def _mock_report_parse(self, text: str) -> Dict:
         return {
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterable
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    Persistent content-addressed cache for model results.
+    Entries are keyed on a hash of (model, kind, prompt version, input text) and stored in SQLite,
+    which gives atomic writes and locking that is safe across threads and worker processes.
+    Entries expire after a TTL and the least recently used ones are evicted past max_entries.
+    """
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.db_path = db_path or os.environ.get("AI_CACHE_PATH", "data/ai_cache.sqlite3")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.environ.get("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("AI_CACHE_MAX_ENTRIES", "5000"))
+        self.hits = 0
+        self.misses = 0
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_kind_version ON results (kind, prompt_version)")
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps the cache usable from any thread;
+        # WAL + busy timeout let several processes read and write concurrently.
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model: str, kind: str, prompt_version: str, input_text: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, kind, prompt_version, input_text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached result, or None on a miss or an expired entry."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    record_cache("ai_result", False)
+                    return None
+                value, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self.misses += 1
+                    record_cache("ai_result", False)
+                    return None
+                conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            record_cache("ai_result", True)
+            return json.loads(value)
+        except Exception as e:
+            logger.warning(f"AI result cache read failed: {e}")
+            self.misses += 1
+            record_cache("ai_result", False)
+            return None
+
+    def put(self, key: str, kind: str, prompt_version: str, value: Dict[str, Any]):
+        """Stores a result and evicts the least recently used entries beyond max_entries."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, kind, prompt_version, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, prompt_version, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                conn.execute("COMMIT")
+        except Exception as e:
+            logger.warning(f"AI result cache write failed: {e}")
+
+    def invalidate(self, kind: Optional[str] = None, keep_versions: Optional[Iterable[str]] = None) -> int:
+        """
+        Deletes cached results. With kind only, drops every entry of that kind;
+        with keep_versions, drops only entries produced by other prompt versions.
+        Without arguments, clears the whole cache.
+        """
+        query = "DELETE FROM results"
+        clauses, params = [], []
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if keep_versions is not None:
+            versions = list(keep_versions)
+            clauses.append(f"prompt_version NOT IN ({', '.join('?' for _ in versions)})")
+            params.extend(versions)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount
+
+    def purge_expired(self) -> int:
+        """Deletes entries older than the TTL."""
+        if not self.ttl_seconds:
+            return 0
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+
+if __name__ == "__main__":
+    import sys
+    cache = ResultCache()
+    if "--clear" in sys.argv:
+        print(f"Removed {cache.invalidate()} cached results from {cache.db_path}")
+    else:
+        print(f"Removed {cache.purge_expired()} expired results from {cache.db_path}")
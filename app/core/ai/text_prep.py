@@ -0,0 +1,216 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_HANGUL_RE = re.compile(r"[가-힣㄰-㆏]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?。])\s+")
+
+# Compliance and disclaimer lines that every broker report repeats; they carry no thesis
+_BOILERPLATE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"compliance\s*notice",
+    r"disclaimer",
+    r"투자\s*판단의\s*최종\s*책임",
+    r"법적\s*(책임|분쟁)",
+    r"무단\s*(복제|배포|전재|변형)",
+    r"외부의\s*부당한\s*압력",
+    r"작성자의\s*의견이\s*정확하게\s*반영",
+    r"당사는\s*.*(보유|관여|제공|참여)하고\s*있지\s*않습니다",
+    r"증빙자료로\s*사용될\s*수\s*없",
+)]
+
+# Page numbers ("3", "- 3 -", "3 / 12"); only looked for at page edges, since a bare number
+# inside a page is usually a table cell
+_PAGE_NUMBER_RE = re.compile(r"^[-–]?\s*(\d+)\s*[-–]?$|^(\d+)\s*/\s*\d+$")
+_DIGITS_RE = re.compile(r"\d+")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+# Non-empty lines at the top and at the bottom of a page that may be a running header/footer
+_EDGE_LINES = 2
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed. Otherwise it estimates: Hangul tokenizes at
+    roughly one token per syllable, while other text averages about four characters per token.
+    """
+    def __init__(self, model: Optional[str] = None):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+            except Exception:
+                try:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        hangul = len(_HANGUL_RE.findall(text))
+        other = len(text) - hangul
+        return hangul + (other + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cuts text to at most max_tokens, on a token boundary when exact, else by estimate."""
+        if self.count(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            head = self._encoding.decode(self._encoding.encode(text, disallowed_special=())[:max_tokens])
+            # A cut inside a multi-byte character decodes to a replacement char; keep a clean prefix
+            while head and not text.startswith(head):
+                head = head[:-1]
+            return head
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.count(text[:mid]) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        return text[:lo]
+
+def _split_pages(text: str, page_offsets: Optional[List[int]]) -> List[Tuple[bool, List[str]]]:
+    """(is_pdf_page, stripped lines) per section: the text before the first page offset, then each page."""
+    bounds = [offset for offset in (page_offsets or []) if 0 <= offset <= len(text)]
+    starts = [0] + bounds
+    ends = bounds + [len(text)]
+    sections = []
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        if index == 0 and start == end:
+            continue
+        sections.append((index > 0, [line.strip() for line in text[start:end].splitlines()]))
+    return sections
+
+def _edge_indices(lines: List[str]) -> List[int]:
+    filled = [i for i, line in enumerate(lines) if line]
+    return sorted(set(filled[:_EDGE_LINES] + filled[-_EDGE_LINES:]))
+
+def _is_page_number(line: str, page_count: int) -> bool:
+    # A number larger than the page count is a figure (e.g. a year), not a page number
+    match = _PAGE_NUMBER_RE.match(line)
+    return bool(match) and int(match.group(1) or match.group(2)) <= page_count + 2
+
+def strip_boilerplate(text: str, page_offsets: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Extractive pre-filter: drops disclaimer and compliance lines and consecutive duplicate text lines.
+    With page_offsets (where each PDF page starts in text), it also drops page numbers and running
+    headers/footers: lines at the top or bottom of a page that recur, digits aside, at the edges of at
+    least half the pages (and at least three). Lines inside a page are never dropped for being numeric
+    or repeated, so tables survive. Returns {"text", "removed_lines"}.
+    """
+    sections = _split_pages(text or "", page_offsets)
+    pages = [lines for is_page, lines in sections if is_page]
+    edge_counts: Counter = Counter()
+    for lines in pages:
+        edge_counts.update({_DIGITS_RE.sub("#", lines[i]) for i in _edge_indices(lines) if _LETTER_RE.search(lines[i])})
+    repeated = {line for line, n in edge_counts.items() if n >= max(3, (len(pages) + 1) // 2)}
+
+    kept, removed, previous = [], 0, None
+    for is_page, lines in sections:
+        edges = set(_edge_indices(lines)) if is_page else set()
+        for index, line in enumerate(lines):
+            drop = bool(line) and (
+                any(p.search(line) for p in _BOILERPLATE_PATTERNS)
+                or (line == previous and _LETTER_RE.search(line) is not None)
+                or (index in edges and (_is_page_number(line, len(pages)) or _DIGITS_RE.sub("#", line) in repeated))
+            )
+            if drop:
+                removed += 1
+                continue
+            if line or (kept and kept[-1]):
+                kept.append(line)
+            previous = line
+    return {"text": "\n".join(kept).strip(), "removed_lines": removed}
+
+def chunk_text(text: str, max_tokens: int, counter: TokenCounter) -> List[str]:
+    """
+    Packs paragraphs into chunks of at most max_tokens. Oversized paragraphs are split on
+    sentence boundaries, and oversized sentences are cut by tokens.
+    """
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if counter.count(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            sentence = sentence.strip()
+            while sentence:
+                head = counter.truncate(sentence, max_tokens)
+                if not head:
+                    break
+                pieces.append(head)
+                sentence = sentence[len(head):].strip()
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = counter.count(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+class TextPreparer:
+    """
+    Token-budgeted preprocessing for model inputs. Text is pre-filtered. If it then fits the per-call
+    budget it goes out as one input; otherwise it is split into budget-sized chunks for map-reduce.
+    Environment: AI_INPUT_TOKEN_BUDGET (tokens of document text per call), AI_MAX_CHUNKS.
+    """
+    def __init__(self, token_budget: Optional[int] = None, max_chunks: Optional[int] = None, model: Optional[str] = None):
+        self.token_budget = token_budget or int(os.environ.get("AI_INPUT_TOKEN_BUDGET", "6000"))
+        self.max_chunks = max_chunks or int(os.environ.get("AI_MAX_CHUNKS", "8"))
+        self.counter = TokenCounter(model)
+
+    def prepare(self, text: str, page_offsets: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Returns {"text", "chunks", "stats"}. chunks holds one entry when the cleaned text fits the budget.
+        page_offsets (ResearchReport.page_offsets) lets page headers, footers and numbers be dropped.
+        When a report exceeds max_chunks, the head chunks and the final chunk are kept, because that is
+        where the conclusions usually are.
+        """
+        original_tokens = self.counter.count(text or "")
+        filtered = strip_boilerplate(text or "", page_offsets)
+        cleaned = filtered["text"]
+        cleaned_tokens = self.counter.count(cleaned)
+
+        if cleaned_tokens <= self.token_budget:
+            chunks = [cleaned]
+        else:
+            chunks = chunk_text(cleaned, self.token_budget, self.counter)
+        dropped = 0
+        if len(chunks) > self.max_chunks:
+            dropped = len(chunks) - self.max_chunks
+            chunks = chunks[:self.max_chunks - 1] + chunks[-1:]
+
+        stats = {
+            "original_tokens": original_tokens,
+            "input_tokens": sum(self.counter.count(c) for c in chunks),
+            "boilerplate_lines_removed": filtered["removed_lines"],
+            "chunks": len(chunks),
+            "chunks_dropped": dropped,
+            "token_count_exact": self.counter.exact,
+        }
+        return {"text": cleaned, "chunks": chunks, "stats": stats}
+
+    def fit(self, text: str, max_tokens: Optional[int] = None) -> str:
+        """Pre-filters text and cuts it to the budget (for inputs that don't need full coverage)."""
+        return self.counter.truncate(strip_boilerplate(text or "")["text"], max_tokens or self.token_budget)
@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple, Iterator
+from app.core.ai.openai_engine import OpenAIEngine
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+class DraftGenerator:
+    """
+    Draft-generation layer between the router and the AI engine.
+    generate_pb_draft only depends on (routine_type, segment, report_data, video_data, delivery_mode),
+    so customers are grouped by that prompt signature and the model is called once per unique signature.
+    With batching enabled, all unique signatures of a bundle are drafted in a single batched request.
+    """
+    def __init__(self, ai_engine: OpenAIEngine, max_workers: Optional[int] = None, batch: Optional[bool] = None):
+        self.ai = ai_engine
+        if batch is None:
+            batch = os.environ.get("DRAFT_BATCH_ENABLED", "1") == "1"
+        self.batch = batch
+        # Unique calls are network-bound, so a bounded thread pool overlaps them.
+        # max_workers=1 keeps strictly sequential calls.
+        if max_workers is None:
+            max_workers = int(os.environ.get("DRAFT_MAX_WORKERS", "4"))
+        self.max_workers = max(1, max_workers)
+
+    @staticmethod
+    def prompt_signature(routine_type: str, segment: str, report_data: Dict, video_data: Dict, delivery_mode: str) -> str:
+        """Stable hash of every input that reaches the drafting prompt."""
+        payload = json.dumps(
+            [routine_type, segment, report_data, video_data, delivery_mode],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _group(self, routine_type: str, targets: List[Tuple[str, str]], report_data: Dict, video_data: Dict):
+        """Returns each target's signature and the first target seen per signature (the one sent to the model)."""
+        signatures = [
+            self.prompt_signature(routine_type, segment, report_data, video_data, delivery_mode)
+            for segment, delivery_mode in targets
+        ]
+        unique: Dict[str, Tuple[str, str]] = {}
+        for signature, target in zip(signatures, targets):
+            unique.setdefault(signature, target)
+        return signatures, unique
+
+    def _call(self, routine_type: str, target: Tuple[str, str], report_data: Dict, video_data: Dict) -> Dict:
+        segment, delivery_mode = target
+        return self.ai.generate_pb_draft(
+            routine_type=routine_type,
+            segment=segment,
+            report_data=report_data,
+            video_data=video_data,
+            delivery_mode=delivery_mode
+        )
+
+    @staticmethod
+    def _stats(targets: List, unique: Dict, results: Dict, batched: bool) -> Dict[str, int]:
+        stats = {
+            "requests": len(targets),
+            "misses": len(unique),
+            "hits": len(targets) - len(unique),
+            "failures": sum(1 for r in results.values() if r is None),
+            "batched": int(batched)
+        }
+        record_cache("draft_signature", True, stats["hits"])
+        record_cache("draft_signature", False, stats["misses"])
+        logger.info(f"Draft generation: {stats['misses']} drafts for {stats['requests']} customers ({stats['hits']} reused, batched={batched})")
+        return stats
+
+    def generate(self,
+                 routine_type: str,
+                 targets: List[Tuple[str, str]],
+                 report_data: Dict,
+                 video_data: Dict) -> Tuple[List[Optional[Dict]], Dict[str, int]]:
+        """
+        Generates one draft response per (segment, delivery_mode) target, in input order.
+        Returns the responses (None where generation failed) and hit/miss stats for the run.
+        """
+        signatures, unique = self._group(routine_type, targets, report_data, video_data)
+
+        results: Dict[str, Optional[Dict]] = {}
+        items = list(unique.items())
+        batched = False
+        if self.batch and len(items) > 1:
+            try:
+                responses = self.ai.generate_pb_drafts_batch(
+                    routine_type, [target for _, target in items], report_data, video_data
+                )
+                results = {signature: response for (signature, _), response in zip(items, responses) if response is not None}
+                batched = True
+            except Exception as e:
+                logger.error(f"Batched draft generation failed, drafting per segment: {e}")
+
+        # Everything the batch did not answer (all of it, without a batch) is drafted per segment on the pool
+        missing = [(signature, target) for signature, target in items if signature not in results]
+        for signature, response in self._iter_calls(routine_type, missing, report_data, video_data):
+            results[signature] = response
+
+        stats = self._stats(targets, unique, results, batched)
+        return [results[signature] for signature in signatures], stats
+
+    def iter_generate(self,
+                      routine_type: str,
+                      targets: List[Tuple[str, str]],
+                      report_data: Dict,
+                      video_data: Dict,
+                      stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple[List[int], Optional[Dict]]]:
+        """
+        Streaming variant of generate: yields (target positions, response) as each unique signature
+        finishes. Calls are submitted in target order, so callers that pass targets highest priority
+        first get those drafts first where the model allows. Drafts are never batched here: a batch
+        would hold every draft back until the slowest segment is written.
+        stats, if given, is filled in once the generator is exhausted.
+        """
+        signatures, unique = self._group(routine_type, targets, report_data, video_data)
+        positions: Dict[str, List[int]] = {}
+        for position, signature in enumerate(signatures):
+            positions.setdefault(signature, []).append(position)
+
+        results: Dict[str, Optional[Dict]] = {}
+        for signature, response in self._iter_calls(routine_type, list(unique.items()), report_data, video_data, ordered=False):
+            results[signature] = response
+            yield positions[signature], response
+
+        if stats is not None:
+            stats.update(self._stats(targets, unique, results, False))
+
+    def _iter_calls(self, routine_type: str, items: List[Tuple[str, Tuple[str, str]]], report_data: Dict, video_data: Dict,
+                    ordered: bool = True) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """Runs one model call per (signature, target); yields (signature, response or None) in order or as completed."""
+        if self.max_workers == 1 or len(items) <= 1:
+            for signature, target in items:
+                try:
+                    yield signature, self._call(routine_type, target, report_data, video_data)
+                except Exception as e:
+                    logger.error(f"Draft generation failed for {target}: {e}")
+                    yield signature, None
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            futures = {
+                pool.submit(self._call, routine_type, target, report_data, video_data): (signature, target)
+                for signature, target in items
+            }
+            for future in (futures if ordered else as_completed(futures)):
+                signature, target = futures[future]
+                try:
+                    yield signature, future.result()
+                except Exception as e:
+                    logger.error(f"Draft generation failed for {target}: {e}")
+                    yield signature, None
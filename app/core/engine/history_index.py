@@ -0,0 +1,103 @@
+import heapq
+import threading
+from datetime import datetime
+from typing import List, Dict, Set, Optional, Tuple, Iterable
+from app.models.resources import ResearchReport
+
+class ReportHistoryIndex:
+    """
+    In-memory history of reports for matching, deduplicated by report_id.
+    Keeps an inverted tag -> report_id posting index so a query only touches reports sharing a tag,
+    and bounds memory by evicting the oldest reports (by report date) past max_entries.
+    """
+    def __init__(self, max_entries: int = 10000, half_life_days: Optional[float] = None):
+        self.max_entries = max_entries
+        self.half_life_days = half_life_days
+        self._reports: Dict[str, ResearchReport] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # (date, report_id) min-heap for eviction; entries of re-added reports are skipped lazily
+        self._age_heap: List[Tuple[datetime, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def __contains__(self, report_id: str) -> bool:
+        return report_id in self._reports
+
+    def get(self, report_id: str) -> Optional[ResearchReport]:
+        return self._reports.get(report_id)
+
+    def add(self, reports: Iterable[ResearchReport]):
+        """Adds or re-indexes reports. Re-adding a known report_id replaces it (e.g. after tagging)."""
+        with self._lock:
+            for report in reports:
+                known = self._reports.get(report.report_id)
+                if known is not None and known.date != report.date:
+                    # Keep the eviction heap consistent with the stored date
+                    self._remove(report.report_id)
+                    known = None
+                self._unindex(report.report_id)
+                self._reports[report.report_id] = report
+                tags = set(report.tags or [])
+                self._tags[report.report_id] = tags
+                for tag in tags:
+                    self._postings.setdefault(tag, set()).add(report.report_id)
+                if known is None:
+                    heapq.heappush(self._age_heap, (report.date, report.report_id))
+            self._evict()
+
+    def remove(self, report_id: str):
+        with self._lock:
+            self._remove(report_id)
+
+    def _remove(self, report_id: str):
+        self._unindex(report_id)
+        self._reports.pop(report_id, None)
+
+    def _unindex(self, report_id: str):
+        for tag in self._tags.pop(report_id, ()):
+            posting = self._postings.get(tag)
+            if posting is not None:
+                posting.discard(report_id)
+                if not posting:
+                    del self._postings[tag]
+
+    def _evict(self):
+        while len(self._reports) > self.max_entries and self._age_heap:
+            date, report_id = heapq.heappop(self._age_heap)
+            report = self._reports.get(report_id)
+            if report is not None and report.date == date:
+                self._remove(report_id)
+
+    def search(self,
+               query_tags: List[str],
+               top_k: int = 5,
+               half_life_days: Optional[float] = None,
+               now: Optional[datetime] = None) -> List[Tuple[ResearchReport, float]]:
+        """
+        Returns up to top_k (report, score) pairs, best first. The score is the number of shared tags,
+        optionally multiplied by an exponential recency decay with the given half-life in days.
+        """
+        half_life = half_life_days if half_life_days is not None else self.half_life_days
+        with self._lock:
+            overlap: Dict[str, int] = {}
+            for tag in set(query_tags or []):
+                for report_id in self._postings.get(tag, ()):
+                    overlap[report_id] = overlap.get(report_id, 0) + 1
+            candidates = [(self._reports[report_id], count) for report_id, count in overlap.items()]
+
+        if half_life:
+            now = now or datetime.now()
+        scored = []
+        for report, count in candidates:
+            score = float(count)
+            if half_life:
+                age_days = max((now - report.date.replace(tzinfo=None)).total_seconds() / 86400, 0.0)
+                score *= 0.5 ** (age_days / half_life)
+            scored.append((score, report.date.replace(tzinfo=None), report.report_id, report))
+
+        # Ties go to the newer report, then to the report_id, so results are deterministic
+        best = heapq.nlargest(top_k, scored, key=lambda x: (x[0], x[1], x[2]))
+        return [(report, score) for score, _, _, report in best]
@@ -1,9 +1,11 @@
-import json
+import os
 import logging
-import uuid
-from typing import List, Dict, Optional
+import hashlib
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from app.models.resources import ResearchReport, SmartMoneyVideo, HybridContentBundle
+from app.core.engine.history_index import ReportHistoryIndex
+from app.core.engine.vector_index import VectorIndex, np
 
 logger = logging.getLogger(__name__)
 
@@ -11,32 +13,69 @@ class ContentMatcher:
     def __init__(self, ai_engine):
         self.ai_engine = ai_engine
         # In a real system, this would be a connection to ChromaDB or Pinecone.
-        # For Stage 1 mock, we keep an in-memory history of 'embedded' reports.
-        self.historical_reports_db: List[ResearchReport] = []
+        # For Stage 1 mock, we keep an in-memory, tag-indexed history of 'embedded' reports.
+        half_life = os.environ.get("HISTORY_HALF_LIFE_DAYS")
+        self.history = ReportHistoryIndex(
+            max_entries=int(os.environ.get("HISTORY_MAX_ENTRIES", "10000")),
+            half_life_days=float(half_life) if half_life else None
+        )
+        # Local embedding index over report titles and texts (no network); needs numpy
+        self.vectors: Optional[VectorIndex] = None
+        if np is not None:
+            try:
+                self.vectors = VectorIndex(
+                    path_prefix=os.environ.get("VECTOR_INDEX_PATH", "data/vectors/reports"),
+                    dim=int(os.environ.get("VECTOR_DIM", "512"))
+                )
+            except Exception as e:
+                logger.warning(f"Vector index disabled: {e}")
+        else:
+            logger.warning("numpy not installed. Similarity search falls back to tag overlap.")
         
     def add_to_history(self, reports: List[ResearchReport]):
-        self.historical_reports_db.extend(reports)
+        """Adds reports to the history; known report_ids are re-indexed instead of duplicated."""
+        self.history.add(reports)
+        if self.vectors is not None:
+            self.vectors.add([(r.report_id, self._embedding_text(r)) for r in reports])
+
+    @staticmethod
+    def _embedding_text(report: ResearchReport) -> str:
+        # The title is repeated so short, title-only reports still weigh their headline
+        return f"{report.title}\n{report.title}\n{report.normalized_text}"
 
     def search_historical_reports(self, query_tags: List[str]) -> Optional[ResearchReport]:
         """Mock Vector Search: Finds a past report matching the current momentum tags."""
-        best_match = None
-        best_score = 0
-        
-        for report in self.historical_reports_db:
-            score = len(set(report.tags).intersection(set(query_tags)))
-            if score > best_score:
-                best_score = score
-                best_match = report
-                
         # Return if there's a strong enough keyword overlap (mocking vector similarity > 0.7)
-        return best_match if best_score > 0 else None
+        matches = self.search_historical_reports_top_k(query_tags, top_k=1)
+        return matches[0] if matches else None
+
+    def search_historical_reports_top_k(self, query_tags: List[str], top_k: int = 5) -> List[ResearchReport]:
+        """Returns up to top_k past reports ranked by tag overlap (and recency, if decay is configured)."""
+        return [report for report, score in self.history.search(query_tags, top_k=top_k) if score > 0]
+
+    def search_similar_reports(self, query_text: str, top_k: int = 5) -> List[Tuple[ResearchReport, float]]:
+        """Top-k past reports by embedding cosine similarity to the query text."""
+        return self.search_similar_reports_batch([query_text], top_k=top_k)[0]
+
+    def search_similar_reports_batch(self, query_texts: List[str], top_k: int = 5) -> List[List[Tuple[ResearchReport, float]]]:
+        """Batched similarity search; falls back to tag overlap on the query words without numpy."""
+        if self.vectors is None:
+            return [self.history.search(text.split(), top_k=top_k) for text in query_texts]
+        results = []
+        for hits in self.vectors.search_batch(query_texts, top_k=top_k):
+            # Reports evicted from the in-memory history are skipped
+            results.append([(self.history.get(report_id), score) for report_id, score in hits if report_id in self.history])
+        return results
 
     def create_hybrid_bundle(self, 
                              report: Optional[ResearchReport], 
                              video: Optional[SmartMoneyVideo], 
                              routine_type: str) -> HybridContentBundle:
         """Matches a report and a video to create a bundle."""
-        bundle_id = f"bndl_{uuid.uuid4().hex[:8]}"
+        # Same routine over the same report and video -> same bundle id, so a refresh that picks the same
+        # contents leaves the pending actions of that bundle in the action queues untouched
+        content_key = f"{routine_type}|{report.report_id if report else ''}|{video.video_id if video else ''}"
+        bundle_id = "bndl_" + hashlib.sha1(content_key.encode("utf-8")).hexdigest()[:12]
         
         # 1. Matching Reason (Korean)
         if report and video:
@@ -67,6 +106,8 @@ class ContentMatcher:
         elif routine_type == "Routine B: Biweekly Deep":
             urgency = "Medium"
             recommended_cta = "리포트 요약본을 읽고 포트폴리오 영향도를 PB와 상담하세요."
+        elif routine_type == "Routine C: Weekend Theme":
+            recommended_cta = "주말 동안 영상으로 테마를 익히고, 관련 리포트로 투자 아이디어를 점검해 보세요."
         elif routine_type == "Routine D: Educational":
             urgency = "Low"
             recommended_cta = "부담 없이 시청/정독하며 투자 시야를 넓혀보세요."
@@ -1,11 +1,73 @@
-import uuid
-from typing import List, Dict
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Optional, Tuple, Iterator, Union, NamedTuple, FrozenSet
 from app.models.resources import CustomerProfile, HybridContentBundle, PBActionDraft
 from app.core.ai.openai_engine import OpenAIEngine
+from app.core.engine.drafter import DraftGenerator
+from app.core.storage.customer_book import CustomerBook, np
+
+logger = logging.getLogger(__name__)
+
+class RoutingRule(NamedTuple):
+    """
+    A customer matches when its segment is in segments or it carries any of modifiers; a rule with
+    neither matches everyone. Rules of a routine are tried in order and the first match wins.
+    """
+    delivery_mode: str
+    priority: int
+    segments: FrozenSet[str] = frozenset()
+    modifiers: FrozenSet[str] = frozenset()
+
+    def matches(self, customer: CustomerProfile) -> bool:
+        if not self.segments and not self.modifiers:
+            return True
+        return customer.segment_id in self.segments or any(m in self.modifiers for m in customer.modifiers)
+
+    def mask(self, book: CustomerBook) -> "np.ndarray":
+        if not self.segments and not self.modifiers:
+            return np.ones(len(book), dtype=bool)
+        return book.segment_ids.isin(self.segments) | book.has_any_modifier(self.modifiers)
+
+# Segment applicability per routine; customers matching no rule get no draft.
+# Shared by the per-customer path and the vectorized path over a CustomerBook.
+ROUTING_RULES: Dict[str, List[RoutingRule]] = {
+    # Morning is broad: active segments first, video for the less experienced ones
+    "Routine A: Daily Morning": [
+        RoutingRule("Video-First", 5, segments=frozenset({"S2"})),
+        RoutingRule("Text-First", 5, segments=frozenset({"S4"})),
+        RoutingRule("Video-First", 2, segments=frozenset({"S1"})),
+        RoutingRule("Text-First", 2),
+    ],
+    "Routine B: Biweekly Deep": [
+        RoutingRule("Text-First", 8, segments=frozenset({"S3", "S4"})),
+    ],
+    # Weekend themes: the active investors and the all-routine segment
+    "Routine C: Weekend Theme": [
+        RoutingRule("Video-First", 4, segments=frozenset({"S2"})),
+        RoutingRule("Text-First", 4, segments=frozenset({"S4"})),
+    ],
+    "Routine D: Educational": [
+        RoutingRule("Video-First", 3, segments=frozenset({"S1"}), modifiers=frozenset({"Novice"})),
+    ],
+}
+DEFAULT_ROUTING_RULES = [RoutingRule("Hybrid", 1)]
 
 class SegmentRouter:
-    def __init__(self, ai_engine: OpenAIEngine):
+    def __init__(self, ai_engine: OpenAIEngine, max_workers: Optional[int] = None):
         self.ai = ai_engine
+        self.drafter = DraftGenerator(ai_engine, max_workers=max_workers)
+        # Routines may route concurrently, so draft stats are kept per thread
+        self._local = threading.local()
+
+    @property
+    def last_draft_stats(self) -> Dict[str, int]:
+        """Hit/miss counts of this thread's last route_and_draft call (for the audit record)."""
+        return getattr(self._local, "draft_stats", {})
+
+    @last_draft_stats.setter
+    def last_draft_stats(self, stats: Dict[str, int]):
+        self._local.draft_stats = stats
         
     def get_mock_customers(self) -> List[CustomerProfile]:
         """Returns mock customers for testing Stage 1 logic without CRM."""
@@ -44,76 +106,194 @@ class SegmentRouter:
             )
         ]
 
-    def route_and_draft(self, bundle: HybridContentBundle, customers: List[CustomerProfile], report_data: Dict, video_data: Dict) -> List[PBActionDraft]:
-        """Determines applicability and generates drafts for appropriate segments."""
-        drafts = []
+    def _route_customer(self, bundle: HybridContentBundle, customer: CustomerProfile) -> Tuple[bool, str, int]:
+        """Simple rule-based logic for Segment Applicability. Returns (is_applicable, delivery_mode, priority)."""
+        for rule in ROUTING_RULES.get(bundle.routine_type, DEFAULT_ROUTING_RULES):
+            if rule.matches(customer):
+                return True, rule.delivery_mode, rule.priority
+        return False, "Hybrid", 0
+
+    def _route_book(self, bundle: HybridContentBundle, book: CustomerBook) -> Tuple["np.ndarray", List[str], "np.ndarray", "np.ndarray"]:
+        """
+        Vectorized _route_customer over a whole book. Returns (rows, delivery modes, rule index per row,
+        priority per row) for applicable customers only, ordered by priority descending (stable, so
+        equal priorities keep book order). Also records the bundle's target segments.
+        """
+        rules = ROUTING_RULES.get(bundle.routine_type, DEFAULT_ROUTING_RULES)
+        assigned = np.full(len(book), -1, dtype=np.int16)
+        for index, rule in enumerate(rules):
+            assigned[(assigned < 0) & rule.mask(book)] = index
+        rows = np.flatnonzero(assigned >= 0)
+        rule_of_row = assigned[rows]
+        priorities = np.array([rule.priority for rule in rules], dtype=np.int32)[rule_of_row] if len(rows) else np.zeros(0, dtype=np.int32)
+        order = np.argsort(-priorities, kind="stable")
+        rows, rule_of_row, priorities = rows[order], rule_of_row[order], priorities[order]
+
+        # Segments in first-appearance order of the book, as the per-customer path appends them
+        codes = book.segment_ids.codes[np.sort(rows)]
+        _, first = np.unique(codes, return_index=True)
+        for code in codes[np.sort(first)]:
+            segment = str(book.segment_ids.categories[code])
+            if segment not in bundle.target_segments:
+                bundle.target_segments.append(segment)
+        return rows, [rule.delivery_mode for rule in rules], rule_of_row, priorities
+
+    def _draft_text(self, bundle: HybridContentBundle, draft_resp: Dict) -> Tuple[str, str]:
+        """Normalizes a raw AI draft response into (talking points, client message) for the bundle."""
+        # Handle the case where pb_talking_points might be returned as a list by AI
+        talking_points_raw = draft_resp.get("pb_talking_points", "")
+        if isinstance(talking_points_raw, list):
+            talking_points_str = "\n".join(talking_points_raw)
+        else:
+            talking_points_str = str(talking_points_raw)
         
+        client_message = str(draft_resp.get("client_message_draft", ""))
+        # Replace video link placeholders if they exist
+        if bundle.video_id:
+            video_url = f"https://www.youtube.com/watch?v={bundle.video_id}"
+            client_message = client_message.replace("[영상 링크]", video_url).replace("[Video Link]", video_url)
+        return talking_points_str, client_message
+
+    def _build_draft(self, bundle: HybridContentBundle, customer: CustomerProfile, priority: int, draft_resp: Dict) -> PBActionDraft:
+        """Turns a raw AI draft response into a customer-specific PBActionDraft."""
+        return self._new_draft(bundle, customer.customer_id, priority, self._draft_text(bundle, draft_resp), customer.pb_id)
+
+    def _new_draft(self, bundle: HybridContentBundle, customer_id: str, priority: int, text: Tuple[str, str], pb_id: str = "") -> PBActionDraft:
+        talking_points, client_message = text
+        return PBActionDraft(
+            # Derived from the bundle and customer, so re-routing the same bundle yields the same action ids
+            # (12 hex digits: action ids are unique keys in the persistent action queue)
+            action_id="act_" + hashlib.sha1(f"{bundle.bundle_id}|{customer_id}".encode("utf-8")).hexdigest()[:12],
+            customer_id=customer_id,
+            pb_id=pb_id,
+            bundle_id=bundle.bundle_id,
+            routine_type=bundle.routine_type,
+            outreach_channel="Kakao/SMS",
+            pb_talking_points=talking_points,
+            client_message_draft=client_message,
+            follow_up_priority=priority,
+            traceability=f"Match Reason: {bundle.match_reason}"
+        )
+
+    def _select_targets(self, bundle: HybridContentBundle, customers: List[CustomerProfile]) -> List[Tuple[CustomerProfile, str, int]]:
+        """Applicable customers as (customer, delivery_mode, priority); also records the bundle's target segments."""
+        targets = []
         for customer in customers:
-            # Simple rule-based logic for Segment Applicability
-            is_applicable = False
-            delivery_mode = "Hybrid"
-            priority = 0
-            
-            if bundle.routine_type == "Routine A: Daily Morning":
-                is_applicable = True # Morning is broad
-                priority = 5 if customer.segment_id in ["S2", "S4"] else 2
-                delivery_mode = "Video-First" if customer.segment_id in ["S1", "S2"] else "Text-First"
-                    
-            elif bundle.routine_type == "Routine B: Biweekly Deep":
-                if customer.segment_id in ["S3", "S4"]:
-                    is_applicable = True
-                    priority = 8
-                    delivery_mode = "Text-First"
-                    
-            elif bundle.routine_type == "Routine D: Educational":
-                if "Novice" in customer.modifiers or customer.segment_id == "S1":
-                    is_applicable = True
-                    priority = 3
-                    delivery_mode = "Video-First"
-            else:
-                is_applicable = True
-                priority = 1
-                
+            is_applicable, delivery_mode, priority = self._route_customer(bundle, customer)
             if is_applicable:
-                # Use AI to generate segment-specific PB drafting
-                draft_resp = self.ai.generate_pb_draft(
-                    routine_type=bundle.routine_type,
-                    segment=customer.segment_id,
-                    report_data=report_data,
-                    video_data=video_data,
-                    delivery_mode=delivery_mode
-                )
-                
+                targets.append((customer, delivery_mode, priority))
                 # Assign to bundle's target_segments if not already there
                 if customer.segment_id not in bundle.target_segments:
                     bundle.target_segments.append(customer.segment_id)
+        return targets
+
+    def route_and_draft(self, bundle: HybridContentBundle, customers: Union[List[CustomerProfile], CustomerBook], report_data: Dict, video_data: Dict) -> List[PBActionDraft]:
+        """Determines applicability and generates drafts for appropriate segments."""
+        if isinstance(customers, CustomerBook):
+            return list(self._draft_book(bundle, customers, report_data, video_data, streaming=False))
+            
+        targets = self._select_targets(bundle, customers)
+        
+        # Customers sharing a prompt signature share a single model call
+        responses, self.last_draft_stats = self.drafter.generate(
+            bundle.routine_type,
+            [(customer.segment_id, delivery_mode) for customer, delivery_mode, _ in targets],
+            report_data,
+            video_data
+        )
+        
+        drafts = []
+        for (customer, _, priority), draft_resp in zip(targets, responses):
+            if draft_resp is None:
+                continue
+            drafts.append(self._build_draft(bundle, customer, priority, draft_resp))
                 
-                # Handle the case where pb_talking_points might be returned as a list by AI
-                talking_points_raw = draft_resp.get("pb_talking_points", "")
-                if isinstance(talking_points_raw, list):
-                    talking_points_str = "\n".join(talking_points_raw)
-                else:
-                    talking_points_str = str(talking_points_raw)
-                
-                client_message = str(draft_resp.get("client_message_draft", ""))
-                # Replace video link placeholders if they exist
-                if bundle.video_id:
-                    video_url = f"https://www.youtube.com/watch?v={bundle.video_id}"
-                    client_message = client_message.replace("[영상 링크]", video_url).replace("[Video Link]", video_url)
-                
-                draft = PBActionDraft(
-                    action_id=f"act_{uuid.uuid4().hex[:8]}",
-                    customer_id=customer.customer_id,
-                    bundle_id=bundle.bundle_id,
-                    routine_type=bundle.routine_type,
-                    outreach_channel="Kakao/SMS",
-                    pb_talking_points=talking_points_str,
-                    client_message_draft=client_message,
-                    follow_up_priority=priority,
-                    traceability=f"Match Reason: {bundle.match_reason}"
-                )
-                drafts.append(draft)
-                
-        # Sort drafts by priority descending (Customer Queue ranking)
+        # Sort drafts by priority descending (Customer Queue ranking); the sort is stable,
+        # so customers with equal priority keep their input order.
         drafts.sort(key=lambda x: x.follow_up_priority, reverse=True)
         return drafts
+
+    def iter_route_and_draft(self, bundle: HybridContentBundle, customers: Union[List[CustomerProfile], CustomerBook], report_data: Dict, video_data: Dict) -> Iterator[PBActionDraft]:
+        """
+        Streaming variant of route_and_draft: yields each PBActionDraft as soon as its model call returns.
+        Model calls are issued highest priority first, so the top of the queue usually arrives first,
+        but callers must not rely on the order.
+        """
+        if isinstance(customers, CustomerBook):
+            yield from self._draft_book(bundle, customers, report_data, video_data, streaming=True)
+            return
+            
+        targets = self._select_targets(bundle, customers)
+        targets.sort(key=lambda t: t[2], reverse=True)
+        
+        stats: Dict[str, int] = {}
+        for positions, draft_resp in self.drafter.iter_generate(
+            bundle.routine_type,
+            [(customer.segment_id, delivery_mode) for customer, delivery_mode, _ in targets],
+            report_data,
+            video_data,
+            stats=stats
+        ):
+            if draft_resp is None:
+                continue
+            for position in positions:
+                customer, _, priority = targets[position]
+                yield self._build_draft(bundle, customer, priority, draft_resp)
+        self.last_draft_stats = stats
+
+    def _draft_book(self, bundle: HybridContentBundle, book: CustomerBook, report_data: Dict, video_data: Dict, streaming: bool) -> Iterator[PBActionDraft]:
+        """
+        Routes a CustomerBook with vectorized masks, drafts once per distinct (segment, delivery_mode)
+        and builds PBActionDrafts only for applicable customers that received a draft.
+        Non-streaming output is in queue order (priority descending).
+        """
+        rows, rule_modes, rule_of_row, priorities = self._route_book(bundle, book)
+        segment_codes = book.segment_ids.codes[rows]
+        # One prompt per (segment, rule): rules fix the delivery mode, so this is (segment, delivery_mode)
+        pair_keys = segment_codes.astype(np.int64) * len(rule_modes) + rule_of_row
+        pairs, group_of_row = np.unique(pair_keys, return_inverse=True)
+        targets = [
+            (str(book.segment_ids.categories[key // len(rule_modes)]), rule_modes[key % len(rule_modes)])
+            for key in pairs.tolist()
+        ]
+        # Highest priority group first, for streaming
+        group_priority = np.zeros(len(pairs), dtype=np.int32)
+        group_priority[group_of_row] = priorities
+        call_order = sorted(range(len(targets)), key=lambda g: -group_priority[g])
+
+        pb_ids = book.extra.get("pb_id")
+
+        def new_draft(i: int, text: Tuple[str, str]) -> PBActionDraft:
+            row = rows[i]
+            pb_id = str(pb_ids[row] or "") if pb_ids is not None else ""
+            return self._new_draft(bundle, str(book.customer_ids[row]), int(priorities[i]), text, pb_id)
+
+        stats: Dict[str, int] = {}
+        if streaming:
+            for positions, draft_resp in self.drafter.iter_generate(
+                bundle.routine_type, [targets[g] for g in call_order], report_data, video_data, stats=stats
+            ):
+                if draft_resp is None:
+                    continue
+                text = self._draft_text(bundle, draft_resp)
+                for position in positions:
+                    for i in np.flatnonzero(group_of_row == call_order[position]):
+                        yield new_draft(i, text)
+        else:
+            responses, stats = self.drafter.generate(
+                bundle.routine_type, [targets[g] for g in call_order], report_data, video_data
+            )
+            # Text is normalized once per distinct response; rows are already in queue order
+            texts = {
+                group: self._draft_text(bundle, resp)
+                for group, resp in zip(call_order, responses) if resp is not None
+            }
+            for i, group in enumerate(group_of_row.tolist()):
+                text = texts.get(group)
+                if text is not None:
+                    yield new_draft(i, text)
+
+        # Stats count customers, not distinct prompts
+        stats["requests"] = int(len(rows))
+        stats["hits"] = int(len(rows)) - stats.get("misses", 0)
+        self.last_draft_stats = stats
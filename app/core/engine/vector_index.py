@@ -0,0 +1,290 @@
+import os
+import re
+import json
+import math
+import zlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Optional
+from app.core.storage.file_lock import FileLock
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+class HashedNgramEmbedder:
+    """
+    Offline text embedder: word tokens plus character n-grams inside each word (robust to Korean
+    particles and compounds), hashed into a fixed number of buckets with sublinear term frequency.
+    crc32 is used instead of hash() so vectors are stable across processes.
+    """
+    def __init__(self, dim: int = 512, ngram_range: Tuple[int, int] = (2, 3)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def features(self, text: str) -> Dict[int, float]:
+        """Returns signed bucket counts for one text."""
+        counts: Dict[int, float] = {}
+        lo, hi = self.ngram_range
+        for word in _TOKEN_RE.findall((text or "").lower()):
+            grams = [f"w:{word}"]
+            for n in range(lo, hi + 1):
+                grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+            for gram in grams:
+                h = zlib.crc32(gram.encode("utf-8"))
+                # The sign bit spreads collisions around zero instead of only inflating buckets
+                bucket = h % self.dim
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+        return counts
+
+    def embed(self, texts: List[str], idf: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """Embeds texts into L2-normalized float32 rows, optionally weighted by idf."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, count in self.features(text).items():
+                if count:
+                    matrix[row, bucket] = math.copysign(1.0 + math.log(abs(count)), count)
+        if idf is not None:
+            matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+class VectorIndex:
+    """
+    In-process similarity index over report texts, persisted as a memory-mapped float32 matrix.
+    Rows are preallocated in chunks, so appends write into the mapped file in place and the matrix is
+    never rebuilt; growing only extends the file and remaps it. IDF weights are applied on the query
+    side, which keeps stored rows valid as document frequencies change.
+    Row metadata (report_id, text hash) and the document frequencies live in a small SQLite file: an
+    add writes only the rows it touched. Every add bumps a sequence number, so another process picks up
+    just the rows changed since the sequence it last read.
+    Writers from several worker processes are serialized with a file lock.
+    """
+    GROWTH_ROWS = 4096
+
+    def __init__(self, path_prefix: str = "data/vectors/reports", dim: int = 512):
+        if np is None:
+            raise ImportError("numpy is required for VectorIndex")
+        self.path_prefix = path_prefix
+        self.embedder = HashedNgramEmbedder(dim=dim)
+        self.dim = dim
+        self.matrix_path = f"{path_prefix}.f32"
+        self.db_path = f"{path_prefix}.sqlite3"
+        # Metadata files of the earlier format, imported once
+        self.legacy_meta_path = f"{path_prefix}.json"
+        self.legacy_df_path = f"{path_prefix}.df.npy"
+        self._lock = threading.Lock()
+        self._write_lock = FileLock(f"{path_prefix}.lock")
+        self._seq = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.text_hashes: Dict[str, int] = {}
+        self.df = np.zeros(dim, dtype=np.float64)
+        self.capacity = 0
+        self._matrix = None
+        prefix_dir = os.path.dirname(path_prefix)
+        if prefix_dir:
+            os.makedirs(prefix_dir, exist_ok=True)
+        with self._write_lock:
+            with self._connect() as conn:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS vector_rows (
+                        report_id TEXT PRIMARY KEY,
+                        row INTEGER NOT NULL UNIQUE,
+                        text_hash INTEGER NOT NULL,
+                        seq INTEGER NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_vector_rows_seq ON vector_rows (seq);
+                    CREATE TABLE IF NOT EXISTS vector_meta (key TEXT PRIMARY KEY, value BLOB);
+                """)
+                self._check_dim(conn)
+                self._import_legacy(conn)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @contextmanager
+    def _connect(self):
+        # One connection per index, used under self._lock (or during __init__): searches check the
+        # sequence number on every call, which must not cost a connect
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        yield self._conn
+
+    @staticmethod
+    def _meta(conn, key: str):
+        row = conn.execute("SELECT value FROM vector_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _check_dim(self, conn):
+        # Caller holds the write lock
+        dim = self._meta(conn, "dim")
+        if dim is not None and int(dim) == self.dim:
+            return
+        if dim is not None:
+            logger.warning(f"Vector index at {self.path_prefix} has dim {dim}, expected {self.dim}; rebuilding.")
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM vector_rows")
+        conn.execute("DELETE FROM vector_meta")
+        conn.execute("INSERT INTO vector_meta (key, value) VALUES ('dim', ?)", (self.dim,))
+        conn.execute("COMMIT")
+
+    def _import_legacy(self, conn):
+        """Moves the ids / text hashes JSON and df .npy of the earlier format into the database."""
+        if not os.path.exists(self.legacy_meta_path):
+            return
+        with open(self.legacy_meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dim") == self.dim and os.path.exists(self.matrix_path) \
+                and not conn.execute("SELECT 1 FROM vector_rows LIMIT 1").fetchone():
+            hashes = meta.get("text_hashes", {})
+            df = np.load(self.legacy_df_path) if os.path.exists(self.legacy_df_path) else np.zeros(self.dim)
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO vector_rows (report_id, row, text_hash, seq) VALUES (?, ?, ?, 1)",
+                [(report_id, row, int(hashes.get(report_id, 0))) for row, report_id in enumerate(meta["ids"])]
+            )
+            conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('df', ?)", (df.astype(np.float64).tobytes(),))
+            conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('seq', 1)")
+            conn.execute("COMMIT")
+        os.remove(self.legacy_meta_path)
+        if os.path.exists(self.legacy_df_path):
+            os.remove(self.legacy_df_path)
+
+    def _load(self):
+        """Reads the rows changed since the last load (all of them the first time)."""
+        with self._connect() as conn:
+            seq = int(self._meta(conn, "seq") or 0)
+            if seq == self._seq and self._matrix is not None:
+                return
+            rows = conn.execute(
+                "SELECT report_id, row, text_hash FROM vector_rows WHERE seq > ? ORDER BY row", (self._seq,)
+            ).fetchall()
+            df = self._meta(conn, "df")
+        for report_id, row, text_hash in rows:
+            if row == len(self.ids):
+                self.ids.append(report_id)
+            self.row_of[report_id] = row
+            self.text_hashes[report_id] = text_hash
+        if df is not None:
+            self.df = np.frombuffer(df, dtype=np.float64).copy()
+        self._seq = seq
+        capacity = os.path.getsize(self.matrix_path) // (self.dim * 4) if os.path.exists(self.matrix_path) else 0
+        if capacity < max(len(self.ids), 1):
+            self._grow(max(len(self.ids), self.GROWTH_ROWS))
+        elif capacity != self.capacity or self._matrix is None:
+            self.capacity = capacity
+            self._map()
+
+    def _reload_if_changed(self):
+        """Picks up rows written by another process since this one last read the metadata."""
+        self._load()
+
+    def _map(self):
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+
+    def _grow(self, min_capacity: int):
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        new_capacity = max(min_capacity, self.capacity + self.GROWTH_ROWS)
+        # Extending the file keeps existing rows where they are; only the mapping changes
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.capacity = new_capacity
+        self._map()
+
+    def _persist(self, written: List[Tuple[str, int, int]]):
+        """Flushes the matrix, then records the written (report_id, row, text_hash) rows and the new df."""
+        self._matrix.flush()
+        seq = self._seq + 1
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO vector_rows (report_id, row, text_hash, seq) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(report_id) DO UPDATE SET text_hash = excluded.text_hash, seq = excluded.seq",
+                    [(report_id, row, text_hash, seq) for report_id, row, text_hash in written]
+                )
+                conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('df', ?)", (self.df.tobytes(),))
+                conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('seq', ?)", (seq,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._seq = seq
+
+    def idf(self) -> "np.ndarray":
+        n = len(self.ids)
+        return (np.log((1.0 + n) / (1.0 + self.df)) + 1.0).astype(np.float32)
+
+    def add(self, items: List[Tuple[str, str]]) -> int:
+        """Appends or overwrites (report_id, text) rows. Unchanged texts are skipped. Returns rows written."""
+        with self._lock, self._write_lock:
+            self._reload_if_changed()
+            pending = {}
+            for report_id, text in items:
+                text_hash = zlib.crc32((text or "").encode("utf-8"))
+                if self.text_hashes.get(report_id) == text_hash:
+                    pending.pop(report_id, None)
+                    continue
+                # The last text given for a report wins
+                pending[report_id] = (text, text_hash)
+            if not pending:
+                return 0
+
+            vectors = self.embedder.embed([text for text, _ in pending.values()])
+            new_rows = sum(1 for report_id in pending if report_id not in self.row_of)
+            if len(self.ids) + new_rows > self.capacity:
+                self._grow(len(self.ids) + new_rows)
+
+            written = []
+            for (report_id, (_, text_hash)), vector in zip(pending.items(), vectors):
+                row = self.row_of.get(report_id)
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(report_id)
+                    self.row_of[report_id] = row
+                else:
+                    # A rewritten document (e.g. after its body or PDF text arrived) swaps its old terms for the new
+                    self.df -= self._matrix[row] != 0
+                self.df += vector != 0
+                self._matrix[row] = vector
+                self.text_hashes[report_id] = text_hash
+                written.append((report_id, row, text_hash))
+            self._persist(written)
+            return len(written)
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[str, float]]]:
+        """Top-k cosine search for several query texts with one matrix product."""
+        with self._lock:
+            self._reload_if_changed()
+            count = len(self.ids)
+            if count == 0 or not queries:
+                return [[] for _ in queries]
+            q = self.embedder.embed(queries, idf=self.idf())
+            scores = q @ self._matrix[:count].T
+            ids = list(self.ids)
+
+        k = min(top_k, count)
+        results = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top], kind="stable")]
+            results.append([(ids[i], float(row_scores[i])) for i in top if row_scores[i] > 0])
+        return results
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        return self.search_batch([query], top_k=top_k)[0]
@@ -0,0 +1,218 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Optional, Callable, Iterable
+
+# Latency buckets in seconds, from sub-millisecond cache hits up to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def items(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus layout) with optional labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts incl. +Inf, sum, count)
+        self._values: Dict[LabelKey, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(list(self.buckets) + [float("inf")], counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class Gauge:
+    """Value computed when metrics are rendered; the callback returns {labels dict as tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Dict[LabelKey, float]]):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self.callback().items())]
+
+class MetricsRegistry:
+    """
+    Process-local metrics. Each web worker process keeps its own registry, so /metrics reports the
+    worker that served the scrape (label series by instance when running several workers).
+    """
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], Dict[LabelKey, float]]) -> Gauge:
+        return self._register(Gauge(name, help_text, callback))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# --- Pipeline metrics shared by the engine, adapters and workflows ---
+STAGE_SECONDS = REGISTRY.histogram("routine_stage_seconds", "Duration of each workflow stage.")
+ROUTINE_RUNS = REGISTRY.counter("routine_runs_total", "Routine runs by outcome.")
+LLM_SECONDS = REGISTRY.histogram("llm_request_seconds", "Latency of OpenAI chat completion calls.")
+LLM_REQUESTS = REGISTRY.counter("llm_requests_total", "OpenAI chat completion calls by kind and outcome.")
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens reported by the OpenAI API, by kind and direction.")
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "Latency of outbound HTTP GETs by host.")
+HTTP_RESPONSES = REGISTRY.counter("http_responses_total", "Outbound HTTP responses by host and status.")
+PDF_EXTRACT_SECONDS = REGISTRY.histogram("pdf_extract_seconds", "Time from submitting a PDF to the extraction pool until its text is back.")
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by cache and result (hit or miss).")
+
+def _cache_hit_ratios() -> Dict[LabelKey, float]:
+    totals: Dict[str, List[float]] = {}
+    for labels, value in CACHE_REQUESTS.items():
+        entry = totals.setdefault(labels.get("cache", ""), [0.0, 0.0])
+        entry[1] += value
+        if labels.get("result") == "hit":
+            entry[0] += value
+    return {(("cache", cache),): hits / total for cache, (hits, total) in totals.items() if total}
+
+REGISTRY.gauge("cache_hit_ratio", "Hit ratio per cache since process start.", _cache_hit_ratios)
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    if count:
+        CACHE_REQUESTS.inc(count, cache=cache, result="hit" if hit else "miss")
+
+AUDIT_RECORDS = REGISTRY.counter("audit_records_total", "Records written to the audit log, by kind (routine or draft).")
+AUDIT_FLUSH_SECONDS = REGISTRY.histogram("audit_flush_seconds", "Time to compress, write, fsync and index one audit log batch.")
+AUDIT_BACKPRESSURE = REGISTRY.counter("audit_backpressure_total", "Audit log appends that found the queue full, by result (waited or dropped).")
+
+# queue name -> (current depth, capacity) of the bounded in-process queues
+_QUEUES: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+def register_queue(name: str, sizes: Callable[[], Tuple[int, int]]):
+    """Exports a bounded queue's depth and capacity as queue_depth / queue_capacity."""
+    _QUEUES[name] = sizes
+
+REGISTRY.gauge("queue_depth", "Items waiting in each bounded queue.", lambda: {(("queue", name),): float(sizes()[0]) for name, sizes in list(_QUEUES.items())})
+REGISTRY.gauge("queue_capacity", "Capacity of each bounded queue.", lambda: {(("queue", name),): float(sizes()[1]) for name, sizes in list(_QUEUES.items())})
+
+class StageTimer:
+    """
+    Times consecutive workflow stages from progress callbacks: each call ends the running stage and
+    starts the next. Wraps an optional downstream progress callback, so it slots into the existing
+    progress plumbing. Durations go to routine_stage_seconds and to .timings for the audit record.
+    """
+    def __init__(self, routine: str, progress: Optional[Callable[[str], None]] = None):
+        self.routine = routine
+        self.progress = progress
+        self.timings: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._started = time.perf_counter()
+        self._stage_started = self._started
+
+    def __call__(self, stage: str):
+        # Forward first: a cancelled job raises here and must not record a stage it never ran
+        if self.progress:
+            self.progress(stage)
+        self._close()
+        self._stage = stage
+        self._stage_started = time.perf_counter()
+
+    def _close(self):
+        if self._stage is not None:
+            elapsed = time.perf_counter() - self._stage_started
+            self.timings[self._stage] = round(self.timings.get(self._stage, 0.0) + elapsed, 4)
+            STAGE_SECONDS.observe(elapsed, routine=self.routine, stage=self._stage)
+            self._stage = None
+
+    def finish(self, outcome: str = "success") -> Dict[str, float]:
+        """Ends the running stage and returns {stage: seconds, ..., "total": seconds}."""
+        self._close()
+        self.timings["total"] = round(time.perf_counter() - self._started, 4)
+        ROUTINE_RUNS.inc(routine=self.routine, outcome=outcome)
+        return self.timings
@@ -0,0 +1,137 @@
+import os
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from typing import List, Optional, Tuple, Iterable
+from app.models.resources import PBActionDraft
+from app.models import serialization
+
+logger = logging.getLogger(__name__)
+
+# Queue for customers without an assigned PB (e.g. the mock customers)
+DEFAULT_PB_ID = os.environ.get("DEFAULT_PB_ID", "pb_default")
+
+class ActionQueue:
+    """
+    Persistent per-PB queue of pending PBActionDrafts in SQLite, shared by every worker process.
+    Rows are ordered by an index on (pb_id, status, priority DESC, seq), so a page of the top of a PB's
+    queue is an index range scan: nothing is re-sorted or regenerated when actions are added or completed.
+    seq is the insertion order, which keeps equal priorities in routing order.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.environ.get("ACTION_QUEUE_PATH", "data/action_queue.sqlite3")
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS actions (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    action_id TEXT NOT NULL UNIQUE,
+                    pb_id TEXT NOT NULL,
+                    customer_id TEXT NOT NULL,
+                    routine_type TEXT NOT NULL,
+                    bundle_id TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    created_at REAL NOT NULL,
+                    completed_at REAL,
+                    payload TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_actions_queue ON actions (pb_id, status, priority DESC, seq);
+                -- At most one pending action per customer and routine: a newer bundle supersedes the older draft
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_actions_pending_customer
+                    ON actions (pb_id, customer_id, routine_type) WHERE status = 'pending';
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _pb(pb_id: Optional[str]) -> str:
+        return pb_id or DEFAULT_PB_ID
+
+    def enqueue(self, drafts: Iterable[PBActionDraft]) -> int:
+        """
+        Adds newly routed drafts, in the given (queue) order, to their PBs' queues. A pending action for the
+        same customer and routine from a bundle over other contents is replaced. Actions of the same bundle
+        (same action_id) are left alone, pending or completed, so re-running a routine changes nothing.
+        Returns the number of actions inserted.
+        """
+        now = time.time()
+        rows, superseded = [], []
+        for d in drafts:
+            pb_id = self._pb(d.pb_id)
+            rows.append((d.action_id, pb_id, d.customer_id, d.routine_type, d.bundle_id, d.follow_up_priority, now,
+                         serialization.dump_model(d).decode("utf-8")))
+            superseded.append((pb_id, d.customer_id, d.routine_type, d.bundle_id))
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "DELETE FROM actions WHERE pb_id = ? AND customer_id = ? AND routine_type = ? AND status = 'pending' AND bundle_id != ?",
+                    superseded
+                )
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO actions (action_id, pb_id, customer_id, routine_type, bundle_id, priority, created_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                inserted = conn.total_changes - before
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return inserted
+
+    def top(self, pb_id: Optional[str], limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[PBActionDraft], Optional[str]]:
+        """
+        One page of a PB's pending actions, highest priority first. cursor is the next_cursor of the previous
+        page ("priority:seq"), so later pages seek in the index instead of skipping rows.
+        Returns (drafts, next_cursor); next_cursor is None on the last page. A malformed cursor raises ValueError.
+        """
+        query = "SELECT priority, seq, payload FROM actions WHERE pb_id = ? AND status = 'pending'"
+        params: list = [self._pb(pb_id)]
+        if cursor:
+            priority, seq = (int(part) for part in cursor.split(":", 1))
+            query += " AND (priority < ? OR (priority = ? AND seq > ?))"
+            params.extend([priority, priority, seq])
+        query += " ORDER BY priority DESC, seq LIMIT ?"
+        params.append(limit + 1)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        page = rows[:limit]
+        next_cursor = f"{page[-1][0]}:{page[-1][1]}" if len(rows) > limit else None
+        return [serialization.load_model(PBActionDraft, payload) for _, _, payload in page], next_cursor
+
+    def pending_count(self, pb_id: Optional[str]) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM actions WHERE pb_id = ? AND status = 'pending'", (self._pb(pb_id),)).fetchone()
+        return row[0]
+
+    def complete(self, pb_id: Optional[str], action_id: str) -> bool:
+        """Marks a pending action done; it leaves the queue but stays on record. False if not pending."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE actions SET status = 'done', completed_at = ? WHERE action_id = ? AND pb_id = ? AND status = 'pending'",
+                (time.time(), action_id, self._pb(pb_id))
+            )
+        return cur.rowcount > 0
+
+    def remove(self, pb_id: Optional[str], action_id: str) -> bool:
+        """Drops an action from the queue without recording it as done. False if unknown."""
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM actions WHERE action_id = ? AND pb_id = ?", (action_id, self._pb(pb_id)))
+        return cur.rowcount > 0
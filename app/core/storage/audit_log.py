@@ -0,0 +1,267 @@
+import os
+import gzip
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Iterable
+from app.models.resources import AuditRecord, PBActionDraft
+from app.models import serialization
+from app.core.metrics import AUDIT_RECORDS, AUDIT_FLUSH_SECONDS, AUDIT_BACKPRESSURE, register_queue
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class AuditLog:
+    """
+    Append-only compliance trail: one record per routine run and one per generated draft.
+
+    append() only queues the run (a bounded queue; a full queue blocks the caller for up to
+    enqueue_timeout, then drops the run and counts it). A writer thread drains the queue in batches:
+    each batch of at most batch_records JSON lines becomes one gzip member appended to the current
+    segment file and fsynced, then its records are indexed in SQLite by customer_id, report_id and
+    timestamp. Segments rotate by size and by day, and each process writes its own segments, so worker
+    processes never interleave appends; the index is shared. A lookup decompresses only the members
+    that hold the matching records.
+    """
+    def __init__(self, log_dir: Optional[str] = None, max_queue: Optional[int] = None, batch_records: Optional[int] = None,
+                 flush_seconds: Optional[float] = None, segment_max_bytes: Optional[int] = None):
+        self.log_dir = log_dir or os.environ.get("AUDIT_LOG_DIR", "data/audit")
+        self.batch_records = batch_records or int(os.environ.get("AUDIT_BATCH_RECORDS", "1000"))
+        self.flush_seconds = flush_seconds if flush_seconds is not None else float(os.environ.get("AUDIT_FLUSH_SECONDS", "1.0"))
+        self.segment_max_bytes = segment_max_bytes or int(os.environ.get("AUDIT_SEGMENT_MAX_MB", "64")) * 2**20
+        self.enqueue_timeout = float(os.environ.get("AUDIT_ENQUEUE_TIMEOUT", "1.0"))
+        self.compress_level = int(os.environ.get("AUDIT_GZIP_LEVEL", "6"))
+        self.max_queue = max_queue or int(os.environ.get("AUDIT_QUEUE_MAX", "256"))
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.db_path = os.path.join(self.log_dir, "index.sqlite3")
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS audit_index (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    audit_id TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    customer_id TEXT,
+                    report_id TEXT,
+                    workflow_name TEXT NOT NULL,
+                    segment TEXT NOT NULL,
+                    member_offset INTEGER NOT NULL,
+                    member_length INTEGER NOT NULL,
+                    line INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_audit_customer ON audit_index (customer_id, ts);
+                CREATE INDEX IF NOT EXISTS idx_audit_report ON audit_index (report_id, ts);
+                CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_index (ts);
+            """)
+        # Queued items are whole runs (audit record + drafts); the writer expands them into lines
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        register_queue("audit_log", lambda: (self._queue.qsize(), self.max_queue))
+        self._segment: Optional[str] = None
+        self._segment_day: Optional[str] = None
+        self._segment_file = None
+        self._segment_seq = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+        # Queued records are written out on interpreter exit
+        atexit.register(self.close)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def append(self, audit: AuditRecord, drafts: Iterable[PBActionDraft] = ()) -> bool:
+        """Queues a routine's audit record and a record per draft. False if the queue stayed full and the run was dropped."""
+        if self._closed:
+            return False
+        item = (audit, list(drafts))
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        try:
+            self._queue.put(item, timeout=self.enqueue_timeout)
+            AUDIT_BACKPRESSURE.inc(result="waited")
+            return True
+        except queue.Full:
+            AUDIT_BACKPRESSURE.inc(result="dropped")
+            logger.error(f"Audit log queue full: dropped {audit.audit_id} and {len(item[1])} draft records")
+            return False
+
+    def flush(self):
+        """Blocks until everything queued so far is written and indexed."""
+        self._queue.join()
+
+    def close(self):
+        """Writes out the queue and stops the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def query(self, customer_id: Optional[str] = None, report_id: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 100) -> List[AuditRecord]:
+        """Records matching every given filter, newest first; start is inclusive, end exclusive."""
+        query = "SELECT segment, member_offset, member_length, line FROM audit_index WHERE 1 = 1"
+        params: list = []
+        if customer_id:
+            query += " AND customer_id = ?"
+            params.append(customer_id)
+        if report_id:
+            query += " AND report_id = ?"
+            params.append(report_id)
+        if start:
+            query += " AND ts >= ?"
+            params.append(start.timestamp())
+        if end:
+            query += " AND ts < ?"
+            params.append(end.timestamp())
+        query += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        members: Dict[Tuple[str, int, int], List[bytes]] = {}
+        records = []
+        for segment, offset, length, line in rows:
+            key = (segment, offset, length)
+            if key not in members:
+                with open(os.path.join(self.log_dir, segment), "rb") as f:
+                    f.seek(offset)
+                    members[key] = gzip.decompress(f.read(length)).split(b"\n")
+            records.append(serialization.load_model(AuditRecord, members[key][line]))
+        return records
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            pending = 0 if items[0] is _STOP else 1 + len(items[0][1])
+            # Gather runs until a batch is full or the flush interval is up
+            while pending < self.batch_records and items[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                items.append(item)
+                if item is not _STOP:
+                    pending += 1 + len(item[1])
+            stopping = items[-1] is _STOP
+            runs = [item for item in items if item is not _STOP]
+            try:
+                if runs:
+                    self._write(runs)
+            except Exception as e:
+                logger.error(f"Audit log write failed, {len(runs)} run(s) lost: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._segment_file = None
+
+    @staticmethod
+    def _lines(audit: AuditRecord, drafts: List[PBActionDraft]) -> List[Tuple[bytes, Optional[str]]]:
+        """(JSON line, customer_id) for the run record and one AuditRecord per draft."""
+        run = serialization.to_dict(audit)
+        lines = [(serialization.dumps(run), audit.customer_id)]
+        for draft in drafts:
+            record = dict(
+                run,
+                audit_id=f"{audit.audit_id}/{draft.action_id}",
+                customer_id=draft.customer_id,
+                decision_points={
+                    "bundle_id": draft.bundle_id,
+                    "routine_type": draft.routine_type,
+                    "follow_up_priority": draft.follow_up_priority,
+                    "outreach_channel": draft.outreach_channel,
+                },
+                generated_outputs={
+                    "action_id": draft.action_id,
+                    "pb_id": draft.pb_id,
+                    "pb_talking_points": draft.pb_talking_points,
+                    "client_message_draft": draft.client_message_draft,
+                    "traceability": draft.traceability,
+                },
+                timings={},
+            )
+            lines.append((serialization.dumps(record), draft.customer_id))
+        return lines
+
+    def _write(self, runs: List[Tuple[AuditRecord, List[PBActionDraft]]]):
+        started = time.perf_counter()
+        # (line, audit_id, ts, customer_id, report_id, workflow_name)
+        entries = []
+        for audit, drafts in runs:
+            ts = audit.timestamp.timestamp()
+            for line, customer_id in self._lines(audit, drafts):
+                entries.append((line, audit.audit_id, ts, customer_id, audit.report_id, audit.workflow_name))
+
+        index_rows = []
+        for first in range(0, len(entries), self.batch_records):
+            chunk = entries[first:first + self.batch_records]
+            member = gzip.compress(b"\n".join(line for line, *_ in chunk), compresslevel=self.compress_level)
+            segment, offset = self._append_member(member)
+            for position, (_, audit_id, ts, customer_id, report_id, workflow_name) in enumerate(chunk):
+                index_rows.append((audit_id, ts, customer_id, report_id, workflow_name, segment, offset, len(member), position))
+        self._segment_file.flush()
+        os.fsync(self._segment_file.fileno())
+
+        # Indexed only once the data is on disk, so every index row points at a complete member
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO audit_index (audit_id, ts, customer_id, report_id, workflow_name, segment, member_offset, member_length, line) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    index_rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        AUDIT_RECORDS.inc(len(runs), kind="routine")
+        AUDIT_RECORDS.inc(len(entries) - len(runs), kind="draft")
+        AUDIT_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+    def _append_member(self, member: bytes) -> Tuple[str, int]:
+        """Appends a gzip member to the current segment, rotating first if needed. Returns (segment, offset)."""
+        day = datetime.now().strftime("%Y%m%d")
+        f = self._segment_file
+        if f is None or day != self._segment_day or (f.tell() and f.tell() + len(member) > self.segment_max_bytes):
+            self._rotate(day)
+            f = self._segment_file
+        offset = f.tell()
+        f.write(member)
+        return self._segment, offset
+
+    def _rotate(self, day: str):
+        if self._segment_file is not None:
+            self._segment_file.flush()
+            os.fsync(self._segment_file.fileno())
+            self._segment_file.close()
+        # Per-process names: a restarted process (same pid or not) never appends to an older segment
+        while True:
+            self._segment_seq += 1
+            name = f"audit-{day}-{os.getpid()}-{self._segment_seq:04d}.jsonl.gz"
+            if not os.path.exists(os.path.join(self.log_dir, name)):
+                break
+        self._segment, self._segment_day = name, day
+        self._segment_file = open(os.path.join(self.log_dir, name), "ab")
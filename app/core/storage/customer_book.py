@@ -0,0 +1,159 @@
+import os
+import csv
+import logging
+from typing import List, Dict, Iterable, Optional, Sequence
+from app.models.resources import CustomerProfile
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# CustomerProfile fields that hold lists; in CSV they are "|"-separated
+LIST_FIELDS = ("account_types", "sector_exposures", "geographic_exposures", "concentration_flags", "modifiers")
+LIST_SEPARATOR = "|"
+# Field names in declaration order (pydantic v2 model_fields, v1 __fields__)
+PROFILE_FIELDS = list(getattr(CustomerProfile, "model_fields", None) or CustomerProfile.__fields__)
+
+class _Categorical:
+    """String column stored as small integer codes plus the category list."""
+    def __init__(self, values: Sequence[str]):
+        self.categories, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        self.codes = codes.astype(np.int32)
+        self._index = {value: code for code, value in enumerate(self.categories)}
+
+    def isin(self, values: Iterable[str]) -> "np.ndarray":
+        wanted = [self._index[v] for v in values if v in self._index]
+        return np.isin(self.codes, wanted)
+
+    def __getitem__(self, row: int) -> str:
+        return str(self.categories[self.codes[row]])
+
+class CustomerBook:
+    """
+    Columnar customer store for routing whole books at once. The fields the routing rules read are
+    kept as arrays: ids, categorical segment/tier/frequency/engagement codes, and a customer x modifier
+    boolean matrix. Every other profile field is kept as a raw column, so a CustomerProfile is only
+    built (profile(row)) for customers that need one.
+    """
+    CATEGORICAL_FIELDS = ("segment_id", "asset_tier", "trading_frequency", "engagement_level")
+
+    def __init__(self, columns: Dict[str, List]):
+        if np is None:
+            raise ImportError("numpy is required for CustomerBook")
+        if "customer_id" not in columns or "segment_id" not in columns:
+            raise ValueError("customer book needs at least customer_id and segment_id columns")
+        self.customer_ids = np.asarray(columns["customer_id"], dtype=object)
+        size = len(self.customer_ids)
+        self.categoricals = {
+            name: _Categorical(columns.get(name) or [""] * size) for name in self.CATEGORICAL_FIELDS
+        }
+        modifier_lists = [self._as_list(v) for v in (columns.get("modifiers") or [[]] * size)]
+        self.modifier_names = sorted({m for mods in modifier_lists for m in mods})
+        position = {name: i for i, name in enumerate(self.modifier_names)}
+        self.modifier_matrix = np.zeros((size, len(self.modifier_names)), dtype=bool)
+        for row, mods in enumerate(modifier_lists):
+            for m in mods:
+                self.modifier_matrix[row, position[m]] = True
+        # The raw modifiers column stays in extra so profiles keep their original modifier order
+        skip = {"customer_id", *self.CATEGORICAL_FIELDS}
+        self.extra = {name: values for name, values in columns.items() if name not in skip}
+
+    def __len__(self) -> int:
+        return len(self.customer_ids)
+
+    @property
+    def segment_ids(self) -> _Categorical:
+        return self.categoricals["segment_id"]
+
+    def has_any_modifier(self, names: Iterable[str]) -> "np.ndarray":
+        """Boolean mask of customers carrying at least one of the modifiers."""
+        cols = [self.modifier_names.index(n) for n in names if n in self.modifier_names]
+        if not cols:
+            return np.zeros(len(self), dtype=bool)
+        return self.modifier_matrix[:, cols].any(axis=1)
+
+    def profile(self, row: int) -> CustomerProfile:
+        """Materializes one customer as a CustomerProfile."""
+        data = {name: values[row] for name, values in self.extra.items()}
+        for name in LIST_FIELDS:
+            if name in data:
+                data[name] = self._as_list(data[name])
+        if data.get("cash_ratio") in ("", None):
+            data.pop("cash_ratio", None)
+        data.update({name: column[row] for name, column in self.categoricals.items()})
+        data["customer_id"] = str(self.customer_ids[row])
+        return CustomerProfile(**data)
+
+    @staticmethod
+    def _as_list(value) -> List[str]:
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [v for v in value.split(LIST_SEPARATOR) if v]
+        return [str(v) for v in value]
+
+    @classmethod
+    def from_profiles(cls, profiles: Sequence[CustomerProfile]) -> "CustomerBook":
+        return cls({name: [getattr(p, name) for p in profiles] for name in PROFILE_FIELDS})
+
+    @classmethod
+    def from_csv(cls, path: str) -> "CustomerBook":
+        """Header row of CustomerProfile field names; list fields are '|'-separated."""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            columns: Dict[str, List] = {name: [] for name in header}
+            appenders = [columns[name].append for name in header]
+            for record in reader:
+                for append, value in zip(appenders, record):
+                    append(value)
+        return cls(columns)
+
+    @classmethod
+    def from_parquet(cls, path: str) -> "CustomerBook":
+        if pq is None:
+            raise ImportError("pyarrow is required to load Parquet customer books")
+        return cls(pq.read_table(path).to_pydict())
+
+    @classmethod
+    def load(cls, path: str) -> "CustomerBook":
+        """Loads a .csv or .parquet customer book."""
+        if path.endswith(".parquet"):
+            book = cls.from_parquet(path)
+        else:
+            book = cls.from_csv(path)
+        logger.info(f"Loaded {len(book)} customers from {path}")
+        return book
+
+    def to_csv(self, path: str):
+        """Writes the book in the from_csv layout."""
+        rows = [self.profile(row) for row in range(len(self))]
+        fields = PROFILE_FIELDS
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for p in rows:
+                writer.writerow([
+                    LIST_SEPARATOR.join(getattr(p, name)) if name in LIST_FIELDS else getattr(p, name)
+                    for name in fields
+                ])
+
+def load_customer_book(path: Optional[str] = None) -> Optional[CustomerBook]:
+    """Loads the book at path (default env CUSTOMER_BOOK_PATH); None when unset or unavailable."""
+    path = path or os.environ.get("CUSTOMER_BOOK_PATH")
+    if not path:
+        return None
+    try:
+        return CustomerBook.load(path)
+    except Exception as e:
+        logger.warning(f"Customer book {path} not loaded, using mock customers: {e}")
+        return None
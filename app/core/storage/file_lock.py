@@ -0,0 +1,59 @@
+import os
+import logging
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class FileLock:
+    """
+    Advisory inter-process lock on a file (flock), also serialized between threads of one process.
+    The OS releases it when the holder exits, so a crashed worker never leaves it stuck.
+    Without fcntl (Windows) it degrades to a thread lock, i.e. single-process semantics.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        lock_dir = os.path.dirname(path)
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            self._thread_lock.release()
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def is_locked(self) -> bool:
+        """True if some thread or process currently holds the lock."""
+        if not self.acquire(blocking=False):
+            return True
+        self.release()
+        return False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,312 @@
+import os
+import json
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable
+from app.models.resources import ResearchReport
+from app.models import serialization
+from app.core.storage.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+def _merge_report(existing: ResearchReport, incoming: ResearchReport) -> ResearchReport:
+    """Overlays incoming fields on a stored report without clobbering enriched fields with empty values."""
+    merged = serialization.to_dict(existing)
+    for field, value in serialization.to_dict(incoming).items():
+        if value in ("", [], None):
+            continue
+        merged[field] = value
+    return ResearchReport(**merged)
+
+class ReportStore(ABC):
+    """Interface for research report persistence used by the crawler and the dashboard."""
+
+    @abstractmethod
+    def upsert_reports(self, reports: List[ResearchReport]) -> int:
+        """Inserts new reports and updates known ones. Returns the number of new reports."""
+
+    @abstractmethod
+    def load_all_reports(self) -> List[ResearchReport]:
+        """Returns every stored report, newest first."""
+
+    @abstractmethod
+    def list_reports(self,
+                     limit: int = 50,
+                     offset: int = 0,
+                     author: Optional[str] = None,
+                     tag: Optional[str] = None,
+                     date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None) -> List[ResearchReport]:
+        """Returns one page of reports, newest first, optionally filtered."""
+
+    @abstractmethod
+    def get_report(self, report_id: str) -> Optional[ResearchReport]:
+        ...
+
+    @abstractmethod
+    def get_reports(self, report_ids: Iterable[str]) -> Dict[str, ResearchReport]:
+        """Bulk lookup by id; unknown ids are left out."""
+
+    @abstractmethod
+    def get_meta(self, key: str) -> Optional[str]:
+        """Reads a small persisted value (e.g. crawl cursors)."""
+
+    @abstractmethod
+    def set_meta(self, key: str, value: str):
+        ...
+
+class JsonReportStore(ReportStore):
+    """Original single-file JSON storage. Every call reads (and every write rewrites) the whole file."""
+
+    def __init__(self, db_path: str = "data/research_db.json"):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # Serializes read-modify-write cycles across worker processes
+        self._write_lock = FileLock(f"{db_path}.lock")
+
+    def upsert_reports(self, reports: List[ResearchReport]) -> int:
+        with self._write_lock:
+            return self._upsert_reports(reports)
+
+    def _upsert_reports(self, reports: List[ResearchReport]) -> int:
+        existing = {r.report_id: r for r in self.load_all_reports()}
+        new_count = 0
+        for r in reports:
+            if r.report_id in existing:
+                existing[r.report_id] = _merge_report(existing[r.report_id], r)
+            else:
+                existing[r.report_id] = r
+                new_count += 1
+                
+        # Sort by date descending
+        ordered = sorted(existing.values(), key=lambda x: x.date, reverse=True)
+        
+        # Write to a temp file and swap it in, so readers never see a half-written file
+        tmp_path = f"{self.db_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(serialization.dump_models(ResearchReport, ordered))
+        os.replace(tmp_path, self.db_path)
+        return new_count
+
+    def load_all_reports(self) -> List[ResearchReport]:
+        if not os.path.exists(self.db_path):
+            return []
+        try:
+            # One pass over the whole file: pydantic v2 validates it in Rust (TypeAdapter.validate_json);
+            # on v1 the trusted load skips validation, since only this store writes the file
+            with open(self.db_path, "rb") as f:
+                return serialization.load_models(ResearchReport, f.read())
+        except Exception:
+            return []
+
+    def list_reports(self, limit=50, offset=0, author=None, tag=None, date_from=None, date_to=None) -> List[ResearchReport]:
+        reports = [
+            r for r in self.load_all_reports()
+            if (author is None or r.author == author)
+            and (tag is None or tag in r.tags)
+            and (date_from is None or r.date >= date_from)
+            and (date_to is None or r.date <= date_to)
+        ]
+        return reports[offset:offset + limit]
+
+    def get_report(self, report_id: str) -> Optional[ResearchReport]:
+        for r in self.load_all_reports():
+            if r.report_id == report_id:
+                return r
+        return None
+
+    def get_reports(self, report_ids: Iterable[str]) -> Dict[str, ResearchReport]:
+        wanted = set(report_ids)
+        return {r.report_id: r for r in self.load_all_reports() if r.report_id in wanted}
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.splitext(self.db_path)[0] + ".meta.json"
+
+    def _load_meta(self) -> Dict[str, str]:
+        if not os.path.exists(self.meta_path):
+            return {}
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def get_meta(self, key: str) -> Optional[str]:
+        return self._load_meta().get(key)
+
+    def set_meta(self, key: str, value: str):
+        with self._write_lock:
+            self._set_meta(key, value)
+
+    def _set_meta(self, key: str, value: str):
+        meta = self._load_meta()
+        meta[key] = value
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+class SQLiteReportStore(ReportStore):
+    """
+    Embedded SQLite storage with indexes on report_id, date, author and tags.
+    Writes are incremental upserts; reads are served by indexed queries instead of full-file scans.
+    """
+
+    def __init__(self, db_path: str = "data/research_db.sqlite3", legacy_json_path: Optional[str] = "data/research_db.json"):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    report_id TEXT PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_reports_date ON reports (date DESC, report_id DESC);
+                CREATE INDEX IF NOT EXISTS idx_reports_author_date ON reports (author, date DESC);
+                CREATE TABLE IF NOT EXISTS report_tags (
+                    tag TEXT NOT NULL,
+                    report_id TEXT NOT NULL,
+                    PRIMARY KEY (tag, report_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_report_tags_report ON report_tags (report_id);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+        if legacy_json_path:
+            self.migrate_from_json(legacy_json_path)
+
+    @contextmanager
+    def _connect(self):
+        # Short-lived connections keep the store usable from request threads and background workers alike.
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_report(payload: str) -> ResearchReport:
+        return serialization.load_model(ResearchReport, payload)
+
+    def _write(self, conn: sqlite3.Connection, report: ResearchReport):
+        conn.execute(
+            "INSERT OR REPLACE INTO reports (report_id, date, author, title, payload) VALUES (?, ?, ?, ?, ?)",
+            (report.report_id, report.date.isoformat(), report.author, report.title,
+             serialization.dump_model(report).decode("utf-8"))
+        )
+        conn.execute("DELETE FROM report_tags WHERE report_id = ?", (report.report_id,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO report_tags (tag, report_id) VALUES (?, ?)",
+            [(tag, report.report_id) for tag in set(report.tags)]
+        )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """One-shot import of the legacy research_db.json. Later calls are no-ops."""
+        if self.get_meta("migrated_from_json") or not os.path.exists(json_path):
+            return 0
+        reports = JsonReportStore(json_path).load_all_reports()
+        new_count = self.upsert_reports(reports)
+        self.set_meta("migrated_from_json", json_path)
+        logger.info(f"Migrated {new_count} reports from {json_path} into {self.db_path}")
+        return new_count
+
+    def upsert_reports(self, reports: List[ResearchReport]) -> int:
+        if not reports:
+            return 0
+        new_count = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = list({r.report_id for r in reports})
+                placeholders = ", ".join("?" for _ in ids)
+                existing = {
+                    report_id: self._row_to_report(payload)
+                    for report_id, payload in conn.execute(
+                        f"SELECT report_id, payload FROM reports WHERE report_id IN ({placeholders})", ids
+                    )
+                }
+                for r in reports:
+                    if r.report_id in existing:
+                        r = _merge_report(existing[r.report_id], r)
+                    else:
+                        new_count += 1
+                    existing[r.report_id] = r
+                    self._write(conn, r)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return new_count
+
+    def load_all_reports(self) -> List[ResearchReport]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT payload FROM reports ORDER BY date DESC, report_id DESC").fetchall()
+        return [self._row_to_report(payload) for (payload,) in rows]
+
+    def list_reports(self, limit=50, offset=0, author=None, tag=None, date_from=None, date_to=None) -> List[ResearchReport]:
+        query = "SELECT r.payload FROM reports r"
+        clauses, params = [], []
+        if tag is not None:
+            query += " JOIN report_tags t ON t.report_id = r.report_id AND t.tag = ?"
+            params.append(tag)
+        if author is not None:
+            clauses.append("r.author = ?")
+            params.append(author)
+        if date_from is not None:
+            clauses.append("r.date >= ?")
+            params.append(date_from.isoformat())
+        if date_to is not None:
+            clauses.append("r.date <= ?")
+            params.append(date_to.isoformat())
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY r.date DESC, r.report_id DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._row_to_report(payload) for (payload,) in rows]
+
+    def get_report(self, report_id: str) -> Optional[ResearchReport]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+        return self._row_to_report(row[0]) if row else None
+
+    def get_reports(self, report_ids: Iterable[str]) -> Dict[str, ResearchReport]:
+        ids = list(set(report_ids))
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ids)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT report_id, payload FROM reports WHERE report_id IN ({placeholders})", ids).fetchall()
+        return {report_id: self._row_to_report(payload) for report_id, payload in rows}
+
+def create_report_store() -> ReportStore:
+    """Builds the configured store. REPORT_STORE=json keeps the legacy single-file storage."""
+    backend = os.environ.get("REPORT_STORE", "sqlite").lower()
+    if backend == "json":
+        return JsonReportStore(os.environ.get("REPORT_DB_PATH", "data/research_db.json"))
+    return SQLiteReportStore(os.environ.get("REPORT_DB_PATH", "data/research_db.sqlite3"))
@@ -0,0 +1,181 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside a running job at the next stage boundary after cancellation."""
+
+class JobQueueFull(Exception):
+    """Raised on submit when the number of waiting jobs has reached the queue limit."""
+
+class Job:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+    def __init__(self, key: str):
+        self.job_id = f"job_{uuid.uuid4().hex[:12]}"
+        self.key = key
+        self.status = self.QUEUED
+        self.stage: Optional[str] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "key": self.key,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+class JobManager:
+    """
+    Runs routine jobs on a bounded executor. Identical submissions (same key) while a job is queued
+    or running are merged into that job; the number of waiting jobs is capped; jobs can be cancelled
+    before they start or, cooperatively, at the next stage boundary while running.
+    """
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_queued: Optional[int] = None,
+                 retention_seconds: Optional[int] = None,
+                 on_success: Optional[Callable[[Job], None]] = None,
+                 snapshot_store=None):
+        self.max_workers = max_workers or int(os.environ.get("JOB_MAX_WORKERS", "2"))
+        self.max_queued = max_queued if max_queued is not None else int(os.environ.get("JOB_MAX_QUEUED", "8"))
+        self.retention_seconds = retention_seconds if retention_seconds is not None else int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+        self.on_success = on_success
+        # Optional shared store (e.g. SQLiteRunCache) so other worker processes can report on this job
+        self.snapshot_store = snapshot_store
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="routine-job")
+        self._jobs: Dict[str, Job] = {}
+        self._active_by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[[Callable[[str], None]], Dict[str, Any]]) -> Tuple[Job, bool]:
+        """
+        Queues fn(progress) under key. Returns (job, created); created is False when the submission
+        was merged into an identical queued or running job.
+        """
+        with self._lock:
+            self._prune()
+            active_id = self._active_by_key.get(key)
+            if active_id and not self._jobs[active_id].finished:
+                return self._jobs[active_id], False
+            queued = sum(1 for job in self._jobs.values() if job.status == Job.QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs already waiting")
+            job = Job(key)
+            self._jobs[job.job_id] = job
+            self._active_by_key[key] = job.job_id
+            job.future = self._executor.submit(self._run, job, fn)
+        self._snapshot(job)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancels a queued job immediately, or flags a running one to stop at its next stage."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_requested.set()
+            if job.status == Job.QUEUED and job.future is not None and job.future.cancel():
+                self._finish(job, Job.CANCELLED)
+        self._snapshot(job)
+        return job
+
+    def _run(self, job: Job, fn):
+        with self._lock:
+            if job.cancel_requested.is_set():
+                self._finish(job, Job.CANCELLED)
+            else:
+                job.status = Job.RUNNING
+                job.started_at = time.time()
+        self._snapshot(job)
+        if job.finished:
+            return
+
+        def progress(stage: str):
+            if job.cancel_requested.is_set():
+                raise JobCancelled(stage)
+            now = time.time()
+            with self._lock:
+                if job.stages:
+                    job.stages[-1]["finished_at"] = now
+                job.stage = stage
+                job.stages.append({"stage": stage, "started_at": now, "finished_at": None})
+            self._snapshot(job)
+
+        try:
+            result = fn(progress)
+            with self._lock:
+                if job.stages:
+                    job.stages[-1]["finished_at"] = time.time()
+                job.result = result
+                if result and result.get("status") == "success":
+                    self._finish(job, Job.SUCCEEDED)
+                else:
+                    job.error = (result or {}).get("message", "Routine returned no result.")
+                    self._finish(job, Job.FAILED)
+        except JobCancelled:
+            with self._lock:
+                self._finish(job, Job.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.key}) failed: {e}")
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, Job.FAILED)
+        self._snapshot(job)
+
+        if job.status == Job.SUCCEEDED and self.on_success:
+            try:
+                self.on_success(job)
+            except Exception as e:
+                logger.error(f"on_success hook failed for {job.job_id}: {e}")
+
+    def _snapshot(self, job: Job):
+        if self.snapshot_store is None:
+            return
+        payload = {"job": job.to_dict(), "result": job.result if job.status == Job.SUCCEEDED else None}
+        self.snapshot_store.put_job(job.job_id, payload)
+
+    def _finish(self, job: Job, status: str):
+        # Caller holds the lock
+        job.status = status
+        job.finished_at = time.time()
+        if self._active_by_key.get(job.key) == job.job_id:
+            del self._active_by_key[job.key]
+
+    def _prune(self):
+        # Caller holds the lock; forget finished jobs past the retention window
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.job_id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -1,26 +1,77 @@
+import os
 import logging
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Iterator, Tuple, Any, Union
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 
 from app.core.adapters.research_crawler import MiraeResearchCrawler
 from app.core.adapters.youtube_connector import SmartMoneyConnector
+from app.core.adapters.pdf_ingest import PdfIngestor
 from app.core.ai.openai_engine import OpenAIEngine
 from app.core.engine.matcher import ContentMatcher
 from app.core.engine.router import SegmentRouter
-from app.models.resources import AuditRecord, PBActionDraft, HybridContentBundle
+from app.core.storage.customer_book import CustomerBook, load_customer_book
+from app.core.storage.action_queue import ActionQueue
+from app.core.storage.audit_log import AuditLog
+from app.models import serialization
+from app.models.resources import AuditRecord, PBActionDraft, HybridContentBundle, CustomerProfile, ResearchReport, SmartMoneyVideo
+from app.core.metrics import StageTimer
+from app.core.workflows.jobs import JobCancelled
+from app.core.workflows.stages import Stage, StagePass
+from app.core.workflows.speculative import SpeculativeCache
 
 logger = logging.getLogger(__name__)
 
+# Routine key -> (bundle routine_type, audit rationale)
+ROUTINES: Dict[str, Tuple[str, str]] = {
+    "A": ("Routine A: Daily Morning", "Generated morning routine based on latest available contents."),
+    "B": ("Routine B: Biweekly Deep", "Generated deep-dive routine from the most detailed of the latest reports."),
+    "C": ("Routine C: Weekend Theme", "Generated weekend theme routine from the latest video and its closest report."),
+    "D": ("Routine D: Educational", "Generated educational routine led by the latest video."),
+}
+
 class WorkflowOrchestrator:
     def __init__(self):
         self.crawler = MiraeResearchCrawler()
         self.yt_connector = SmartMoneyConnector()
+        self.pdf_ingestor = PdfIngestor(http=self.crawler.http)
         self.ai = OpenAIEngine()
         self.matcher = ContentMatcher(self.ai)
         self.router = SegmentRouter(self.ai)
-        
-    def run_routine_a_morning(self, target_report_id: str = None) -> Dict[str, any]:
+        # Columnar customer book from CUSTOMER_BOOK_PATH (CSV/Parquet); mock customers when unset
+        self.customer_book: Optional[CustomerBook] = load_customer_book()
+        # Attach the per-run stage timing breakdown to audit records (stage metrics are always collected)
+        self.audit_timings = os.environ.get("AUDIT_TIMINGS", "1") == "1"
+        # Routed drafts feed the persistent per-PB action queues (ACTION_QUEUE_ENABLED=0 keeps results in memory only)
+        self.action_queue: Optional[ActionQueue] = ActionQueue() if os.environ.get("ACTION_QUEUE_ENABLED", "1") == "1" else None
+        # Durable compliance trail of every delivered run and draft, written off the request path
+        self.audit_log: Optional[AuditLog] = AuditLog() if os.environ.get("AUDIT_LOG_ENABLED", "1") == "1" else None
+        # Shared stages of every routine; a StagePass runs each (stage, report/video) once however many routines use it
+        self.stages: Dict[str, Stage] = {
+            "crawl": Stage(self._stage_crawl),
+            "video_fetch": Stage(self._stage_video_fetch),
+            "content_fetch": Stage(self._stage_content_fetch, deps=("crawl",)),
+            "pdf_ingest": Stage(self._stage_pdf_ingest, deps=("content_fetch",)),       # (report_id)
+            "ai_parse": Stage(self._stage_ai_parse),                                     # (report_id)
+            "video_analysis": Stage(self._stage_video_analysis, deps=("video_fetch",)),  # (video_id)
+        }
+        self.stage_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("STAGE_MAX_WORKERS", "4")), thread_name_prefix="routine-stage"
+        )
+        # After each Routine A run, bundles and drafts for its top candidate reports are built in the
+        # background, so switching the routine to one of them is a lookup (SPECULATIVE_REPORTS=0 disables)
+        self.speculative_reports = int(os.environ.get("SPECULATIVE_REPORTS", "3"))
+        self.speculative = SpeculativeCache()
+        self._speculative_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="routine-speculative")
+
+    def new_stage_pass(self, routine: str, progress: Optional[Callable[[str], None]] = None) -> StagePass:
+        """A fresh pass: stage outputs are shared by the routines run with it, never across passes."""
+        return StagePass(self.stages, self.stage_executor, routine, progress)
+
+    def run_routine_a_morning(self, target_report_id: str = None, progress: Optional[Callable[[str], None]] = None,
+                              customers: Union[List[CustomerProfile], CustomerBook, None] = None,
+                              stages: Optional[StagePass] = None) -> Dict[str, any]:
         """
         Workflow 1: Daily Morning Hybrid Routine
         1. Discover daily market reports
@@ -28,41 +79,289 @@ class WorkflowOrchestrator:
         3. Parse & match
         4. Identify customers and generate drafts
         5. Write audit artifact
+        progress, if given, is called with each stage name as the stage starts.
+        customers defaults to the loaded customer book, else the mock customers.
+        stages shares crawl/fetch/parse outputs with other routines of the same pass (see run_all_routines).
+        With the default customers, a report precomputed after an earlier run is served from memory.
+        """
+        if customers is None:
+            if target_report_id:
+                cached = self.speculative_routine_a(target_report_id)
+                if cached is not None:
+                    return cached
+            stages = stages or self.new_stage_pass("A", progress)
+        result = self._run_routine("A", lambda s: self._select_routine_a(s, target_report_id), progress, customers, stages)
+        if customers is None and result["status"] == "success":
+            self._speculate(result, stages)
+        return result
+
+    def speculative_routine_a(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The precomputed Routine A result for report_id, or None. A hit puts its drafts on the action
+        queues and logs a new audit record for this delivery, which refers to the precomputed run's record
+        (that one is never appended again: audit ids stay unique in the trail).
+        """
+        result = self.speculative.get(report_id)
+        if result is not None:
+            logger.info(f"Serving precomputed Routine A for {report_id}")
+            precomputed = result["audit"]
+            audit = AuditRecord(**dict(
+                serialization.to_dict(precomputed),
+                audit_id=f"audit_{uuid.uuid4().hex[:8]}",
+                timestamp=datetime.now(),
+                decision_points=dict(precomputed.decision_points, served_from_precompute=precomputed.audit_id),
+                rationale=f"Served from precompute ({precomputed.audit_id}). {precomputed.rationale}",
+                timings={},
+            ))
+            # The cached result is shared by later hits, so it keeps its own record
+            result = dict(result, audit=audit)
+            if self.action_queue is not None:
+                self._enqueue(result["drafts"])
+            if self.audit_log is not None:
+                self.audit_log.append(audit, result["drafts"])
+        return result
+
+    def _speculate(self, result: Dict[str, Any], stages: StagePass):
+        """
+        Starts a new speculative generation from a fresh Routine A result: the result itself is kept, and
+        the top candidate reports are routed in the background, reusing the run's crawl, video analysis and
+        content fetch. Only the candidates' AI parses and drafts are new work.
+        """
+        if self.speculative_reports <= 0:
+            return
+        generation = self.speculative.new_generation()
+        main_report = result["bundle"].report_id
+        if main_report:
+            self.speculative.put(main_report, result, generation)
+        candidates = [r.report_id for r in result["other_reports"][:self.speculative_reports]]
+        if candidates:
+            # A detached view: the finished run's progress callback (e.g. its job) must not see these stages
+            self._speculative_executor.submit(self._precompute, candidates, stages.fork("A-speculative"), generation)
+
+    def _precompute(self, report_ids: List[str], stages: StagePass, generation: int):
+        for report_id in report_ids:
+            # A newer run supersedes this generation
+            if not self.speculative.is_current(generation):
+                return
+            if self.speculative.contains(report_id):
+                continue
+            try:
+                result = self._run_routine("A", lambda s: self._select_routine_a(s, report_id), None, None, stages, speculative=True)
+            except Exception as e:
+                logger.warning(f"Speculative Routine A for {report_id} failed: {e}")
+                continue
+            if result["status"] == "success" and result["bundle"].report_id == report_id:
+                self.speculative.put(report_id, result, generation)
+
+    def stream_routine_a_morning(self, target_report_id: str = None, progress: Optional[Callable[[str], None]] = None,
+                                 customers: Union[List[CustomerProfile], CustomerBook, None] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of run_routine_a_morning. Yields ("bundle", context) once matching is done,
+        then ("draft", PBActionDraft) for each draft as it is generated, and finally ("done", result)
+        with the same result run_routine_a_morning returns. A routine that cannot run yields ("error", result).
         """
-        logger.info("Starting Routine A: Daily Morning Hybrid")
+        timer = StageTimer("A", progress)
+        stages = self.new_stage_pass("A", progress)
+        default_customers = customers is None
+        try:
+            context = self._prepare_routine("A", lambda s: self._select_routine_a(s, target_report_id), stages, timer)
+            if context["status"] != "success":
+                timer.finish("error")
+                yield "error", context
+                return
+            yield "bundle", context
+            
+            timer("routing")
+            drafts: List[PBActionDraft] = []
+            if customers is None:
+                customers = self._default_customers()
+            for draft in self.router.iter_route_and_draft(
+                context["bundle"], customers, context["report_data"], context["video_data"]
+            ):
+                drafts.append(draft)
+                yield "draft", draft
+            drafts.sort(key=lambda x: x.follow_up_priority, reverse=True)
+        except JobCancelled:
+            timer.finish("cancelled")
+            raise
+        except Exception:
+            timer.finish("failed")
+            raise
+        result = self._finish_routine(context, drafts, timer, stages)
+        if default_customers:
+            self._speculate(result, stages)
+        yield "done", result
+
+    def run_routine_b_biweekly(self, progress: Optional[Callable[[str], None]] = None,
+                               customers: Union[List[CustomerProfile], CustomerBook, None] = None,
+                               stages: Optional[StagePass] = None) -> Dict[str, any]:
+        """Workflow 2: Biweekly Deep Portfolio (Sector/Earnings), text-first on the most detailed latest report."""
+        return self._run_routine("B", self._select_routine_b, progress, customers, stages)
+
+    def run_routine_c_weekend(self, progress: Optional[Callable[[str], None]] = None,
+                              customers: Union[List[CustomerProfile], CustomerBook, None] = None,
+                              stages: Optional[StagePass] = None) -> Dict[str, any]:
+        """Workflow 3: Weekend Theme Discovery, the latest video paired with the most similar latest report."""
+        return self._run_routine("C", self._select_routine_c, progress, customers, stages)
         
+    def run_routine_d_educational(self, progress: Optional[Callable[[str], None]] = None,
+                                  customers: Union[List[CustomerProfile], CustomerBook, None] = None,
+                                  stages: Optional[StagePass] = None) -> Dict[str, any]:
+        """Workflow 4: Educational Confidence Building, video-first with the latest report as follow-up reading."""
+        return self._run_routine("D", self._select_routine_d, progress, customers, stages)
+
+    def run_all_routines(self, progress: Optional[Callable[[str], None]] = None,
+                         customers: Union[List[CustomerProfile], CustomerBook, None] = None) -> Dict[str, Any]:
+        """
+        Runs routines A-D concurrently over one stage pass: every report and video is crawled, fetched and
+        parsed once, whichever routines use it. Returns {"status", "routines": {key: routine result}};
+        a routine that fails is reported in its slot without failing the others.
+        """
+        stages = self.new_stage_pass("ALL", progress)
+        stages.start("crawl")
+        stages.start("video_fetch")
+        runners = {
+            "A": self.run_routine_a_morning,
+            "B": self.run_routine_b_biweekly,
+            "C": self.run_routine_c_weekend,
+            "D": self.run_routine_d_educational,
+        }
+
+        def routine_progress(key: str) -> Optional[Callable[[str], None]]:
+            return (lambda stage: progress(f"{key}:{stage}")) if progress else None
+
+        results: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=len(runners), thread_name_prefix="routine") as pool:
+            futures = {
+                key: pool.submit(runner, progress=routine_progress(key), customers=customers, stages=stages)
+                for key, runner in runners.items()
+            }
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(f"Routine {key} failed: {e}")
+                    results[key] = {"status": "error", "message": str(e)}
+        succeeded = any(r.get("status") == "success" for r in results.values())
+        return {"status": "success" if succeeded else "error", "routines": results,
+                "message": "" if succeeded else "생성된 루틴이 없습니다."}
+
+    def _run_routine(self, key: str, select: Callable[[StagePass], Dict[str, Any]],
+                     progress: Optional[Callable[[str], None]],
+                     customers: Union[List[CustomerProfile], CustomerBook, None],
+                     stages: Optional[StagePass], speculative: bool = False) -> Dict[str, Any]:
+        """speculative runs are timed under their own label and leave the action queues and audit log alone."""
+        timer = StageTimer(f"{key}-speculative" if speculative else key, progress)
+        if stages is None:
+            stages = self.new_stage_pass(key, progress)
+        try:
+            context = self._prepare_routine(key, select, stages, timer)
+            if context["status"] != "success":
+                timer.finish("error")
+                return context
+            
+            # 5. Routing
+            timer("routing")
+            if customers is None:
+                customers = self._default_customers()
+            drafts: List[PBActionDraft] = self.router.route_and_draft(
+                context["bundle"], customers, context["report_data"], context["video_data"]
+            )
+        except JobCancelled:
+            timer.finish("cancelled")
+            raise
+        except Exception:
+            timer.finish("failed")
+            raise
+        return self._finish_routine(context, drafts, timer, stages, enqueue=not speculative)
+
+    def _default_customers(self) -> Union[List[CustomerProfile], CustomerBook]:
+        if self.customer_book is not None:
+            return self.customer_book
+        return self.router.get_mock_customers()
+
+    # Shared stages: fn(stage_pass, *dep outputs, *args)
+
+    def _stage_crawl(self, stages: StagePass) -> List[ResearchReport]:
         # 1. Fetch Candidates (Store them for history)
         reports = self.crawler.fetch_recent_reports(limit=5)
-        self.crawler.save_reports(reports) 
-        
-        videos = []
+        self.crawler.save_reports(reports)
+        # 2. Add to historical matcher DB for mock RAG
+        self.matcher.add_to_history(reports)
+        return reports
+
+    def _stage_video_fetch(self, stages: StagePass) -> List[SmartMoneyVideo]:
         try:
-            videos = self.yt_connector.fetch_recent_videos(limit=3)
+            return self.yt_connector.fetch_recent_videos(limit=3)
         except Exception as e:
             logger.warning(f"Failed to fetch videos: {e}")
-            
-        # 2. Add to historical matcher DB for mock RAG
-        self.matcher.add_to_history(reports)
-        
+            return []
+
+    def _stage_content_fetch(self, stages: StagePass, reports: List[ResearchReport]) -> List[ResearchReport]:
+        # Full contents of every candidate, so they all carry normalized_text
+        self.crawler.fetch_contents_bulk(reports)
+        return reports
+
+    def _stage_pdf_ingest(self, stages: StagePass, reports: List[ResearchReport], report_id: str) -> Optional[ResearchReport]:
+        """The report with its full text; one outside the latest candidates is loaded from stored history."""
+        report = next((r for r in reports if r.report_id == report_id), None)
+        if report is None:
+            report = self.crawler.get_report(report_id)
+            if report is None:
+                return None
+            logger.info(f"Report found in history: {report.title}")
+            self.crawler.fetch_contents_bulk([report])
+        # Attachment text (once per report; stored with the report)
+        ingested = self.pdf_ingestor.ingest([report])
+        if ingested:
+            self.crawler.save_reports(ingested)
+        return report
+
+    def _stage_ai_parse(self, stages: StagePass, report_id: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """(report_data, token usage) of a report; tags the report and re-indexes it."""
+        report = stages.get("pdf_ingest", report_id)
+        report_data, report_token_usage = self.ai.parse_research_report_with_usage(
+            report.normalized_text or report.title, report.page_offsets if report.normalized_text else None
+        )
+        report_data['report_title'] = report.title # Pass Title to UI
+        report_data['source_url'] = report.source_url # Pass URL to UI
+        if report.attachment_urls:
+            report_data["pdf_url"] = report.attachment_urls[0]
+        report.tags = report_data.get("sector_impact", []) + report_data.get("asset_class_impact", [])
+        # Re-index the report now that it has tags
+        self.matcher.add_to_history([report])
+        return report_data, report_token_usage
+
+    def _stage_video_analysis(self, stages: StagePass, videos: List[SmartMoneyVideo], video_id: str) -> Dict[str, Any]:
+        video = next(v for v in videos if v.video_id == video_id)
+        video_data = self.ai.analyze_video(video.title, video.description)
+        video_data["source_url"] = video.source_url # Pass URL to UI
+        video.tags = video_data.get("topic_tags", [])
+        return video_data
+
+    # Content selection per routine: {"status", "main_report", "main_video", "other_reports"} or an error result
+
+    @staticmethod
+    def _selection(main_report: Optional[ResearchReport], main_video: Optional[SmartMoneyVideo],
+                   reports: List[ResearchReport]) -> Dict[str, Any]:
+        # Other candidate reports for today (excluding the one we currently focus on)
+        other_reports = [r for r in reports if not main_report or r.report_id != main_report.report_id]
+        return {"status": "success", "main_report": main_report, "main_video": main_video, "other_reports": other_reports}
+
+    def _select_routine_a(self, stages: StagePass, target_report_id: Optional[str]) -> Dict[str, Any]:
+        stages.start("video_fetch")
+        reports = stages.get("crawl")
+        videos = stages.get("video_fetch")
         if not reports and not videos:
             return {"status": "error", "message": "오늘의 루틴을 생성할 새로운 리서치나 영상이 없습니다."}
             
         main_report = None
         if target_report_id:
             logger.info(f"Targeting specific report: {target_report_id}")
-            for r in reports:
-                if r.report_id == target_report_id:
-                    main_report = r
-                    break
-            
-            if not main_report:
-                # Look in full history if not in top 5
-                all_history = self.crawler.load_all_reports()
-                for r in all_history:
-                    if r.report_id == target_report_id:
-                        main_report = r
-                        logger.info(f"Report found in history: {r.title}")
-                        break
+            # Looks in stored history if not in top 5
+            main_report = stages.get("pdf_ingest", target_report_id)
         
         if not main_report and reports:
             main_report = reports[0]
@@ -70,41 +369,93 @@ class WorkflowOrchestrator:
         
         if not main_report:
             return {"status": "error", "message": "요청하신 리포트를 찾을 수 없습니다."}
-            
-        main_video = videos[0] if videos else None
-        
-        # Keep track of other candidate reports for today (excluding the one we currenty focus on)
-        other_reports = [r for r in reports if r.report_id != main_report.report_id]
-        
-        # If the main report was from history, it won't be in the 'reports' list, 
-        # so candidates stay as they were fetched.
-        
-        report_data = {}
-        if main_report:
-            # Fetch full contents if possible
-            self.crawler.fetch_report_contents(main_report)
-            report_data = self.ai.parse_research_report(main_report.normalized_text or main_report.title) 
-            report_data['report_title'] = main_report.title # Pass Title to UI
-            report_data['source_url'] = main_report.source_url # Pass URL to UI
-            if main_report.attachment_urls:
-                report_data["pdf_url"] = main_report.attachment_urls[0]
-            main_report.tags = report_data.get("sector_impact", []) + report_data.get("asset_class_impact", [])
-        else:
-            report_data = {"thesis": "지정된 리서치 리포트가 없습니다.", "sector_impact": [], "asset_class_impact": []}
-        
-        video_data = {}
+        return self._selection(main_report, videos[0] if videos else None, reports)
+
+    def _select_routine_b(self, stages: StagePass) -> Dict[str, Any]:
+        # Text-first: the latest report with the most body text (ties go to the newest)
+        reports = stages.get("content_fetch")
+        if not reports:
+            return {"status": "error", "message": "심층 분석할 리서치 리포트가 없습니다."}
+        main_report = max(reports, key=lambda r: len(r.normalized_text or ""))
+        return self._selection(main_report, None, reports)
+
+    def _select_routine_c(self, stages: StagePass) -> Dict[str, Any]:
+        stages.start("crawl")
+        videos = stages.get("video_fetch")
+        reports = stages.get("crawl")
+        if not videos:
+            return {"status": "error", "message": "주말 테마를 선정할 영상이 없습니다."}
+        main_video = videos[0]
+        # The theme comes from the video; the report is the latest one closest to it
+        latest = {r.report_id: r for r in reports}
+        hits = self.matcher.search_similar_reports(f"{main_video.title}\n{main_video.description}", top_k=max(20, len(latest)))
+        main_report = next((latest[r.report_id] for r, _ in hits if r.report_id in latest), reports[0] if reports else None)
+        return self._selection(main_report, main_video, reports)
+
+    def _select_routine_d(self, stages: StagePass) -> Dict[str, Any]:
+        stages.start("crawl")
+        videos = stages.get("video_fetch")
+        reports = stages.get("crawl")
+        if not videos:
+            return {"status": "error", "message": "교육용으로 제공할 영상이 없습니다."}
+        return self._selection(reports[0] if reports else None, videos[0], reports)
+
+    def _prepare_routine(self, key: str, select: Callable[[StagePass], Dict[str, Any]],
+                         stages: StagePass, timer: StageTimer) -> Dict[str, Any]:
+        """Stages 1-4 (crawl, video fetch, content fetch, AI parse, matching) through the stage pass."""
+        routine_type = ROUTINES[key][0]
+        logger.info(f"Starting {routine_type}")
+        selection = select(stages)
+        if selection["status"] != "success":
+            return selection
+        main_report = selection["main_report"]
+        main_video = selection["main_video"]
+
+        # Report parsing and video analysis are independent
         if main_video:
-            video_data = self.ai.analyze_video(main_video.title, main_video.description)
-            video_data["source_url"] = main_video.source_url # Pass URL to UI
-            main_video.tags = video_data.get("topic_tags", [])
+            stages.start("video_analysis", main_video.video_id)
+        report_data: Dict[str, Any] = {"thesis": "지정된 리서치 리포트가 없습니다.", "sector_impact": [], "asset_class_impact": []}
+        report_token_usage: Dict[str, int] = {}
+        if main_report:
+            parsed, report_token_usage = stages.get("ai_parse", main_report.report_id)
+            # Copies: the parsed outputs are shared with the other routines of the pass
+            report_data = dict(parsed)
+        video_data = dict(stages.get("video_analysis", main_video.video_id)) if main_video else {}
             
         # 4. Matching
-        bundle = self.matcher.create_hybrid_bundle(main_report, main_video, "Routine A: Daily Morning")
+        timer("matching")
+        bundle = self.matcher.create_hybrid_bundle(main_report, main_video, routine_type)
         
-        # 5. Routing
-        mock_customers = self.router.get_mock_customers()
-        # Use empty dict if data is missing, so AI knows it's empty
-        drafts: List[PBActionDraft] = self.router.route_and_draft(bundle, mock_customers, report_data or {}, video_data or {})
+        return {
+            "status": "success",
+            "bundle": bundle,
+            "report_data": report_data,
+            "video_data": video_data,
+            "main_report": main_report,
+            "main_video": main_video,
+            "other_reports": selection["other_reports"],
+            "report_token_usage": report_token_usage
+        }
+
+    def _enqueue(self, drafts: List[PBActionDraft]):
+        try:
+            queued = self.action_queue.enqueue(drafts)
+            logger.info(f"Queued {queued} new actions")
+        except Exception as e:
+            logger.error(f"Failed to update action queues: {e}")
+
+    def _finish_routine(self, context: Dict[str, Any], drafts: List[PBActionDraft], timer: StageTimer,
+                        stages: StagePass, enqueue: bool = True) -> Dict[str, Any]:
+        """Stage 6: queues the drafts, writes the audit artifact and assembles the routine result."""
+        if enqueue and self.action_queue is not None:
+            timer("queue")
+            self._enqueue(drafts)
+        # Shared stage timings first; in a multi-routine pass they cover the whole pass
+        timings = {**stages.timings, **timer.finish()}
+        bundle = context["bundle"]
+        main_report = context["main_report"]
+        main_video = context["main_video"]
+        rationale = next(text for routine_type, text in ROUTINES.values() if routine_type == bundle.routine_type)
         
         # 6. Audit
         audit = AuditRecord(
@@ -112,30 +463,25 @@ class WorkflowOrchestrator:
             timestamp=datetime.now(),
             report_id=main_report.report_id if main_report else None,
             video_id=main_video.video_id if main_video else None,
-            workflow_name="Routine A: Daily Morning",
+            workflow_name=bundle.routine_type,
             decision_points={"match_reason": bundle.match_reason, "target_segments": bundle.target_segments},
-            generated_outputs={"draft_count": len(drafts)},
-            rationale="Generated morning routine based on latest available contents."
+            generated_outputs={
+                "draft_count": len(drafts),
+                "draft_generation": dict(self.router.last_draft_stats),
+                "report_token_usage": context["report_token_usage"]
+            },
+            rationale=rationale,
+            timings=timings if self.audit_timings else {}
         )
+        if enqueue and self.audit_log is not None:
+            self.audit_log.append(audit, drafts)
         
         return {
             "status": "success",
             "bundle": bundle,
             "drafts": drafts,
             "audit": audit,
-            "report_data": report_data,
-            "video_data": video_data,
-            "other_reports": other_reports
+            "report_data": context["report_data"],
+            "video_data": context["video_data"],
+            "other_reports": context["other_reports"]
         }
-        
-    def run_routine_b_biweekly(self) -> Dict[str, any]:
-        # Similar structure adapted for Biweekly Deep Portfolio (Sector/Earnings)
-        pass
-
-    def run_routine_c_weekend(self) -> Dict[str, any]:
-        # Similar structure adapted for Weekend Theme Discovery
-        pass
-        
-    def run_routine_d_educational(self) -> Dict[str, any]:
-        # Similar structure adapted for Educational Confidence Building
-        pass
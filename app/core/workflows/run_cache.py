@@ -0,0 +1,124 @@
+import os
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class CachedRun:
+    """A routine result together with the time it was generated."""
+    def __init__(self, result: Dict[str, Any], created_at: Optional[float] = None):
+        self.result = result
+        self.created_at = created_at if created_at is not None else time.time()
+
+    @property
+    def age_seconds(self) -> float:
+        return max(time.time() - self.created_at, 0.0)
+
+class RunCache:
+    """Last good result per routine key, kept in process memory."""
+    def __init__(self):
+        self._runs: Dict[str, CachedRun] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedRun]:
+        with self._lock:
+            return self._runs.get(key)
+
+    def put(self, key: str, result: Dict[str, Any]) -> CachedRun:
+        run = CachedRun(result)
+        with self._lock:
+            self._runs[key] = run
+        return run
+
+    def put_job(self, job_id: str, payload: Dict[str, Any]):
+        """Job snapshots are only needed when several processes serve the API."""
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+class SQLiteRunCache(RunCache):
+    """
+    Run results shared by every worker process on the host through one SQLite file.
+    Each put is a single transaction, so readers see either the old or the new result, never a partial one.
+    Unpickled results are memoized per process until a newer result is written.
+    """
+    def __init__(self, db_path: Optional[str] = None, job_retention_seconds: int = 3600):
+        super().__init__()
+        self.db_path = db_path or os.environ.get("RUN_CACHE_PATH", "data/run_cache.sqlite3")
+        self.job_retention_seconds = job_retention_seconds
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    payload BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    payload BLOB NOT NULL
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[CachedRun]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT created_at FROM runs WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                with self._lock:
+                    local = self._runs.get(key)
+                if local is not None and local.created_at == row[0]:
+                    return local
+                row = conn.execute("SELECT created_at, payload FROM runs WHERE key = ?", (key,)).fetchone()
+            run = CachedRun(pickle.loads(row[1]), created_at=row[0])
+        except Exception as e:
+            logger.error(f"Shared run cache read failed: {e}")
+            return super().get(key)
+        with self._lock:
+            self._runs[key] = run
+        return run
+
+    def put(self, key: str, result: Dict[str, Any]) -> CachedRun:
+        run = CachedRun(result)
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO runs (key, created_at, payload) VALUES (?, ?, ?)", (key, run.created_at, payload))
+        with self._lock:
+            self._runs[key] = run
+        return run
+
+    def put_job(self, job_id: str, payload: Dict[str, Any]):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("INSERT OR REPLACE INTO jobs (job_id, updated_at, payload) VALUES (?, ?, ?)",
+                             (job_id, now, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)))
+                conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.job_retention_seconds,))
+                conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Shared job snapshot write failed: {e}")
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
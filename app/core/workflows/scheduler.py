@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable
+from app.core.workflows.run_cache import RunCache, CachedRun
+from app.core.storage.file_lock import FileLock
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+class RoutineScheduler:
+    """
+    Builds routine results ahead of time and serves them stale-while-revalidate:
+    readers always get the last good result immediately, and a stale or missing result
+    only triggers a single background refresh per routine. A per-routine file lock makes the
+    refresh single-flight across worker processes sharing the cache, not just across threads.
+    """
+    def __init__(self,
+                 orchestrator,
+                 cache: Optional[RunCache] = None,
+                 max_age_seconds: Optional[int] = None,
+                 precompute_times: Optional[List[str]] = None):
+        self.orchestrator = orchestrator
+        self.cache = cache or RunCache()
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else int(os.environ.get("ROUTINE_MAX_AGE_SECONDS", "3600"))
+        # "HH:MM" local times at which routines are rebuilt regardless of age (default: before market open)
+        if precompute_times is None:
+            precompute_times = [t.strip() for t in os.environ.get("ROUTINE_PRECOMPUTE_TIMES", "07:30").split(",") if t.strip()]
+        self.precompute_times = precompute_times
+        self.routines: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "A": self.orchestrator.run_routine_a_morning,
+        }
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._refresh_locks: Dict[str, FileLock] = {
+            key: FileLock(os.path.join(os.environ.get("LOCK_DIR", "data/locks"), f"routine_{key}.lock"))
+            for key in self.routines
+        }
+        self._thread: Optional[threading.Thread] = None
+        # After a failed refresh, automatic retries wait this long
+        self.retry_seconds = int(os.environ.get("ROUTINE_RETRY_SECONDS", "300"))
+        self._last_failure: Dict[str, float] = {}
+
+    def get(self, key: str = "A") -> Optional[CachedRun]:
+        """Returns the last good result and revalidates it in the background if it is stale or missing."""
+        cached = self.cache.get(key)
+        record_cache("routine_run", cached is not None)
+        if self._needs_refresh(cached, datetime.now()):
+            self.trigger_refresh(key)
+        return cached
+
+    def is_refreshing(self, key: str = "A") -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return True
+        # Another worker process may be building it
+        return self._refresh_locks[key].is_locked()
+
+    def _needs_refresh(self, cached: Optional[CachedRun], now: datetime) -> bool:
+        """Missing, older than max_age, or built before the latest precompute slot that has passed today."""
+        if cached is None or cached.age_seconds > self.max_age_seconds:
+            return True
+        for slot in self.precompute_times:
+            hour, minute = (int(part) for part in slot.split(":"))
+            slot_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if now >= slot_time and cached.created_at < slot_time.timestamp():
+                return True
+        return False
+
+    def trigger_refresh(self, key: str = "A", force: bool = False) -> bool:
+        """Starts a background refresh unless one is already running for this routine."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            if not force and time.time() - self._last_failure.get(key, 0) < self.retry_seconds:
+                return False
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, force), name=f"routine-refresh-{key}", daemon=True).start()
+        return True
+
+    def refresh_now(self, key: str = "A") -> Optional[CachedRun]:
+        """Runs a routine synchronously and caches it if it succeeded."""
+        started = time.time()
+        result = self.routines[key]()
+        if result and result.get("status") == "success":
+            logger.info(f"Routine {key} precomputed in {time.time() - started:.1f}s")
+            self._last_failure.pop(key, None)
+            return self.cache.put(key, result)
+        # Keep serving the previous good result
+        self._last_failure[key] = time.time()
+        logger.warning(f"Routine {key} refresh returned no usable result: {result.get('message') if result else None}")
+        return None
+
+    def _refresh(self, key: str, force: bool = False):
+        lock = self._refresh_locks[key]
+        try:
+            if not lock.acquire(blocking=False):
+                # Another process is already refreshing this routine
+                return
+            try:
+                # Re-check under the lock: another worker may have just published a fresh result
+                if force or self._needs_refresh(self.cache.get(key), datetime.now()):
+                    self.refresh_now(key)
+            finally:
+                lock.release()
+        except Exception as e:
+            self._last_failure[key] = time.time()
+            logger.error(f"Error refreshing routine {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _loop(self, poll_seconds: int):
+        while True:
+            now = datetime.now()
+            for key in self.routines:
+                # Covers the startup build, max-age expiry and the precompute slots before market open
+                if self._needs_refresh(self.cache.get(key), now):
+                    self.trigger_refresh(key)
+            time.sleep(poll_seconds)
+
+    def start(self, poll_seconds: int = 60):
+        """Starts the precompute loop in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, args=(poll_seconds,), name="routine-scheduler", daemon=True)
+        self._thread.start()
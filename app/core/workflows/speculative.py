@@ -0,0 +1,83 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from app.models import serialization
+from app.models.resources import PBActionDraft
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+def estimate_result_bytes(result: Dict[str, Any]) -> int:
+    """Approximate footprint of a routine result: the serialized size of its drafts, bundle and parsed data."""
+    size = len(serialization.dump_models(PBActionDraft, result.get("drafts", [])))
+    size += len(serialization.dump_model(result["bundle"]))
+    size += len(serialization.dumps(result.get("report_data", {}))) + len(serialization.dumps(result.get("video_data", {})))
+    return size
+
+class SpeculativeCache:
+    """
+    Routine A results precomputed for candidate reports, keyed by report_id, in process memory.
+    Entries belong to a generation: the routine run whose crawl and video they were built from. Starting a
+    new generation drops the older entries, so a lookup never mixes in a previous day's video or customers.
+    Least recently used entries are evicted past max_entries or max_bytes (estimated serialized size).
+    """
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, max_age_seconds: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("SPECULATIVE_CACHE_ENTRIES", "16"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("SPECULATIVE_CACHE_MAX_MB", "64")) * 2**20
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else int(os.environ.get("ROUTINE_MAX_AGE_SECONDS", "3600"))
+        self.generation = 0
+        self.total_bytes = 0
+        # report_id -> (result, size, created_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def new_generation(self) -> int:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.total_bytes = 0
+            return self.generation
+
+    def is_current(self, generation: int) -> bool:
+        with self._lock:
+            return generation == self.generation
+
+    def contains(self, report_id: str) -> bool:
+        with self._lock:
+            return report_id in self._entries
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(report_id)
+            if entry is not None and time.time() - entry[2] > self.max_age_seconds:
+                self._drop(report_id)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(report_id)
+        record_cache("speculative_bundle", entry is not None)
+        return entry[0] if entry else None
+
+    def put(self, report_id: str, result: Dict[str, Any], generation: int) -> bool:
+        """Stores a result built in generation; False if that generation is over or the result alone exceeds max_bytes."""
+        size = estimate_result_bytes(result)
+        if size > self.max_bytes:
+            logger.info(f"Speculative result for {report_id} ({size} bytes) exceeds the cache limit")
+            return False
+        with self._lock:
+            if generation != self.generation:
+                return False
+            if report_id in self._entries:
+                self._drop(report_id)
+            self._entries[report_id] = (result, size, time.time())
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return True
+
+    def _drop(self, report_id: str):
+        # Caller holds the lock
+        _, size, _ = self._entries.pop(report_id)
+        self.total_bytes -= size
@@ -0,0 +1,100 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+from app.core.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class Stage(NamedTuple):
+    """
+    A workflow stage: fn(stage_pass, *dep_outputs, *args). deps are argument-free stages whose outputs
+    are passed in; they are started concurrently before fn runs. Stages keyed by an argument (e.g. one
+    parse per report) are requested from inside fn with stage_pass.get(name, arg).
+    """
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+
+class _Slot:
+    __slots__ = ("future", "claimed")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.claimed = False
+
+class StagePass:
+    """
+    One pass over the workflow stages, shared by every routine run in it. Each (stage, args) key runs
+    at most once per pass; later requests, from any routine or thread, get the memoized output (or the
+    memoized error). Independent stages run concurrently on the executor.
+
+    A key is claimed by the first thread that actually runs it (a request runs an unclaimed key inline),
+    so a thread only ever waits on a stage that is running, and a busy executor cannot deadlock the pass.
+    progress, if given, is called with the stage name as each stage starts (the job cancel checkpoint).
+    """
+    def __init__(self, stages: Dict[str, Stage], executor: ThreadPoolExecutor, routine: str,
+                 progress: Optional[Callable[[str], None]] = None):
+        self.stages = stages
+        self.executor = executor
+        self.routine = routine
+        self.progress = progress
+        # Seconds per stage name, summed over its keys (for the audit record)
+        self.timings: Dict[str, float] = {}
+        self._slots: Dict[Tuple, _Slot] = {}
+        self._lock = threading.Lock()
+
+    def fork(self, routine: str, progress: Optional[Callable[[str], None]] = None) -> "StagePass":
+        """A view sharing this pass's memoized outputs, with its own metrics label, progress and timings."""
+        view = StagePass(self.stages, self.executor, routine, progress)
+        view._slots, view._lock = self._slots, self._lock
+        return view
+
+    def get(self, name: str, *args) -> Any:
+        """Output of the stage, running it in this thread if nobody has started it yet."""
+        slot, claimed = self._claim((name,) + args)
+        if claimed:
+            self._execute(name, args, slot)
+        return slot.future.result()
+
+    def start(self, name: str, *args):
+        """Starts the stage in the background if it is not running or done yet."""
+        key = (name,) + args
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and slot.claimed:
+                return
+        self.executor.submit(self._run_background, key)
+
+    def _claim(self, key: Tuple) -> Tuple[_Slot, bool]:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = _Slot()
+            claimed = not slot.claimed
+            slot.claimed = True
+        return slot, claimed
+
+    def _run_background(self, key: Tuple):
+        slot, claimed = self._claim(key)
+        if claimed:
+            self._execute(key[0], key[1:], slot)
+
+    def _execute(self, name: str, args: Tuple, slot: _Slot):
+        stage = self.stages[name]
+        try:
+            for dep in stage.deps[1:]:
+                self.start(dep)
+            inputs = [self.get(dep) for dep in stage.deps]
+            if self.progress:
+                self.progress(name)
+            started = time.perf_counter()
+            result = stage.fn(self, *inputs, *args)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 4)
+            STAGE_SECONDS.observe(elapsed, routine=self.routine, stage=name)
+        except BaseException as e:
+            slot.future.set_exception(e)
+        else:
+            slot.future.set_result(result)
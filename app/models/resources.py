@@ -11,6 +11,8 @@ class ResearchReport(BaseModel):
     source_url: str
     attachment_urls: List[str] = []
     normalized_text: str = ""
+    pdf_hashes: List[str] = [] # SHA-256 of ingested attachments; empty until PDF text is appended
+    page_offsets: List[int] = [] # start of each PDF page within normalized_text
     tags: List[str] = []
     asset_class_tags: List[str] = []
     region_tags: List[str] = []
@@ -66,10 +68,12 @@ class CustomerProfile(BaseModel):
     media_preference: str = ""
     segment_id: str # S1, S2, S3, S4
     modifiers: List[str] = []
+    pb_id: str = "" # owning PB; empty means the default queue
 
 class PBActionDraft(BaseModel):
     action_id: str
     customer_id: str
+    pb_id: str = ""
     bundle_id: str
     routine_type: str
     outreach_channel: str = ""
@@ -90,3 +94,4 @@ class AuditRecord(BaseModel):
     generated_outputs: Dict = {}
     rationale: str = ""
     human_review_status: str = "pending"
+    timings: Dict[str, float] = {} # stage -> seconds for the run that produced this record
@@ -0,0 +1,118 @@
+"""
+Fast (de)serialization for the resource models.
+
+Model JSON is compact (no indentation). With pydantic v2, models are encoded and decoded by
+pydantic-core's native JSON support: one pass from bytes to models with no intermediate dicts, which is
+faster than model_construct on trusted data. With pydantic v1, JSON goes through orjson (when installed)
+and trusted data is rebuilt with construct(), skipping validation. Bulk loads pause the cyclic garbage
+collector, since building many small acyclic objects otherwise triggers repeated full collections.
+"""
+import gc
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple, Type, TypeVar, Union, get_args, get_type_hints
+from pydantic import BaseModel
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from pydantic import TypeAdapter
+except ImportError:
+    TypeAdapter = None
+
+M = TypeVar("M", bound=BaseModel)
+
+PYDANTIC_V2 = TypeAdapter is not None
+
+def _default(value: Any) -> str:
+    # Same fallback the stores used with json.dump(..., default=str)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON for plain data; datetimes become ISO 8601 strings."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@contextmanager
+def gc_paused():
+    """Disables the cyclic GC for a bulk build (reference counting still frees memory)."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def to_dict(model: BaseModel) -> Dict[str, Any]:
+    """Plain field dict (pydantic v2 model_dump, v1 dict)."""
+    if PYDANTIC_V2:
+        return model.model_dump()
+    return model.dict()
+
+def copy_model(model: M) -> M:
+    """Deep copy (pydantic v2 model_copy, v1 copy)."""
+    if PYDANTIC_V2:
+        return model.model_copy(deep=True)
+    return model.copy(deep=True)
+
+@lru_cache(maxsize=None)
+def _list_adapter(cls: Type[BaseModel]):
+    return TypeAdapter(List[cls])
+
+@lru_cache(maxsize=None)
+def _datetime_fields(cls: Type[BaseModel]) -> Tuple[str, ...]:
+    """Fields annotated datetime or Optional[datetime]."""
+    return tuple(
+        name for name, annotation in get_type_hints(cls).items()
+        if annotation is datetime or datetime in get_args(annotation)
+    )
+
+def construct(cls: Type[M], data: Dict[str, Any]) -> M:
+    """Builds a model from trusted data without validation; ISO datetime strings are parsed."""
+    for name in _datetime_fields(cls):
+        value = data.get(name)
+        if isinstance(value, str):
+            data[name] = datetime.fromisoformat(value)
+    if PYDANTIC_V2:
+        return cls.model_construct(**data)
+    return cls.construct(**data)
+
+def dump_model(model: BaseModel) -> bytes:
+    if PYDANTIC_V2:
+        return model.model_dump_json().encode("utf-8")
+    return dumps(to_dict(model))
+
+def load_model(cls: Type[M], data: Union[bytes, str], trusted: bool = True) -> M:
+    """One model from JSON we wrote (trusted) or from elsewhere (trusted=False always validates)."""
+    if PYDANTIC_V2:
+        return cls.model_validate_json(data)
+    item = loads(data)
+    return construct(cls, item) if trusted else cls(**item)
+
+def dump_models(cls: Type[M], models: Iterable[M]) -> bytes:
+    """A JSON array of cls models."""
+    if PYDANTIC_V2:
+        return _list_adapter(cls).dump_json(list(models))
+    return dumps([to_dict(m) for m in models])
+
+def load_models(cls: Type[M], data: Union[bytes, str], trusted: bool = True) -> List[M]:
+    """Reads a JSON array written by dump_models (trusted) or from elsewhere (trusted=False validates)."""
+    with gc_paused():
+        if PYDANTIC_V2:
+            return _list_adapter(cls).validate_json(data)
+        items = loads(data)
+        if trusted:
+            return [construct(cls, item) for item in items]
+        return [cls(**item) for item in items]
@@ -0,0 +1,9 @@
+"""WSGI entry point, e.g. `gunicorn app.wsgi:app`: builds the services of each worker process."""
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.app import create_app
+
+app = create_app()
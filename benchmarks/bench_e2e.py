@@ -0,0 +1,166 @@
+"""
+End-to-end routine benchmark against local stand-ins for the research board, YouTube and OpenAI.
+
+    python -m benchmarks.bench_e2e [--customers 10,1000,10000,100000] [--iterations 5]
+                                   [--llm-latency-ms 50] [--llm-error-rate 0.0] [--requests 50]
+
+Runs run_routine_a_morning over synthetic customer books, then the Flask endpoints (dashboard,
+job API, SSE stream, metrics). Reports p50/p95 latency, throughput and peak memory.
+Everything is written to a temporary working directory; nothing touches the network.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.stand_ins import FixtureServer, FakeOpenAIServer, point_adapters_at
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def _timed(fn: Callable, iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _peak_memory(fn: Callable) -> int:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def _row(name: str, samples: List[float], peak: int = 0, extra: str = "") -> str:
+    total = sum(samples)
+    throughput = len(samples) / total if total else 0.0
+    peak_text = f"{peak / 2**20:>9.1f}" if peak else f"{'-':>9}"
+    return (f"{name:<28} {percentile(samples, 50) * 1000:>9.1f} {percentile(samples, 95) * 1000:>9.1f} "
+            f"{throughput:>8.2f} {peak_text}  {extra}")
+
+HEADER = f"{'case':<28} {'p50 ms':>9} {'p95 ms':>9} {'per s':>8} {'peak MiB':>9}"
+
+def bench_routines(customer_counts: List[int], iterations: int, llm: FakeOpenAIServer, columnar: bool):
+    from app.core.workflows.routines import WorkflowOrchestrator
+    from app.core.storage.customer_book import CustomerBook
+    from benchmarks.customers import synthetic_customers
+
+    orchestrator = WorkflowOrchestrator()
+    # Warm-up: first crawl fills the store and vector index, and primes validators for 304s
+    orchestrator.run_routine_a_morning()
+
+    print(f"run_routine_a_morning ({'columnar CustomerBook' if columnar else 'list of CustomerProfile'})")
+    print(HEADER)
+    for count in customer_counts:
+        book = synthetic_customers(count)
+        if columnar:
+            book = CustomerBook.from_profiles(book)
+        drafts = []
+        llm_before = llm.requests
+
+        def run():
+            result = orchestrator.run_routine_a_morning(customers=book)
+            assert result["status"] == "success", result
+            drafts.append(len(result["drafts"]))
+
+        samples = _timed(run, iterations)
+        llm_calls = (llm.requests - llm_before) / iterations
+        peak = _peak_memory(run)
+        drafts_per_s = sum(drafts[:iterations]) / sum(samples)
+        print(_row(f"{count} customers", samples, peak,
+                   f"{drafts[0]} drafts/run, {drafts_per_s:,.0f} drafts/s, {llm_calls:.1f} LLM calls/run"))
+    print()
+
+def bench_endpoints(requests_per_case: int):
+    from app.app import create_app
+    client = create_app().test_client()
+
+    def dashboard():
+        assert client.get("/").status_code == 200
+
+    def job_roundtrip():
+        job = client.post("/jobs", json={"routine_type": "A"}).get_json()
+        while True:
+            status = client.get(job["status_url"]).get_json()
+            if status["status"] not in ("queued", "running"):
+                assert status["status"] == "succeeded", status
+                return
+            time.sleep(0.005)
+
+    first_draft: List[float] = []
+
+    def stream():
+        start = time.perf_counter()
+        response = client.get("/stream_routine?routine_type=A")
+        seen_draft = False
+        for chunk in response.response:
+            if not seen_draft and b"event: draft" in chunk:
+                first_draft.append(time.perf_counter() - start)
+                seen_draft = True
+        response.close()
+
+    def metrics():
+        assert client.get("/metrics").status_code == 200
+
+    job_roundtrip()  # warm the shared run cache so the dashboard serves a result
+    print("Flask endpoints")
+    print(HEADER)
+    print(_row("GET /", _timed(dashboard, requests_per_case), _peak_memory(dashboard)))
+    print(_row("GET /metrics", _timed(metrics, requests_per_case)))
+    runs = max(1, requests_per_case // 10)
+    print(_row("POST /jobs until done", _timed(job_roundtrip, runs)))
+    stream_samples = _timed(stream, runs)
+    print(_row("GET /stream_routine", stream_samples, extra=f"first draft p50 {percentile(first_draft, 50) * 1000:.1f} ms"))
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", default="10,1000,10000,100000", help="comma-separated book sizes")
+    parser.add_argument("--iterations", type=int, default=5, help="routine runs per book size")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint case")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="mean fake OpenAI latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of fake OpenAI calls that fail with 500")
+    parser.add_argument("--http-rate", default="0", help="HTTP_HOST_RATE_PER_SEC for the adapters (0 = unlimited)")
+    parser.add_argument("--columnar", action="store_true", help="route books as a columnar CustomerBook")
+    parser.add_argument("--ai-cache", action="store_true", help="keep the persistent AI result cache enabled")
+    args = parser.parse_args()
+
+    fixtures = FixtureServer().start()
+    llm = FakeOpenAIServer(latency_ms=args.llm_latency_ms, error_rate=args.llm_error_rate).start()
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.chdir(workdir)
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": llm.api_base,
+        "HTTP_HOST_RATE_PER_SEC": args.http_rate,
+        "AI_CACHE_ENABLED": "1" if args.ai_cache else "0",
+        "BACKGROUND_TASKS": "0",
+    })
+    point_adapters_at(fixtures.base_url)
+
+    from app.core.ai import openai_engine
+    if openai_engine.OpenAI is None:
+        print("openai package not installed: LLM calls use the engine's built-in mocks, not the fake server.\n")
+    print(f"Stand-ins: fixtures {fixtures.base_url}, OpenAI {llm.api_base} "
+          f"(latency {args.llm_latency_ms:g} ms, error rate {args.llm_error_rate:g}); workdir {workdir}\n")
+
+    try:
+        bench_routines([int(c) for c in args.customers.split(",") if c], args.iterations, llm, args.columnar)
+        bench_endpoints(args.requests)
+    finally:
+        fixtures.stop()
+        llm.stop()
+    print(f"Fixture requests: {fixtures.requests}, OpenAI requests: {llm.requests}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares the full-tree html.parser path with the targeted fast path over saved board/view pages.
+
+    python -m benchmarks.bench_html_parsing [--iterations 50]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from statistics import median
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.adapters import board_parser
+from app.core.adapters.research_crawler import MiraeResearchCrawler
+from app.core.storage.report_store import JsonReportStore
+from app.models import serialization
+from app.models.resources import ResearchReport
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def read_fixture(name: str) -> str:
+    """Text of a saved page under benchmarks/fixtures (also used by the tests)."""
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+def _time(fn, html: str, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(html)
+        samples.append(time.perf_counter() - start)
+    return median(samples)
+
+def _peak_memory(fn, html: str) -> int:
+    tracemalloc.start()
+    result = fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+def check_identical_output(board_html: str, view_html: str):
+    """Runs the crawler's list and view parsing through both paths and compares the results."""
+    with tempfile.TemporaryDirectory() as tmp:
+        crawler = MiraeResearchCrawler(store=JsonReportStore(os.path.join(tmp, "db.json")))
+        outputs = []
+        for fast in (False, True):
+            crawler.fast_html = fast
+            reports = [serialization.to_dict(r) for r in crawler._parse_list_page(board_html)]
+            probe = ResearchReport(report_id="probe", title="probe", date="2026-01-01", author="", report_type="", source_url="")
+            text = crawler._extract_contents(view_html, probe)
+            outputs.append((reports, text, probe.attachment_urls))
+    assert outputs[0] == outputs[1], "fast path output differs from the full parser"
+    return outputs[1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    board_html = read_fixture("board_list.html")
+    view_html = read_fixture("report_view.html")
+    reports, text, attachments = check_identical_output(board_html, view_html)
+    print(f"Output identical: {len(reports)} rows, {len(text)} body chars, {len(attachments)} PDF link(s)")
+    # Comments around and inside scripts, and a commented-out copy of the content element
+    _, text, attachments = check_identical_output(board_html, read_fixture("report_view_comments.html"))
+    print(f"Output identical with HTML comments: {len(text)} body chars, {len(attachments)} PDF link(s)\n")
+
+    cases = [
+        ("board list", board_html, board_parser.list_rows_full, board_parser.list_rows_fast),
+        ("report view", view_html, board_parser.view_parts_full, board_parser.view_parts_fast),
+    ]
+    print(f"{'page':<12} {'size':>8} {'path':<5} {'median ms':>10} {'peak KiB':>10}")
+    for name, html, full, fast in cases:
+        results = {}
+        for label, fn in (("full", full), ("fast", fast)):
+            results[label] = (_time(fn, html, args.iterations), _peak_memory(fn, html))
+            t, peak = results[label]
+            print(f"{name:<12} {len(html) // 1024:>6}KB {label:<5} {t * 1000:>10.2f} {peak / 1024:>10.0f}")
+        speedup = results["full"][0] / results["fast"][0]
+        memory = results["full"][1] / results["fast"][1]
+        print(f"{'':<12} {'':>8} {'gain':<5} {speedup:>9.1f}x {memory:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
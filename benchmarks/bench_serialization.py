@@ -0,0 +1,129 @@
+"""
+Compares the previous report (de)serialization with app.models.serialization on synthetic reports.
+
+    python -m benchmarks.bench_serialization [--sizes 10000,100000,1000000] [--no-memory]
+
+baseline: json.dump([r.dict() ...], indent=2, default=str) and ResearchReport(**item) per item, as the
+JSON report store did before. fast: serialization.dump_models / load_models (compact output; pydantic-core
+JSON on pydantic v2, orjson and trusted construction on v1). Reports save/load time, file size and peak
+traced memory.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import serialization
+from app.models.resources import ResearchReport
+
+SECTORS = ["반도체", "2차전지", "방산", "바이오", "금융", "인터넷", "자동차"]
+REGIONS = ["한국", "미국", "중국", "글로벌"]
+ASSETS = ["주식", "채권", "원자재", "외환"]
+
+def synthetic_reports(count: int, seed: int = 0) -> List[ResearchReport]:
+    """Deterministic reports with short bodies and a few tags each."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 2, 7, 30)
+    reports = []
+    for i in range(count):
+        sectors = rng.sample(SECTORS, rng.randint(1, 3))
+        reports.append(ResearchReport(
+            report_id=f"mirae_{2300000 + i}",
+            title=f"[Daily] {sectors[0]} 업황 점검 #{i}",
+            date=start + timedelta(minutes=17 * i),
+            author=f"애널리스트 {i % 40}",
+            report_type="Daily Market / Theme",
+            source_url=f"https://securities.miraeasset.com/bbs/board/message/view.do?messageId={2300000 + i}",
+            attachment_urls=[f"https://securities.miraeasset.com/pdf/{2300000 + i}.pdf"] if i % 3 else [],
+            normalized_text=f"{sectors[0]} 수요 회복과 재고 조정 상황을 점검합니다. " * rng.randint(1, 4),
+            tags=sectors + rng.sample(ASSETS, 1),
+            sector_tags=sectors,
+            region_tags=rng.sample(REGIONS, 1),
+            time_horizon="중기 (3-12M)"
+        ))
+    return reports
+
+def baseline_save(reports: List[ResearchReport], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([r.dict() for r in reports], f, ensure_ascii=False, indent=2, default=str)
+
+def baseline_load(path: str) -> List[ResearchReport]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [ResearchReport(**item) for item in json.load(f)]
+
+def fast_save(reports: List[ResearchReport], path: str):
+    with open(path, "wb") as f:
+        f.write(serialization.dump_models(ResearchReport, reports))
+
+def fast_load(path: str) -> List[ResearchReport]:
+    with open(path, "rb") as f:
+        return serialization.load_models(ResearchReport, f.read())
+
+def _timed(fn: Callable):
+    """(seconds, result)"""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def _peak_memory(fn: Callable) -> int:
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated report counts")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slow) traced-memory runs")
+    args = parser.parse_args()
+
+    if serialization.PYDANTIC_V2:
+        codec = "pydantic-core"
+    else:
+        codec = "orjson" if serialization.orjson is not None else "json (orjson not installed)"
+    print(f"fast codec: {codec}\n")
+    print(f"{'reports':>9} {'path':<9} {'save s':>8} {'load s':>8} {'file MiB':>9} {'save MiB':>9} {'load MiB':>9}")
+    workdir = tempfile.mkdtemp(prefix="bench_serialization_")
+    cases = (("baseline", baseline_save, baseline_load), ("fast", fast_save, fast_load))
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        reports = synthetic_reports(size)
+        expected = reports[:1000]
+        rows = {label: {} for label, _, _ in cases}
+        for label, save, _ in cases:
+            path = os.path.join(workdir, f"{label}.json")
+            rows[label]["save"], _ = _timed(lambda: save(reports, path))
+            rows[label]["save_peak"] = None if args.no_memory else _peak_memory(lambda: save(reports, path))
+            rows[label]["file"] = os.path.getsize(path)
+        # Loads run without the source reports in memory, so the largest sizes fit
+        del reports
+        gc.collect()
+        for label, _, load in cases:
+            path = os.path.join(workdir, f"{label}.json")
+            rows[label]["load"], loaded = _timed(lambda: load(path))
+            # Both paths must read back the reports that were saved
+            assert loaded[:1000] == expected, f"{label} output differs from the saved reports"
+            del loaded
+            gc.collect()
+            rows[label]["load_peak"] = None if args.no_memory else _peak_memory(lambda: load(path))
+            os.remove(path)
+        for label, row in rows.items():
+            save_peak = "-" if row["save_peak"] is None else f"{row['save_peak'] / 2**20:.1f}"
+            load_peak = "-" if row["load_peak"] is None else f"{row['load_peak'] / 2**20:.1f}"
+            print(f"{size:>9} {label:<9} {row['save']:>8.3f} {row['load']:>8.3f} {row['file'] / 2**20:>9.1f} {save_peak:>9} {load_peak:>9}")
+        base, fast = rows["baseline"], rows["fast"]
+        print(f"{'':>9} {'gain':<9} {base['save'] / fast['save']:>7.1f}x {base['load'] / fast['load']:>7.1f}x")
+    os.rmdir(workdir)
+
+if __name__ == "__main__":
+    main()
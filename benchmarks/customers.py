@@ -0,0 +1,34 @@
+"""Synthetic customer books for benchmarks, with the segment mix and modifiers the routing rules use."""
+import random
+from typing import List
+from app.models.resources import CustomerProfile
+
+# (segment, asset_tier, trading_frequency, modifier pool, engagement levels)
+SEGMENTS = [
+    ("S1", "Low", "Low", ["Novice", "Video-preferred", "Dormant"], ["Dormant", "Low"]),
+    ("S2", "Low", "High", ["Active", "ETF-heavy", "Momentum"], ["Active", "Very Active"]),
+    ("S3", "High", "Low", ["Conservative", "Loss-sensitive", "Income"], ["Moderate", "Low"]),
+    ("S4", "High", "High", ["Expert", "Concentrated sector exposure", "Leverage"], ["Very Active", "Active"]),
+]
+SEGMENT_WEIGHTS = [0.35, 0.25, 0.25, 0.15]
+SECTORS = ["반도체", "2차전지", "방산", "바이오", "금융", "인터넷", "자동차"]
+REGIONS = ["한국", "미국", "중국", "글로벌"]
+
+def synthetic_customers(count: int, seed: int = 0) -> List[CustomerProfile]:
+    """Deterministic book of count customers."""
+    rng = random.Random(seed)
+    customers = []
+    for i in range(count):
+        segment, tier, frequency, modifiers, engagement = rng.choices(SEGMENTS, SEGMENT_WEIGHTS)[0]
+        customers.append(CustomerProfile(
+            customer_id=f"cust_{i:07d}",
+            segment_id=segment,
+            asset_tier=tier,
+            trading_frequency=frequency,
+            modifiers=rng.sample(modifiers, rng.randint(1, 2)),
+            engagement_level=rng.choice(engagement),
+            sector_exposures=rng.sample(SECTORS, rng.randint(1, 3)),
+            geographic_exposures=rng.sample(REGIONS, rng.randint(1, 2)),
+            cash_ratio=round(rng.random(), 2)
+        ))
+    return customers
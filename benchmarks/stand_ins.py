@@ -0,0 +1,215 @@
+"""
+Local stand-ins for the external services the routines depend on, for offline benchmarks:
+
+- FixtureServer serves the recorded research board list/view pages, a PDF for every board attachment link,
+  the YouTube channel page and its RSS feed. Board links in the pages are rewritten to the server itself.
+  It honours If-None-Match, so conditional GETs come back as 304s as they would in production.
+- FakeOpenAIServer answers /v1/chat/completions with schema-shaped JSON for every prompt the engine
+  sends, after a configurable latency and with a configurable error rate.
+
+point_adapters_at() rewires the crawler and YouTube connector to a FixtureServer. The OpenAI client
+is pointed at the fake through OPENAI_BASE_URL.
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from typing import Dict, Optional, Tuple
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+class _StandInServer:
+    """Runs a ThreadingHTTPServer on an ephemeral localhost port in a daemon thread."""
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self):
+        handler = type("Handler", (self.handler_class,), {"stand_in": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_StandInServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8", headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+class _FixtureHandler(_QuietHandler):
+    # path -> (fixture file, content type)
+    ROUTES = {
+        "/bbs/board/message/list.do": ("board_list.html", "text/html; charset=utf-8"),
+        "/bbs/board/message/view.do": ("report_view.html", "text/html; charset=utf-8"),
+        "/@SmartMoney0": ("channel.html", "text/html; charset=utf-8"),
+        "/feeds/videos.xml": ("videos.xml", "application/atom+xml; charset=utf-8"),
+    }
+    # path prefix -> (fixture file, content type)
+    PREFIX_ROUTES = {
+        "/bbs/download/": ("report.pdf", "application/pdf"),
+    }
+
+    def do_GET(self):
+        self.stand_in.count()
+        path = urlparse(self.path).path
+        route = self.ROUTES.get(path) or next(
+            (target for prefix, target in self.PREFIX_ROUTES.items() if path.startswith(prefix)), None
+        )
+        if route is None:
+            self._send(404)
+            return
+        body, etag = self.stand_in.load(route[0])
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+            return
+        self._send(200, body, route[1], {"ETag": etag})
+
+BOARD_ORIGIN = "https://securities.miraeasset.com"
+
+class FixtureServer(_StandInServer):
+    """Serves recorded board, view, attachment, channel and RSS fixtures with ETags."""
+    handler_class = _FixtureHandler
+
+    def __init__(self, fixtures_dir: str = FIXTURES):
+        super().__init__()
+        self.fixtures_dir = fixtures_dir
+        self._files: Dict[str, Tuple[bytes, str]] = {}
+
+    def load(self, name: str) -> Tuple[bytes, str]:
+        if name not in self._files:
+            with open(os.path.join(self.fixtures_dir, name), "rb") as f:
+                body = f.read()
+            if name.endswith(".html"):
+                # Attachment links point back here instead of at the real board
+                body = body.replace(BOARD_ORIGIN.encode(), self.base_url.encode())
+            self._files[name] = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        return self._files[name]
+
+def point_adapters_at(base_url: str):
+    """Rewires the crawler and YouTube connector class URLs to a FixtureServer."""
+    from app.core.adapters.research_crawler import MiraeResearchCrawler
+    from app.core.adapters.youtube_connector import SmartMoneyConnector
+    board = BOARD_ORIGIN
+    MiraeResearchCrawler.BASE_URL = MiraeResearchCrawler.BASE_URL.replace(board, base_url)
+    MiraeResearchCrawler.PAGE_URL = MiraeResearchCrawler.BASE_URL + "&curPage={}"
+    MiraeResearchCrawler.VIEW_BYPASS_URL = MiraeResearchCrawler.VIEW_BYPASS_URL.replace(board, base_url)
+    SmartMoneyConnector.YOUTUBE_HANDLE_URL = SmartMoneyConnector.YOUTUBE_HANDLE_URL.replace("https://www.youtube.com", base_url)
+    SmartMoneyConnector.RSS_BASE_URL = SmartMoneyConnector.RSS_BASE_URL.replace("https://www.youtube.com", base_url)
+
+_TARGET_RE = re.compile(r"index (\d+): Target Segment: ([^,]+), Delivery Priority: (.+)")
+
+def _fake_draft(segment: str, delivery_mode: str, video_present: bool) -> Dict[str, str]:
+    message = f"안녕하세요 고객님, {segment} 고객님께 오늘의 리서치를 공유드립니다.\n\n"
+    if video_present:
+        message += "[영상 링크]\n\n"
+    return {
+        "pb_summary": f"{segment} / {delivery_mode} 요약",
+        "pb_talking_points": "1. 핵심 논지\n2. 리스크 요인\n3. 후속 제안",
+        "client_message_draft": message + "궁금한 점 있으시면 언제든 연락주세요."
+    }
+
+def fake_completion_content(system_prompt: str, user_content: str) -> Dict:
+    """Schema-shaped JSON for each prompt family OpenAIEngine sends."""
+    video_present = "Video Details: {}" not in user_content
+    if "Targets:" in system_prompt:
+        return {"drafts": [
+            dict(index=int(i), segment=segment.strip(), delivery_mode=mode.strip(), **_fake_draft(segment.strip(), mode.strip(), video_present))
+            for i, segment, mode in _TARGET_RE.findall(system_prompt)
+        ]}
+    if "Target Segment:" in system_prompt:
+        segment = re.search(r"Target Segment: (.+)", system_prompt).group(1).strip()
+        mode = re.search(r"Delivery Priority: (.+)", system_prompt).group(1).strip()
+        return _fake_draft(segment, mode, video_present)
+    if "one section of a longer research report" in system_prompt:
+        return {"key_points": ["반도체 업황 개선"], "conclusion": "", "asset_class_impact": ["주식"],
+                "region_impact": ["한국"], "sector_impact": ["반도체"], "company_impact": [],
+                "time_horizon": "", "risk_conditions": ""}
+    if "investment thesis" in system_prompt:
+        return {"thesis": "메모리 업황 회복에 따른 반도체 비중 확대", "asset_class_impact": ["주식"],
+                "region_impact": ["한국"], "sector_impact": ["반도체"], "company_impact": ["삼성전자"],
+                "time_horizon": "중기 (3-12M)", "risk_conditions": "수요 둔화"}
+    return {"education_level": "intermediate", "content_style": "analytical",
+            "topic_tags": ["반도체", "시황"], "transcript_summary": "반도체 업황을 점검하는 영상입니다."}
+
+class _FakeOpenAIHandler(_QuietHandler):
+    def do_POST(self):
+        self.stand_in.count()
+        length = int(self.headers.get("Content-Length", "0"))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, content_type="application/json")
+            return
+        server = self.stand_in
+        if server.latency_s:
+            time.sleep(server.latency_s * server.rng_uniform(0.5, 1.5))
+        if server.error_rate and server.rng_uniform(0.0, 1.0) < server.error_rate:
+            body = json.dumps({"error": {"message": "injected failure", "type": "server_error"}}).encode()
+            self._send(500, body, "application/json")
+            return
+        messages = request.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user_content = next((m["content"] for m in messages if m["role"] == "user"), "")
+        content = json.dumps(fake_completion_content(system_prompt, user_content), ensure_ascii=False)
+        prompt_tokens = (len(system_prompt) + len(user_content)) // 3
+        completion_tokens = len(content) // 3
+        body = json.dumps({
+            "id": f"chatcmpl-bench{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }, ensure_ascii=False).encode("utf-8")
+        self._send(200, body, "application/json")
+
+class FakeOpenAIServer(_StandInServer):
+    """OpenAI-compatible chat completions endpoint with injected latency and errors."""
+    handler_class = _FakeOpenAIHandler
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, seed: int = 7):
+        super().__init__()
+        self.latency_s = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def rng_uniform(self, lo: float, hi: float) -> float:
+        with self._lock:
+            return self._rng.uniform(lo, hi)
+
+    @property
+    def api_base(self) -> str:
+        return self.base_url + "/v1"
@@ -0,0 +1,58 @@
+import pytest
+
+from app.core.engine.matcher import ContentMatcher
+from app.core.engine.router import SegmentRouter
+from app.core.storage.action_queue import ActionQueue
+from app.models.resources import ResearchReport, SmartMoneyVideo
+
+@pytest.fixture
+def matcher(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_INDEX_PATH", str(tmp_path / "vectors" / "reports"))
+    return ContentMatcher(ai_engine=None)
+
+@pytest.fixture
+def queue(tmp_path):
+    return ActionQueue(db_path=str(tmp_path / "action_queue.sqlite3"))
+
+def _report(report_id):
+    return ResearchReport(report_id=report_id, title="Daily", date="2024-01-02", author="a", report_type="Daily",
+                          source_url="https://example.com/report")
+
+VIDEO = SmartMoneyVideo(video_id="v1", title="영상", publish_date="2024-01-02",
+                        source_url="https://youtube.com/v1")
+
+def _drafts(matcher, report):
+    bundle = matcher.create_hybrid_bundle(report, VIDEO, "Routine A: Daily Morning")
+    router = SegmentRouter(ai_engine=None)
+    return [router._new_draft(bundle, f"cust_{i}", 5 - i, ("points", "message")) for i in range(4)]
+
+def test_rerunning_a_routine_keeps_queued_actions(matcher, queue):
+    first = _drafts(matcher, _report("r1"))
+    assert queue.enqueue(first) == 4
+    # A refresh over the same report and video routes the same bundle again
+    second = _drafts(matcher, _report("r1"))
+    assert [d.action_id for d in second] == [d.action_id for d in first]
+    assert queue.enqueue(second) == 0
+
+    assert queue.complete(None, first[0].action_id)
+    assert queue.enqueue(_drafts(matcher, _report("r1"))) == 0
+    actions, _ = queue.top(None)
+    assert [a.action_id for a in actions] == [d.action_id for d in first[1:]]
+
+def test_new_contents_supersede_pending_actions(matcher, queue):
+    queue.enqueue(_drafts(matcher, _report("r1")))
+    newer = _drafts(matcher, _report("r2"))
+    assert queue.enqueue(newer) == 4
+    actions, _ = queue.top(None)
+    assert [a.action_id for a in actions] == [d.action_id for d in newer]
+
+def test_cursor_pages_and_rejects_other_formats(matcher, queue):
+    drafts = _drafts(matcher, _report("r1"))
+    queue.enqueue(drafts)
+    first, cursor = queue.top(None, limit=3)
+    rest, last = queue.top(None, limit=3, cursor=cursor)
+    assert [a.action_id for a in first + rest] == [d.action_id for d in drafts]
+    assert last is None
+    for bad in ("abc", "5", "o:5"):
+        with pytest.raises(ValueError):
+            queue.top(None, cursor=bad)
@@ -0,0 +1,20 @@
+from app.core.adapters import board_parser
+from benchmarks.bench_html_parsing import read_fixture, check_identical_output
+
+def test_fast_paths_match_the_full_parser():
+    reports, text, attachments = check_identical_output(read_fixture("board_list.html"), read_fixture("report_view.html"))
+    assert reports and text
+    assert attachments == ["https://securities.miraeasset.com/bbs/download/2142910.pdf?attachmentId=2142910"]
+
+def test_comments_in_and_around_scripts():
+    _, text, attachments = check_identical_output(read_fixture("board_list.html"), read_fixture("report_view_comments.html"))
+    # The PDF link sits in a <!-- //--> wrapped script; the commented-out script and body are ignored
+    assert attachments == ["https://securities.miraeasset.com/bbs/download/2142911.pdf?attachmentId=2142911"]
+    assert "old body" not in text and "코스피가 상승 전환" in text
+
+def test_content_id_inside_a_script_is_not_the_content_element():
+    html = ("<script>document.write('<div id=\"messageContentsDiv\">fake</div>');</script>"
+            "<div id=\"messageContentsDiv\"><p>real</p></div>")
+    content, scripts = board_parser.view_parts_fast(html)
+    assert content.get_text() == "real"
+    assert scripts == board_parser.view_parts_full(html)[1]
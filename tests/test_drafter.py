@@ -0,0 +1,27 @@
+import threading
+
+from app.core.engine.drafter import DraftGenerator
+
+class BatchWithGaps:
+    """Answers the batch for the first target only; the separate calls must meet at the barrier."""
+    def __init__(self, separate_calls: int):
+        self.barrier = threading.Barrier(separate_calls, timeout=5)
+        self.drafted = []
+
+    def generate_pb_drafts_batch(self, routine_type, targets, report_data, video_data):
+        return [{"pb_talking_points": f"batch {targets[0][0]}"}] + [None] * (len(targets) - 1)
+
+    def generate_pb_draft(self, routine_type, segment, report_data, video_data, delivery_mode):
+        self.barrier.wait()
+        self.drafted.append(segment)
+        return {"pb_talking_points": f"single {segment}"}
+
+def test_missing_batch_entries_are_drafted_concurrently():
+    ai = BatchWithGaps(separate_calls=2)
+    drafter = DraftGenerator(ai, max_workers=4, batch=True)
+    targets = [("S1", "Push"), ("S2", "Push"), ("S3", "Call"), ("S2", "Push")]
+    responses, stats = drafter.generate("Routine A: Daily Morning", targets, {"title": "r"}, {})
+
+    assert [r["pb_talking_points"] for r in responses] == ["batch S1", "single S2", "single S3", "single S2"]
+    assert sorted(ai.drafted) == ["S2", "S3"]
+    assert stats["batched"] == 1 and stats["misses"] == 3 and stats["failures"] == 0
@@ -0,0 +1,110 @@
+import time
+import threading
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from app.core.adapters.pdf_ingest import PdfIngestor, PdfTextCache, PAGE_SEPARATOR
+from app.core.adapters.http_client import HttpClient
+from app.models.resources import ResearchReport
+from benchmarks.stand_ins import FixtureServer
+
+@pytest.fixture
+def server():
+    srv = FixtureServer().start()
+    yield srv
+    srv.stop()
+
+@pytest.fixture
+def ingestor(tmp_path):
+    ingestor = PdfIngestor(http=HttpClient(), cache=PdfTextCache(db_path=str(tmp_path / "pdf_text.sqlite3")), max_workers=1)
+    yield ingestor
+    ingestor.shutdown()
+
+def _report(report_id, url):
+    return ResearchReport(report_id=report_id, title="Daily", date="2024-01-02", author="a", report_type="Daily",
+                          source_url="https://example.com", attachment_urls=[url], normalized_text="본문")
+
+def test_ingests_fixture_pdf_with_page_offsets(server, ingestor):
+    report = _report("r1", f"{server.base_url}/bbs/download/1.pdf?attachmentId=1")
+    assert ingestor.ingest([report]) == [report]
+
+    text = report.normalized_text
+    assert len(report.page_offsets) == 3 and len(report.pdf_hashes) == 1
+    assert text.startswith("본문" + PAGE_SEPARATOR)
+    assert text[report.page_offsets[0]:].startswith("Mirae Asset Securities Research - Daily Market Strategy")
+    assert text[report.page_offsets[1]:].startswith("Sector view: overweight semiconductors")
+    assert text[report.page_offsets[2]:].startswith("Appendix: compliance notice")
+    # Already ingested reports are skipped
+    assert ingestor.ingest([report]) == []
+
+def test_same_pdf_is_extracted_once(server, ingestor):
+    first = _report("r1", f"{server.base_url}/bbs/download/1.pdf")
+    ingestor.ingest([first])
+    assert ingestor.cache.get(first.pdf_hashes[0]) is not None
+
+    # Same bytes under another URL: served from the content-hash cache, the pool is never used
+    def no_pool():
+        raise AssertionError("extraction pool used for a cached PDF")
+    ingestor._executor = no_pool
+    second = _report("r2", f"{server.base_url}/bbs/download/2.pdf")
+    assert ingestor.ingest([second]) == [second]
+    assert second.pdf_hashes == first.pdf_hashes
+    assert second.normalized_text == first.normalized_text and second.page_offsets == first.page_offsets
+
+class CountingLock:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.acquisitions += 1
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_concurrent_ingests_attach_the_pdf_once(server, ingestor):
+    url = f"{server.base_url}/bbs/download/1.pdf"
+    shared = _report("r1", url)
+    other_copy = _report("r1", url)
+    started, release = threading.Event(), threading.Event()
+    download = ingestor._download
+    downloads = []
+
+    def slow_download(u):
+        downloads.append(u)
+        started.set()
+        release.wait(5)
+        return download(u)
+    ingestor._download = slow_download
+    ingestor._ingest_lock = CountingLock()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ingestor.ingest([shared])))]
+    threads[0].start()
+    assert started.wait(5)
+    # Both start while the first download is still in flight
+    threads += [threading.Thread(target=lambda r=r: results.append(ingestor.ingest([r]))) for r in (shared, other_copy)]
+    for thread in threads[1:]:
+        thread.start()
+    # Both have found the in-flight ingestion (one lock acquisition each) before the download ends
+    assert _wait_for(lambda: ingestor._ingest_lock.acquisitions >= 3)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert downloads == [url]
+    for report in (shared, other_copy):
+        assert report.normalized_text.count("Appendix: compliance notice") == 1
+        assert report.normalized_text[report.page_offsets[0]:].startswith("Mirae Asset Securities Research")
+    assert sorted(len(result) for result in results) == [0, 1, 1]
@@ -0,0 +1,25 @@
+import warnings
+
+import pytest
+
+from app.core.storage.report_store import ReportStore, SQLiteReportStore
+from app.models.resources import ResearchReport
+
+def test_store_missing_a_method_cannot_be_created():
+    class PartialStore(ReportStore):
+        def upsert_reports(self, reports):
+            return 0
+
+    with pytest.raises(TypeError):
+        PartialStore()
+
+def test_upsert_merges_without_deprecation_warnings(tmp_path):
+    store = SQLiteReportStore(str(tmp_path / "reports.sqlite3"), legacy_json_path=None)
+    report = ResearchReport(report_id="r1", title="Daily", date="2024-01-02", author="a", report_type="Daily",
+                            source_url="https://example.com", normalized_text="본문")
+    store.upsert_reports([report])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        store.upsert_reports([report.model_copy(update={"normalized_text": "", "tags": ["반도체"]})])
+    stored = store.get_report("r1")
+    assert stored.normalized_text == "본문" and stored.tags == ["반도체"]
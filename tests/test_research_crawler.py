@@ -0,0 +1,79 @@
+import pytest
+
+from app.core.adapters.research_crawler import MiraeResearchCrawler
+from app.core.adapters.http_client import HttpClient
+from app.core.storage.report_store import SQLiteReportStore
+from app.models.resources import ResearchReport
+from benchmarks.stand_ins import FixtureServer
+
+@pytest.fixture
+def server():
+    srv = FixtureServer().start()
+    yield srv
+    srv.stop()
+
+@pytest.fixture
+def crawler(tmp_path):
+    return MiraeResearchCrawler(store=SQLiteReportStore(str(tmp_path / "reports.sqlite3")), http=HttpClient())
+
+def _report(report_id, url):
+    return ResearchReport(report_id=report_id, title="Daily", date="2024-01-02", author="a",
+                          report_type="Daily", source_url=url)
+
+def test_failed_body_fetch_is_retried(server, crawler):
+    report = _report("mirae_1", f"{server.base_url}/missing")
+    assert crawler.fetch_contents_bulk([report]) == 1
+    assert not report.normalized_text
+    assert "mirae_1" not in crawler._content_fetches
+
+    report.source_url = f"{server.base_url}/bbs/board/message/view.do?messageId=1"
+    assert crawler.fetch_contents_bulk([report]) == 1
+    assert report.normalized_text
+
+    # Later calls are served from the store
+    again = _report("mirae_1", report.source_url)
+    assert crawler.fetch_contents_bulk([again]) == 0
+    assert again.normalized_text == report.normalized_text
+
+def test_fetch_markers_are_bounded(server, crawler):
+    crawler.content_fetch_memo = 2
+    url = f"{server.base_url}/bbs/board/message/view.do?messageId={{}}"
+    crawler.fetch_contents_bulk([_report(f"mirae_{i}", url.format(i)) for i in range(5)])
+    assert list(crawler._content_fetches) == ["mirae_3", "mirae_4"]
+
+def test_board_validators_are_kept_per_crawler(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(MiraeResearchCrawler, "BASE_URL", f"{server.base_url}/bbs/board/message/list.do?categoryId=1521")
+    http = HttpClient()
+    first = MiraeResearchCrawler(store=SQLiteReportStore(str(tmp_path / "a.sqlite3")), http=http)
+    second = MiraeResearchCrawler(store=SQLiteReportStore(str(tmp_path / "b.sqlite3")), http=http)
+    original = first.fetch_recent_reports(limit=5)
+    assert [r.title for r in second.fetch_recent_reports(limit=5)] == [r.title for r in original]
+
+    # The board changes and one crawler sees it first: the other must not get a 304 for that response
+    body, _ = server.load("board_list.html")
+    server._files["board_list.html"] = (body.replace("글로벌 자산배분 100월".encode(), b"Updated"), '"v2"')
+    assert "Updated" in first.fetch_recent_reports(limit=5)[0].title
+    assert "Updated" in second.fetch_recent_reports(limit=5)[0].title
+    # Nor does the list fetch hide the change from the incremental crawl
+    assert first.crawl_incremental()
+    assert first.crawl_incremental() == []
+
+    # A crawl whose reports could not be stored is not answered with a 304 next time
+    def locked(reports):
+        raise RuntimeError("database is locked")
+    second.save_reports = locked
+    with pytest.raises(RuntimeError):
+        second.crawl_incremental()
+    del second.save_reports
+    assert second.crawl_incremental()
+    assert second.store.list_reports(limit=1)
+
+def test_recent_reports_are_copies(server, crawler, monkeypatch):
+    monkeypatch.setattr(MiraeResearchCrawler, "BASE_URL", f"{server.base_url}/bbs/board/message/list.do?categoryId=1521")
+    first = crawler.fetch_recent_reports(limit=3)
+    first[0].normalized_text = "filled in by one run"
+    first[0].attachment_urls.append("https://example.com/a.pdf")
+    # A 304 serves the cached parse, untouched by what the previous caller did to its reports
+    again = crawler.fetch_recent_reports(limit=3)
+    assert again[0].report_id == first[0].report_id and again[0] is not first[0]
+    assert again[0].normalized_text == "" and "https://example.com/a.pdf" not in again[0].attachment_urls
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from app.core.storage.audit_log import AuditLog
+from app.core.workflows.routines import WorkflowOrchestrator
+from app.core.workflows.speculative import SpeculativeCache
+from app.models.resources import AuditRecord, HybridContentBundle
+
+def _orchestrator(tmp_path):
+    # Only what a speculative hit touches
+    orchestrator = WorkflowOrchestrator.__new__(WorkflowOrchestrator)
+    orchestrator.speculative = SpeculativeCache()
+    orchestrator.action_queue = None
+    orchestrator.audit_log = AuditLog(log_dir=str(tmp_path / "audit"), flush_seconds=0.01)
+    return orchestrator
+
+def test_hit_logs_a_new_record_referring_to_the_precomputed_run(tmp_path):
+    orchestrator = _orchestrator(tmp_path)
+    precomputed = AuditRecord(audit_id="audit_pre", timestamp=datetime(2026, 1, 2, 7), report_id="r1",
+                              workflow_name="Routine A: Daily Morning", decision_points={"match_reason": "m"},
+                              rationale="Generated morning routine.")
+    bundle = HybridContentBundle(bundle_id="bndl_1", routine_type="Routine A: Daily Morning", report_id="r1")
+    generation = orchestrator.speculative.new_generation()
+    assert orchestrator.speculative.put("r1", {"status": "success", "bundle": bundle, "drafts": [], "audit": precomputed}, generation)
+
+    served = [orchestrator.speculative_routine_a("r1")["audit"] for _ in range(2)]
+    orchestrator.audit_log.flush()
+
+    ids = {audit.audit_id for audit in served}
+    assert len(ids) == 2 and "audit_pre" not in ids
+    assert all(audit.decision_points["served_from_precompute"] == "audit_pre" for audit in served)
+    assert all(audit.timestamp > precomputed.timestamp for audit in served)
+    logged = orchestrator.audit_log.query(report_id="r1")
+    assert {audit.audit_id for audit in logged} == ids
+    # The cached result keeps the precomputed record
+    assert orchestrator.speculative.get("r1")["audit"] is precomputed
+    orchestrator.audit_log.close()
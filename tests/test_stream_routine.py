@@ -0,0 +1,28 @@
+import threading
+
+import app.app as web
+
+def test_streams_past_the_limit_are_refused(monkeypatch):
+    release = threading.Event()
+
+    def blocked_routine(report_id, progress):
+        progress("crawl")
+        release.wait(10)
+        yield "error", {"status": "error", "message": "stopped"}
+
+    monkeypatch.setitem(web.ROUTINE_STREAMS, "A", blocked_routine)
+    monkeypatch.setattr(web, "_stream_slots", threading.BoundedSemaphore(1))
+    client = web.app.test_client()
+
+    first = client.get("/stream_routine?routine_type=A")
+    assert first.status_code == 200
+    second = client.get("/stream_routine?routine_type=A")
+    assert second.status_code == 429
+
+    release.set()
+    body = first.get_data(as_text=True)
+    assert "event: stage" in body and "event: error" in body
+    # The finished run gave its slot back
+    third = client.get("/stream_routine?routine_type=A")
+    assert third.status_code == 200
+    assert "event: error" in third.get_data(as_text=True)
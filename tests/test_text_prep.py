@@ -0,0 +1,51 @@
+from app.core.ai.text_prep import strip_boilerplate
+from app.core.adapters.pdf_ingest import PdfIngestor
+from app.models.resources import ResearchReport
+
+TABLE = "\n".join([
+    "실적 추정",
+    "구분",
+    "2023",
+    "2024",
+    "2025",
+    "매출액",
+    "12",
+    "15",
+    "18",
+    "영업이익",
+    "3",
+    "4",
+    "4",
+    "자료: 미래에셋증권 리서치센터",
+])
+
+def _pdf_report(pages):
+    report = ResearchReport(report_id="r1", title="t", date="2024-01-02", author="a", report_type="Daily",
+                            source_url="https://example.com", normalized_text="본문 요약입니다.")
+    PdfIngestor._attach(report, ["hash"], pages)
+    return report
+
+def test_table_without_pages_is_kept():
+    result = strip_boilerplate(TABLE)
+    assert result["text"] == TABLE
+    assert result["removed_lines"] == 0
+
+def test_table_inside_pdf_pages_is_kept_and_page_furniture_dropped():
+    pages = [
+        f"미래에셋증권 Daily {n}\n{TABLE}\n{n}" if n != 2 else f"미래에셋증권 Daily {n}\n12\n본문 계속\n- {n} -"
+        for n in (1, 2, 3)
+    ]
+    report = _pdf_report(pages)
+    result = strip_boilerplate(report.normalized_text, report.page_offsets)
+    lines = result["text"].splitlines()
+    # Running header and page numbers at each page edge: 3 + 3 lines
+    assert result["removed_lines"] == 6
+    assert not any(line.startswith("미래에셋증권 Daily") for line in lines)
+    assert "- 2 -" not in lines
+    # Every year and figure of both tables survives, as does the number opening page 2's body
+    assert lines.count("2024") == 2 and lines.count("18") == 2 and lines.count("12") == 3
+
+def test_disclaimers_and_duplicate_lines_are_dropped():
+    text = "핵심 의견\n핵심 의견\n본 자료는 투자 판단의 최종 책임이 투자자에게 있습니다.\n4\n4"
+    result = strip_boilerplate(text)
+    assert result["text"].splitlines() == ["핵심 의견", "4", "4"]
@@ -0,0 +1,36 @@
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.engine.vector_index import VectorIndex
+
+@pytest.fixture
+def prefix(tmp_path):
+    return str(tmp_path / "vectors" / "reports")
+
+def test_rewritten_rows_replace_their_document_frequencies(prefix, tmp_path):
+    index = VectorIndex(path_prefix=prefix, dim=256)
+    index.add([("r1", "반도체 수출 회복"), ("r2", "금리 인하 기대")])
+    index.add([("r1", "방산 수주 확대")])
+
+    fresh = VectorIndex(path_prefix=str(tmp_path / "fresh"), dim=256)
+    fresh.add([("r1", "방산 수주 확대"), ("r2", "금리 인하 기대")])
+    assert np.array_equal(index.df, fresh.df)
+    assert index.search("방산 수주", top_k=1)[0][0] == "r1"
+
+def test_adds_write_only_changed_rows_and_other_instances_follow(prefix):
+    writer = VectorIndex(path_prefix=prefix, dim=256)
+    reader = VectorIndex(path_prefix=prefix, dim=256)
+    writer.add([(f"r{i}", f"리포트 {i} 본문") for i in range(5)])
+    assert writer.add([("r0", "리포트 0 본문"), ("r3", "새 본문"), ("r5", "추가 리포트")]) == 2
+
+    with sqlite3.connect(writer.db_path) as conn:
+        rows = dict(conn.execute("SELECT report_id, seq FROM vector_rows").fetchall())
+    assert rows == {"r0": 1, "r1": 1, "r2": 1, "r3": 2, "r4": 1, "r5": 2}
+
+    assert reader.search("추가 리포트", top_k=1)[0][0] == "r5"
+    assert reader.ids == writer.ids and np.array_equal(reader.df, writer.df)
+    reopened = VectorIndex(path_prefix=prefix, dim=256)
+    assert reopened.ids == writer.ids and reopened.text_hashes == writer.text_hashes